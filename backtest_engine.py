@@ -0,0 +1,323 @@
+from typing import NamedTuple
+
+import numpy as np
+
+
+# Per-symbol arrays produced by run_backtest. Every array is shaped
+# (symbols, bars); the scalar summaries are shaped (symbols,).
+class BacktestResult(NamedTuple):
+    rsi: np.ndarray
+    position: np.ndarray  # True while holding the symbol after the bar's action
+    shares: np.ndarray
+    cash: np.ndarray
+    equity: np.ndarray
+    entries: np.ndarray
+    exits: np.ndarray
+    realized: np.ndarray  # Gain/loss booked on each exit bar
+    final_value: np.ndarray
+    total_gain_loss: np.ndarray
+    percentage_return: np.ndarray
+
+
+# 14-period RSI from simple rolling means of gains/losses, computed for a whole
+# (symbols x bars) matrix at once. Matches backtest_stocks.calculate_rsi:
+# the first diff counts as a zero gain/loss and the first period-1 bars are NaN.
+def rsi_sma_matrix(closes, period=14):
+    closes = np.atleast_2d(np.asarray(closes, dtype=np.float64))
+    n_symbols, n_bars = closes.shape
+
+    delta = np.zeros_like(closes)
+    np.subtract(closes[:, 1:], closes[:, :-1], out=delta[:, 1:])
+    delta[np.isnan(delta)] = 0.0
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+
+    rsi = np.full((n_symbols, n_bars), np.nan)
+    if n_bars < period:
+        return rsi
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = rolling_sum(gain, period) / rolling_sum(loss, period)
+        rsi[:, period - 1:] = 100 - (100 / (1 + rs))
+    return rsi
+
+
+# Sums of every `window` consecutive columns, shaped (rows, bars - window + 1).
+# The cumulative sums restart every `chunk` bars, so the running totals stay
+# small and the differences keep their precision over millions of bars.
+def rolling_sum(values, window, chunk=4096):
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    n_bars = values.shape[1]
+    sums = np.empty((values.shape[0], max(n_bars - window + 1, 0)))
+    for start in range(0, n_bars - window + 1, chunk):
+        totals = np.cumsum(values[:, start:start + chunk + window - 1], axis=1)
+        totals[:, window:] -= totals[:, :-window].copy()
+        sums[:, start:start + totals.shape[1] - window + 1] = totals[:, window - 1:]
+    return sums
+
+
+# y[:, k] = decay * y[:, k - 1] + u[:, k] (y starts from 0) without a Python
+# loop over bars. The bars are cut into blocks: a matrix product with the
+# (block x block) table of decay powers solves every block from a zero start,
+# then the carry into each block (the same recurrence over block ends, with
+# decay ** block) is added back. Powers never exceed 1, so nothing overflows.
+# u must not contain NaN.
+def linear_recurrence(u, decay, block=64):
+    u = np.atleast_2d(np.asarray(u, dtype=np.float64))
+    n_rows, n_bars = u.shape
+    if n_bars == 0:
+        return u.copy()
+    block = min(block, n_bars)
+    n_blocks = -(-n_bars // block)
+    padded = np.zeros((n_rows, n_blocks * block))
+    padded[:, :n_bars] = u
+    lag = np.arange(block)[None, :] - np.arange(block)[:, None]
+    table = np.where(lag >= 0, decay ** np.maximum(lag, 0), 0.0)
+    y = padded.reshape(n_rows, n_blocks, block) @ table
+    if n_blocks > 1:
+        ends = linear_recurrence(y[:, :-1, -1], decay ** block, block)
+        y[:, 1:, :] += ends[:, :, None] * decay ** np.arange(1, block + 1)
+    return y.reshape(n_rows, -1)[:, :n_bars]
+
+
+# ewm(alpha=...).mean() of every row of a NaN-free matrix, adjust=False
+# (y[0] = x[0]) or adjust=True (weighted sum over the sum of the weights)
+def ewm_matrix(values, alpha, adjust=False):
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    decay = 1 - alpha
+    if adjust:
+        # Sum of the weights after k + 1 values: 1 + decay + ... + decay ** k
+        weights = -np.expm1(np.log(decay) * np.arange(1, values.shape[1] + 1)) / alpha
+        return linear_recurrence(values, decay) / weights
+    u = alpha * values
+    u[:, :1] = values[:, :1]
+    return linear_recurrence(u, decay)
+
+
+# EMA of closes, ewm(span=span, adjust=False) as in the bots
+def ema_matrix(closes, span=200):
+    return ewm_matrix(closes, 2 / (span + 1))
+
+
+# RSI from exponentially smoothed gains/losses. The first bar has no diff, so
+# smoothing starts on the second bar and the first `period` bars are NaN.
+def _rsi_ewm_matrix(closes, period, alpha, adjust):
+    closes = np.atleast_2d(np.asarray(closes, dtype=np.float64))
+    rsi = np.full(closes.shape, np.nan)
+    if closes.shape[1] <= period:
+        return rsi
+    delta = np.diff(closes, axis=1)
+    gain = ewm_matrix(np.where(delta > 0, delta, 0.0), alpha, adjust)
+    loss = ewm_matrix(np.where(delta < 0, -delta, 0.0), alpha, adjust)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi[:, period:] = 100 - (100 / (1 + gain[:, period - 1:] / loss[:, period - 1:]))
+    return rsi
+
+
+# Matches check_stocks.calculate_rsi: ewm(span=period, min_periods=period)
+def rsi_ema_matrix(closes, period=14):
+    return _rsi_ewm_matrix(closes, period, 2 / (period + 1), adjust=True)
+
+
+# Wilder's smoothing, ewm(alpha=1/period, min_periods=period, adjust=False)
+def rsi_wilder_matrix(closes, period=14):
+    return _rsi_ewm_matrix(closes, period, 1 / period, adjust=False)
+
+
+# (MACD line, signal line), every EMA adjust=False as in check_stocks
+def macd_matrix(closes, fast=12, slow=26, signal=9):
+    macd = ema_matrix(closes, fast) - ema_matrix(closes, slow)
+    return macd, ema_matrix(macd, signal)
+
+
+# (rolling mean, upper band, lower band) with the sample std of each window,
+# like rolling(window).mean() / .std(), from chunked rolling sums (see
+# rolling_sum) of the closes and their squares around each chunk's first close
+def bollinger_matrix(closes, window=20, width=2, chunk=4096):
+    closes = np.atleast_2d(np.asarray(closes, dtype=np.float64))
+    mean = np.full(closes.shape, np.nan)
+    variance = np.full(closes.shape, np.nan)
+    for start in range(0, closes.shape[1] - window + 1, chunk):
+        part = closes[:, start:start + chunk + window - 1]
+        shift = part[:, :1]
+        shifted = part - shift
+        sums = rolling_sum(shifted, window, chunk=part.shape[1])
+        squares = rolling_sum(shifted * shifted, window, chunk=part.shape[1])
+        columns = slice(start + window - 1, start + window - 1 + sums.shape[1])
+        mean[:, columns] = sums / window + shift
+        variance[:, columns] = np.maximum((squares - sums * sums / window) / (window - 1), 0.0)
+    std = np.sqrt(variance)
+    return mean, mean + std * width, mean - std * width
+
+
+# Forward-fill the column index of the last True in each row (0 when none yet)
+def _last_index(mask):
+    index = np.where(mask, np.arange(mask.shape[1]), 0)
+    return np.maximum.accumulate(index, axis=1)
+
+
+# Turn buy/sell signal arrays into the long/flat position held after each bar.
+# Buying while long and selling while flat are no-ops, so the position is simply
+# the side of the most recent signal.
+def resolve_positions(buy, sell):
+    events = np.where(buy, 1, np.where(sell, -1, 0)).astype(np.int8)
+    events[:, 0] = 0  # The bar loop in simple_backtest starts at the second bar
+    rows = np.arange(events.shape[0])[:, None]
+    return events[rows, _last_index(events != 0)] == 1
+
+
+# Vectorized version of the simple_backtest rules: buy a fixed dollar amount
+# when RSI < buy_threshold and we are flat, sell everything when RSI >
+# sell_threshold. Runs a (symbols x bars) close matrix in one pass.
+def run_backtest(closes, initial_cash=10000, investment_per_stock=1000, rsi_period=14,
+                 buy_threshold=30, sell_threshold=70, rsi=None):
+    if buy_threshold >= sell_threshold:
+        raise ValueError("buy_threshold must be below sell_threshold")
+
+    closes = np.atleast_2d(np.asarray(closes, dtype=np.float64))
+    n_symbols, n_bars = closes.shape
+    rows = np.arange(n_symbols)[:, None]
+    if rsi is None:
+        rsi = rsi_sma_matrix(closes, rsi_period)
+
+    # Entry/exit signals; NaN prices never trade
+    tradable = ~np.isnan(closes)
+    with np.errstate(invalid='ignore'):
+        buy = (rsi < buy_threshold) & tradable
+        sell = (rsi > sell_threshold) & tradable
+    position = resolve_positions(buy, sell)
+
+    # Preallocated outputs
+    shares = np.zeros((n_symbols, n_bars))
+    cash = np.empty((n_symbols, n_bars))
+    equity = np.empty((n_symbols, n_bars))
+    realized = np.zeros((n_symbols, n_bars))
+
+    for attempt in range(2):
+        previous = np.zeros_like(position)
+        previous[:, 1:] = position[:, :-1]
+        entries = position & ~previous
+        exits = previous & ~position
+
+        # Entry price carried forward while the position is open
+        entry_price = closes[rows, _last_index(entries)]
+        shares.fill(0.0)
+        np.divide(investment_per_stock, entry_price, out=shares, where=position)
+
+        # Gain/loss booked when the position is closed
+        realized.fill(0.0)
+        held = np.zeros_like(shares)
+        held[:, 1:] = shares[:, :-1]
+        prior_entry = np.zeros_like(entry_price)
+        prior_entry[:, 1:] = entry_price[:, :-1]
+        np.multiply(held, closes - prior_entry, out=realized, where=exits)
+        realized_total = np.cumsum(realized, axis=1)
+
+        # A buy needs investment_per_stock in cash. Cash only changes on exits,
+        # so once an entry is unaffordable every later entry is too: drop the
+        # position from that bar on and resolve the arrays once more.
+        if attempt == 1:
+            break
+        blocked = entries & (initial_cash + realized_total < investment_per_stock)
+        if not blocked.any():
+            break
+        first_blocked = np.where(blocked.any(axis=1), blocked.argmax(axis=1), n_bars)
+        position &= np.arange(n_bars) < first_blocked[:, None]
+
+    # Cash and equity curves
+    np.subtract(initial_cash + realized_total, investment_per_stock * position, out=cash)
+    np.multiply(shares, closes, out=equity, where=position)
+    equity[~position] = 0.0
+    equity += cash
+
+    final_value = equity[:, -1].copy() if n_bars else np.full(n_symbols, float(initial_cash))
+    total_gain_loss = realized_total[:, -1].copy() if n_bars else np.zeros(n_symbols)
+    percentage_return = (final_value - initial_cash) / initial_cash * 100
+
+    return BacktestResult(rsi, position, shares, cash, equity, entries, exits, realized,
+                          final_value, total_gain_loss, percentage_return)
+
+
+class PortfolioResult(NamedTuple):
+    rsi: np.ndarray
+    shares: np.ndarray  # (symbols, bars) held after each bar
+    cash: np.ndarray  # (bars,)
+    equity: np.ndarray  # (bars,) cash plus holdings at the last known close
+    trades: list  # (bar, symbol index, "buy" | "sell", shares, price, gain/loss)
+    skipped: np.ndarray  # (bars,) buy signals dropped for lack of cash or a free slot
+    final_value: float
+    total_gain_loss: float
+    percentage_return: float
+
+
+# The simple_backtest rules run as one portfolio: a single cash pool, at most
+# max_active_stocks open positions, each bought for investment_per_stock.
+# Signals are computed for the whole (symbols x bars) matrix up front; the
+# loop then visits only the bars on which some symbol has a signal, in time
+# order. On such a bar every sell is booked before any buy, so freed cash and
+# slots can be reused the same day, and colliding buys go in priority order:
+# lowest RSI first (the most oversold), ties broken by symbol order. NaN
+# closes (symbol not trading that bar) never trade.
+def run_portfolio_backtest(closes, initial_cash=10000, investment_per_stock=1000, max_active_stocks=5,
+                           rsi_period=14, buy_threshold=30, sell_threshold=70, rsi=None):
+    if buy_threshold >= sell_threshold:
+        raise ValueError("buy_threshold must be below sell_threshold")
+
+    closes = np.atleast_2d(np.asarray(closes, dtype=np.float64))
+    n_symbols, n_bars = closes.shape
+    if rsi is None:
+        rsi = rsi_sma_matrix(closes, rsi_period)
+
+    tradable = ~np.isnan(closes)
+    with np.errstate(invalid='ignore'):
+        buy = (rsi < buy_threshold) & tradable
+        sell = (rsi > sell_threshold) & tradable
+    buy[:, 0] = sell[:, 0] = False  # The bar loop in simple_backtest starts at the second bar
+
+    shares_delta = np.zeros((n_symbols, n_bars))
+    cash_delta = np.zeros(n_bars)
+    skipped = np.zeros(n_bars, dtype=np.int64)
+    trades = []
+
+    held = np.zeros(n_symbols)
+    entry_price = np.zeros(n_symbols)
+    cash = float(initial_cash)
+    active = 0
+    for bar in np.flatnonzero((buy | sell).any(axis=0)):
+        for symbol in np.flatnonzero(sell[:, bar] & (held > 0)):
+            price = closes[symbol, bar]
+            gain_loss = held[symbol] * (price - entry_price[symbol])
+            cash += held[symbol] * price
+            cash_delta[bar] += held[symbol] * price
+            shares_delta[symbol, bar] -= held[symbol]
+            trades.append((bar, symbol, "sell", held[symbol], price, gain_loss))
+            held[symbol] = 0.0
+            active -= 1
+
+        candidates = np.flatnonzero(buy[:, bar] & (held == 0))
+        if not len(candidates):
+            continue
+        candidates = candidates[np.lexsort((candidates, rsi[candidates, bar]))]
+        for symbol in candidates:
+            if active >= max_active_stocks or cash < investment_per_stock:
+                skipped[bar] += 1
+                continue
+            price = closes[symbol, bar]
+            held[symbol] = investment_per_stock / price
+            entry_price[symbol] = price
+            cash -= investment_per_stock
+            cash_delta[bar] -= investment_per_stock
+            shares_delta[symbol, bar] += held[symbol]
+            trades.append((bar, symbol, "buy", held[symbol], price, 0.0))
+            active += 1
+
+    shares = np.cumsum(shares_delta, axis=1)
+    cash_curve = initial_cash + np.cumsum(cash_delta)
+    # Value holdings at the last close seen, so a symbol's missing bars don't zero it
+    last_close = closes[np.arange(n_symbols)[:, None], _last_index(tradable)]
+    equity = cash_curve + np.where(shares > 0, shares * np.nan_to_num(last_close), 0.0).sum(axis=0)
+
+    final_value = float(equity[-1]) if n_bars else float(initial_cash)
+    total_gain_loss = sum(trade[5] for trade in trades)
+    percentage_return = (final_value - initial_cash) / initial_cash * 100
+    return PortfolioResult(rsi, shares, cash_curve, equity, trades, skipped,
+                           final_value, total_gain_loss, percentage_return)
@@ -1,7 +1,9 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from backtest_engine import run_backtest, run_portfolio_backtest
+from indicators import price_column
+import market_data
 
 # Function to calculate 14-period RSI
 def calculate_rsi(df, period=14):
@@ -16,98 +18,53 @@ def calculate_rsi(df, period=14):
 # Simple function to simulate a backtest with cash value and strategy conditions
 def simple_backtest(symbol, start_date, end_date, initial_cash=10000, investment_per_stock=1000):
     # Download historical data for the backtest period
-    df = yf.download(symbol, start=start_date, end=end_date, progress=False)
+    df = market_data.download(symbol, start=start_date, end=end_date)
     
     if df.empty:
         print(f"No data for {symbol}. Skipping...")
         return None
 
-    # Calculate RSI
-    df = calculate_rsi(df)
-
-    # Initialize the portfolio and cash tracking
-    cash = initial_cash
-    position = 0
-    portfolio_value = cash  # Start with initial cash
-    history = []  # To track the cash and portfolio value at each step
-    buy_price = 0  # To store the price when a buy is made
+    # Run the vectorized engine on this symbol's closes
+    closes = price_column(df).to_numpy(dtype=float)
+    result = run_backtest(closes, initial_cash=initial_cash, investment_per_stock=investment_per_stock)
+    df['RSI'] = result.rsi[0]
 
     print(f"Data for {symbol} from {start_date} to {end_date}:")
-    
-    # Track the number of active positions in the portfolio (max 5)
-    active_stocks = 0
-    max_active_stocks = 5
 
-    total_gain_loss = 0  # Variable to track total gain/loss
-
-    # Loop through the historical data and simulate buying/selling actions
-    for i in range(1, len(df)):
+    # Print the trades found by the engine
+    position = result.shares[0]
+    cash = result.cash[0]
+    for i in np.flatnonzero(result.entries[0] | result.exits[0]):
         current_date = df.index[i]
-        current_close = df['Close'].iloc[i]
-        current_rsi = df['RSI'].iloc[i]
-
-        # Ensure that the values are scalars (not pandas Series)
-        current_close = current_close.item() if isinstance(current_close, pd.Series) else current_close
-        current_rsi = current_rsi.item() if isinstance(current_rsi, pd.Series) else current_rsi
-
-        # Track the portfolio value (cash + value of current holdings)
-        portfolio_value = cash + (position * current_close)
-
-        # Ensure cash is treated as a scalar and no ambiguity occurs
-        if isinstance(cash, pd.Series):
-            cash = cash.item()  # Convert to scalar if it's a Series
-
-        # Buy when RSI is below 30 and there's enough cash to buy
-        if cash >= investment_per_stock and position == 0 and current_rsi < 30 and active_stocks < max_active_stocks:
-            position = investment_per_stock / current_close  # Buy the stock with $1,000 investment
-            buy_price = current_close  # Store the buy price
-            cash -= investment_per_stock  # Deduct $1,000 from cash
-            active_stocks += 1  # Increase the active stock count
-            cash_spent = buy_price * position
-            print(f"\t\033[92mBuy\033[0m at {current_close:.2f} on {current_date}, Position: {position} shares, Cash Spent: \033[91m{cash_spent:.2f}\033[0m")
-
-        # Sell when RSI is above 70
-        elif position > 0 and current_rsi > 70:
-            # Calculate the total cash from selling all shares
-            cash_flow = current_close * position
-            cash += cash_flow  # Add cash to portfolio from the sale
-            gain_loss = (current_close - buy_price) * position  # Calculate the gain/loss on the sale
-            total_gain_loss += gain_loss  # Add this transaction's gain/loss to total
-
-            position = 0  # No position left
-            active_stocks -= 1  # Decrease the active stock count
-
-            # Print the sell result with cash gained
-            if gain_loss > 0:
-                print(f"\t\033[91mSell\033[0m at {current_close:.2f} on {current_date}, \033[92mGain:\033[0m {gain_loss:.2f}, Cash Flow: {cash_flow:.2f}, Total Cash: {cash:.2f}")
-            elif gain_loss < 0:
-                print(f"\t\033[91mSell\033[0m at {current_close:.2f} on {current_date}, \033[91mLoss:\033[0m {abs(gain_loss):.2f}, Cash Flow: {cash_flow:.2f}, Total Cash: {cash:.2f}")
-            else:
-                print(f"\t\033[91mSell\033[0m at {current_close:.2f} on {current_date}, \033[93mNo gain or loss, Cash Flow:\033[0m {cash_flow:.2f}, Total Cash: {cash:.2f}")
-
-        # Append portfolio info for analysis
-        history.append({'date': current_date, 'cash': cash, 'position': position, 'portfolio_value': portfolio_value})
-
-    # In the 'simple_backtest' function, modify the final row calculation
-    final_row = {
-        'date': df.index[-1],  # Last date in the dataset
-        'cash': cash,
-        'position': position,  # Final stock position
-        'portfolio_value': portfolio_value  # Final portfolio value (includes unsold stocks)
-    }
-    history.append(final_row)
-
-    # Calculate the final portfolio value including unsold stocks
-    if position > 0:
-        # Calculate value of unsold stock at the current close price
-        final_portfolio_value = cash + (position * df['Close'].iloc[-1].item())  # Value of unsold stocks + cash
-    else:
-        final_portfolio_value = cash  # If no stocks are left, just return cash
-
-    # Calculate the percentage return
-    percentage_return = ((final_portfolio_value - initial_cash) / initial_cash) * 100
-
-    return pd.DataFrame(history), final_portfolio_value, total_gain_loss, percentage_return  # Return percentage return
+        current_close = closes[i]
+        if result.entries[0, i]:
+            cash_spent = current_close * position[i]
+            print(f"\t\033[92mBuy\033[0m at {current_close:.2f} on {current_date}, Position: {position[i]} shares, Cash Spent: \033[91m{cash_spent:.2f}\033[0m")
+            continue
+
+        cash_flow = current_close * position[i - 1]
+        gain_loss = result.realized[0, i]
+        if gain_loss > 0:
+            print(f"\t\033[91mSell\033[0m at {current_close:.2f} on {current_date}, \033[92mGain:\033[0m {gain_loss:.2f}, Cash Flow: {cash_flow:.2f}, Total Cash: {cash[i]:.2f}")
+        elif gain_loss < 0:
+            print(f"\t\033[91mSell\033[0m at {current_close:.2f} on {current_date}, \033[91mLoss:\033[0m {abs(gain_loss):.2f}, Cash Flow: {cash_flow:.2f}, Total Cash: {cash[i]:.2f}")
+        else:
+            print(f"\t\033[91mSell\033[0m at {current_close:.2f} on {current_date}, \033[93mNo gain or loss, Cash Flow:\033[0m {cash_flow:.2f}, Total Cash: {cash[i]:.2f}")
+
+    # Portfolio info for analysis, one row per bar plus the final row
+    history = pd.DataFrame({
+        'date': df.index[1:],
+        'cash': cash[1:],
+        'position': position[1:],
+        'portfolio_value': result.equity[0, 1:],
+    })
+    history = pd.concat([history, history.tail(1)], ignore_index=True)
+
+    final_portfolio_value = result.final_value[0]
+    total_gain_loss = result.total_gain_loss[0]
+    percentage_return = result.percentage_return[0]
+
+    return history, final_portfolio_value, total_gain_loss, percentage_return  # Return percentage return
 
 # Function to backtest multiple stocks
 def backtest_multiple_stocks(symbols, start_date, end_date, initial_cash=10000, investment_per_stock=1000):
@@ -133,20 +90,64 @@ def backtest_multiple_stocks(symbols, start_date, end_date, initial_cash=10000,
 
     return total_gain_loss_all
 
-# List of symbols to backtest
-symbols = ['DOGE-USD']#['AAPL', 'GOOGL', 'MSFT', 'AMZN', 'NVDA', 'OKLO', 'SOUN', 'BBAI', 'GM', 'JOBY', 'ACHR', 'QUBT', 'QBTS', 'PLTR']
-
-# Set the start and end dates for the backtest period
-start_date = "2024-01-01"
-end_date = "2025-02-07"
-
-# Set initial cash and investment per stock as variables
-initial_cash = 10000  
-investment_per_stock = initial_cash * .2 #20% per max for risk management
+# Backtest all symbols as one portfolio: one cash pool shared by every symbol
+# and at most max_active_stocks open positions. Symbols are aligned on the
+# union of their dates; a symbol with no bar on a date does not trade then.
+def backtest_portfolio(symbols, start_date, end_date, initial_cash=10000, investment_per_stock=1000,
+                       max_active_stocks=5):
+    frames = {symbol: market_data.download(symbol, start=start_date, end=end_date) for symbol in symbols}
+    for symbol in [symbol for symbol, df in frames.items() if df.empty]:
+        print(f"No data for {symbol}. Skipping...")
+        del frames[symbol]
+    if not frames:
+        return None
 
-# Run the backtest
-total_gain_loss_all = backtest_multiple_stocks(symbols, start_date, end_date, initial_cash=initial_cash, investment_per_stock=investment_per_stock)+initial_cash
-annual_growth = ((total_gain_loss_all-initial_cash)/initial_cash)*100
-# Output total portfolio gain/loss from all symbols
-print(f"\nTotal Portfolio Gain/Loss (all symbols): {total_gain_loss_all:.2f}")
-print(f"Annual Growth Rate: {annual_growth:.2f}%")
\ No newline at end of file
+    closes = pd.DataFrame({symbol: price_column(df) for symbol, df in frames.items()})
+    symbols = list(closes.columns)
+    result = run_portfolio_backtest(closes.to_numpy(dtype=float).T, initial_cash=initial_cash,
+                                    investment_per_stock=investment_per_stock,
+                                    max_active_stocks=max_active_stocks)
+
+    print(f"Portfolio of {len(symbols)} symbols from {start_date} to {end_date}, "
+          f"max {max_active_stocks} positions of {investment_per_stock:.2f}:")
+    for bar, symbol, side, shares, price, gain_loss in result.trades:
+        current_date = closes.index[bar]
+        if side == "buy":
+            print(f"\t\033[92mBuy\033[0m {symbols[symbol]} at {price:.2f} on {current_date}, Position: {shares} shares, "
+                  f"Cash: {result.cash[bar]:.2f}")
+        else:
+            color = "\033[92m" if gain_loss > 0 else "\033[91m" if gain_loss < 0 else "\033[93m"
+            print(f"\t\033[91mSell\033[0m {symbols[symbol]} at {price:.2f} on {current_date}, "
+                  f"{color}Gain/Loss:\033[0m {gain_loss:.2f}, Cash: {result.cash[bar]:.2f}")
+    if result.skipped.any():
+        print(f"{int(result.skipped.sum())} buy signals skipped (no cash or all {max_active_stocks} slots in use)")
+
+    history = pd.DataFrame({
+        'date': closes.index,
+        'cash': result.cash,
+        'positions': (result.shares > 0).sum(axis=0),
+        'portfolio_value': result.equity,
+    })
+    return history, result.final_value, result.total_gain_loss, result.percentage_return
+
+if __name__ == "__main__":
+    # List of symbols to backtest
+    symbols = ['DOGE-USD']#['AAPL', 'GOOGL', 'MSFT', 'AMZN', 'NVDA', 'OKLO', 'SOUN', 'BBAI', 'GM', 'JOBY', 'ACHR', 'QUBT', 'QBTS', 'PLTR']
+
+    # Set the start and end dates for the backtest period
+    start_date = "2024-01-01"
+    end_date = "2025-02-07"
+
+    # Set initial cash and investment per stock as variables
+    initial_cash = 10000  
+    investment_per_stock = initial_cash * .2 #20% per max for risk management
+
+    # Run the backtest: all symbols share one cash pool and at most 5 open positions
+    # (backtest_multiple_stocks runs each symbol on its own)
+    portfolio = backtest_portfolio(symbols, start_date, end_date, initial_cash=initial_cash,
+                                   investment_per_stock=investment_per_stock, max_active_stocks=5)
+    total_gain_loss_all = portfolio[1] if portfolio else initial_cash
+    annual_growth = ((total_gain_loss_all-initial_cash)/initial_cash)*100
+    # Output total portfolio gain/loss from all symbols
+    print(f"\nTotal Portfolio Gain/Loss (all symbols): {total_gain_loss_all:.2f}")
+    print(f"Annual Growth Rate: {annual_growth:.2f}%")
@@ -0,0 +1,317 @@
+import numpy as np
+import pandas as pd
+
+from indicators import price_column
+from market_data import FIELDS
+
+# In-memory OHLCV for many symbols as plain NumPy columns. Each field is one
+# (symbols x capacity) array, times are int64 nanoseconds on the wall clock
+# (see frame_arrays), and every row is a ring buffer of the symbol's latest
+# `capacity` bars, so memory per symbol is fixed:
+#
+#     capacity * (8 + len(fields) * itemsize) bytes
+#
+# which for the scanner's close-only float64 store (capacity 256) is 4 KB,
+# about 20 MB for five thousand symbols. Bars go in as arrays through append()
+# or as frames through update(), which flattens yfinance's (Price, Ticker)
+# columns once at the door; only bars newer than the ones held are copied and
+# nothing downstream needs a DataFrame.
+#
+# indicators() computes the check_stocks feature set (RSI, EMA200, MACD,
+# Bollinger) for a set of rows in one pass over the window, each step a
+# handful of vector operations across all the symbols, into work buffers that
+# are allocated on first use and reused by every later call.
+
+DEFAULT_CAPACITY = 256
+
+# Columns of indicators(), in the order check_stocks.latest_indicators uses
+RSI_COLUMNS = ('rsi_14',)
+FULL_COLUMNS = ('rsi_14', 'close', 'ema_200', 'macd_12_26_9', 'macd_signal_12_26_9',
+                'bollinger_upper_20_2', 'bollinger_lower_20_2')
+
+
+# (int64 ns times, (n x fields) float64 values) of an OHLCV frame, bars with
+# no close dropped. Times are wall clock in the frame's own timezone, as in
+# resample.BarAggregator, so daily bars from a download and daily buckets
+# rolled up from minutes land on the same midnight.
+def frame_arrays(frame, fields=FIELDS):
+    if frame is None or frame.empty:
+        return np.empty(0, dtype=np.int64), np.empty((0, len(fields)))
+    values = np.column_stack([
+        price_column(frame, field).to_numpy(dtype=np.float64) if field in frame else np.full(len(frame), np.nan)
+        for field in fields])
+    index = pd.DatetimeIndex(frame.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    keep = ~np.isnan(values[:, list(fields).index('Close')])
+    return index.as_unit('ns').asi8[keep], values[keep]
+
+
+def _span_ns(span):
+    return None if span is None else int(pd.Timedelta(span).value)
+
+
+class BarStore:
+    def __init__(self, capacity=DEFAULT_CAPACITY, fields=FIELDS, dtype=np.float64, reserve=64):
+        if 'Close' not in fields:
+            raise ValueError("A bar store needs the Close field")
+        self.capacity = capacity
+        self.fields = tuple(fields)
+        self.dtype = np.dtype(dtype)
+        self.symbols = []
+        self.rows = {}  # symbol -> row
+        self.times = np.zeros((reserve, capacity), dtype=np.int64)
+        self.values = np.full((len(self.fields), reserve, capacity), np.nan, dtype=self.dtype)
+        self.written = np.zeros(reserve, dtype=np.int64)  # Bars ever written per row
+        self._buffers = {}
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self.rows
+
+    # Bytes held per symbol and in total (the arrays are sized for
+    # len(self.times) rows, which grows by doubling)
+    @property
+    def bytes_per_symbol(self):
+        return self.capacity * (self.times.itemsize + len(self.fields) * self.dtype.itemsize)
+
+    @property
+    def nbytes(self):
+        return self.times.nbytes + self.values.nbytes + self.written.nbytes
+
+    # Row of a symbol, adding it (and growing the arrays) when new
+    def row(self, symbol):
+        row = self.rows.get(symbol)
+        if row is not None:
+            return row
+        row = len(self.symbols)
+        if row == len(self.times):
+            grow = max(row, 1)
+            self.times = np.concatenate([self.times, np.zeros((grow, self.capacity), dtype=np.int64)])
+            self.values = np.concatenate(
+                [self.values, np.full((len(self.fields), grow, self.capacity), np.nan, dtype=self.dtype)], axis=1)
+            self.written = np.concatenate([self.written, np.zeros(grow, dtype=np.int64)])
+        self.rows[symbol] = row
+        self.symbols.append(symbol)
+        return row
+
+    # Append sorted bars (int64 ns times, (n x fields) values) to a symbol;
+    # `fields` names the value columns when they are not the store's own
+    # (e.g. full OHLCV rows into a close-only store). Bars older than the
+    # last one held are ignored and a bar with the same time revises it in
+    # place, so re-sending an overlapping window (with the forming bar
+    # updated) is cheap. Returns how many bars were written.
+    def append(self, symbol, times, values, fields=None):
+        times = np.asarray(times, dtype=np.int64)
+        if not len(times):
+            return 0
+        values = np.asarray(values).reshape(len(times), -1)
+        if fields is not None and tuple(fields) != self.fields:
+            values = values[:, [list(fields).index(field) for field in self.fields]]
+        row = self.row(symbol)
+        written = int(self.written[row])
+        if written:
+            last = self.times[row, (written - 1) % self.capacity]
+            fresh = times >= last
+            times, values = times[fresh], values[fresh]
+            if len(times) and times[0] == last:
+                written -= 1
+        if not len(times):
+            return 0
+        count = len(times)
+        times, values = times[-self.capacity:], values[-self.capacity:]
+        slots = (written + count - len(times) + np.arange(len(times))) % self.capacity
+        self.times[row, slots] = times
+        self.values[:, row, slots] = values.T
+        self.written[row] = written + count
+        return len(times)
+
+    # Append the new bars of an OHLCV frame (yfinance or market_data layout)
+    def update(self, symbol, frame):
+        return self.append(symbol, *frame_arrays(frame, self.fields))
+
+    def update_many(self, frames):
+        return sum(self.update(symbol, frame) for symbol, frame in frames.items())
+
+    # Number of bars currently held per row
+    def counts(self, symbols=None):
+        rows = self._rows(symbols)
+        return np.minimum(self.written[rows], self.capacity)
+
+    def _rows(self, symbols):
+        if symbols is None:
+            return np.arange(len(self.symbols))
+        return np.fromiter((self.rows[symbol] for symbol in symbols), dtype=np.int64, count=len(symbols))
+
+    # A work array of the given shape, a view of one flat buffer per name that
+    # only grows when a bigger shape is asked for
+    def _buffer(self, name, shape, dtype=np.float64):
+        size = int(np.prod(shape))
+        buffer = self._buffers.get((name, dtype))
+        if buffer is None or len(buffer) < size:
+            buffer = self._buffers[(name, dtype)] = np.empty(size, dtype=dtype)
+        return buffer[:size].reshape(shape)
+
+    # Flat positions of the last `length` bars of each row, oldest first, as a
+    # (length x rows) matrix, plus the mask of positions with no bar yet
+    def _positions(self, rows, length):
+        ages = np.arange(length - 1, -1, -1)[:, None]
+        bar = self.written[rows][None, :] - 1 - ages
+        missing = bar < 0
+        return rows[None, :] * self.capacity + bar % self.capacity, missing
+
+    # Last `length` values of a field for each symbol as a float64
+    # (length x symbols) matrix, oldest bar first and right-aligned on each
+    # symbol's latest bar, NaN where a symbol has fewer bars. With `span`
+    # (a timedelta or pandas offset string) bars more than span older than
+    # the symbol's latest bar are NaN too, like a period-trimmed download.
+    # The result lives in a reused buffer unless `out` is given.
+    def window(self, field='Close', length=None, symbols=None, span=None, out=None):
+        rows = self._rows(symbols)
+        length = self.capacity if length is None else min(length, self.capacity)
+        positions, missing = self._positions(rows, length)
+        if out is None:
+            out = self._buffer('window', (length, len(rows)))
+        values = self.values[self.fields.index(field)].reshape(-1)
+        if self.dtype == np.float64:
+            np.take(values, positions, out=out)
+        else:
+            gathered = self._buffer('gather', out.shape, self.dtype)
+            np.take(values, positions, out=gathered)
+            out[...] = gathered
+        span = _span_ns(span)
+        if span is not None and len(rows):
+            times = self._buffer('times', (length, len(rows)), np.int64)
+            np.take(self.times.reshape(-1), positions, out=times)
+            missing |= times <= times[-1] - span
+        out[missing] = np.nan
+        return out
+
+    # Latest value of a field per symbol
+    def latest(self, field='Close', symbols=None):
+        return self.window(field, 1, symbols)[0].copy()
+
+    # The bars held for one symbol as an OHLCV frame, localized to `tz` when
+    # the bars came from a tz-aware source
+    def frame(self, symbol, tz=None):
+        positions, _ = self._positions(np.array([self.rows[symbol]]), int(self.counts([symbol])[0]))
+        positions = positions[:, 0]
+        index = pd.to_datetime(self.times.reshape(-1)[positions], unit='ns')
+        if tz is not None:
+            index = index.tz_localize(tz, ambiguous=True, nonexistent='shift_forward')
+        return pd.DataFrame({field: self.values[i].reshape(-1)[positions].astype(np.float64)
+                             for i, field in enumerate(self.fields)}, index=index)
+
+    def remove(self, symbol):
+        row = self.rows.pop(symbol)
+        last = len(self.symbols) - 1
+        if row != last:
+            # Move the last row into the freed slot
+            moved = self.symbols[last]
+            self.times[row] = self.times[last]
+            self.values[:, row] = self.values[:, last]
+            self.written[row] = self.written[last]
+            self.symbols[row] = moved
+            self.rows[moved] = row
+        self.symbols.pop()
+        self.written[last] = 0
+        self.values[:, last] = np.nan
+
+    # Latest RSI (and with full=True close, EMA200, MACD and Bollinger) per
+    # symbol, one row per symbol, computed over each symbol's bars in the
+    # window (see window() for `span`); symbols holding no bars are left
+    # out. Same formulas as the pandas versions
+    # in check_stocks; the EMAs start at each symbol's first bar in the
+    # window, so hold at least as many bars as the longest lookback needs.
+    def indicators(self, symbols=None, full=True, span=None):
+        symbols = [symbol for symbol in (self.symbols if symbols is None else symbols)
+                   if symbol in self.rows and self.written[self.rows[symbol]]]
+        columns = FULL_COLUMNS if full else RSI_COLUMNS
+        if not symbols:
+            return pd.DataFrame(columns=list(columns), dtype=np.float64)
+        closes = self.window('Close', symbols=symbols, span=span)
+        out = self._buffer('latest', (len(columns), len(symbols)))
+        compute_indicators(closes, out, self._buffer, full)
+        return pd.DataFrame(out.T, index=symbols, columns=list(columns), copy=True)
+
+
+def _ema_step(ema, close, alpha, fresh, scratch):
+    np.isnan(ema, out=fresh)
+    np.multiply(ema, 1 - alpha, out=ema)
+    np.multiply(close, alpha, out=scratch)
+    ema += scratch
+    np.copyto(ema, close, where=fresh)
+
+
+# Indicator kernel over a (bars x symbols) close window whose NaNs only lead
+# each column. Writes the columns of FULL_COLUMNS (RSI_COLUMNS when
+# full=False) into out[k]; buffer(name, shape) hands out reusable work arrays.
+# RSI is ewm(span=14, min_periods=14) of gains/losses (adjust=True; the
+# weights cancel in the gain/loss ratio), the EMAs are adjust=False and the
+# Bollinger bands use the sample std of the last 20 closes.
+def compute_indicators(closes, out, buffer=None, full=True):
+    if buffer is None:
+        def buffer(name, shape, dtype=np.float64):
+            return np.empty(shape, dtype=dtype)
+    length, n = closes.shape
+    last, delta, gain_sum, loss_sum, scratch = buffer('rsi', (5, n))
+    deltas = buffer('deltas', (n,), np.int64)
+    fresh = buffer('fresh', (n,), bool)
+    last[:] = np.nan
+    gain_sum[:] = loss_sum[:] = 0.0
+    deltas[:] = 0
+    if full:
+        ema_200, ema_12, ema_26, macd, signal = emas = buffer('emas', (5, n))
+        emas[:] = np.nan
+    rsi_decay = 1 - 2 / 15
+
+    for close in closes:
+        np.subtract(close, last, out=delta)
+        np.isnan(delta, out=fresh)
+        deltas += ~fresh
+        gain_sum *= rsi_decay
+        loss_sum *= rsi_decay
+        np.fmax(delta, 0.0, out=scratch)
+        gain_sum += scratch
+        np.fmin(delta, 0.0, out=scratch)
+        loss_sum -= scratch
+        last[:] = close
+        if full:
+            _ema_step(ema_200, close, 2 / 201, fresh, scratch)
+            _ema_step(ema_12, close, 2 / 13, fresh, scratch)
+            _ema_step(ema_26, close, 2 / 27, fresh, scratch)
+            np.subtract(ema_12, ema_26, out=macd)
+            _ema_step(signal, macd, 2 / 10, fresh, scratch)
+
+    rsi = out[0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(gain_sum, loss_sum, out=rsi)
+        rsi += 1
+        np.divide(100, rsi, out=rsi)
+        np.subtract(100, rsi, out=rsi)
+    rsi[deltas < 14] = np.nan
+    if not full:
+        return out
+
+    out[1] = last
+    out[2] = ema_200
+    out[3] = macd
+    out[4] = signal
+    upper, lower = out[5], out[6]
+    if length < 20:
+        upper[:] = lower[:] = np.nan
+        return out
+    recent = closes[-20:]
+    deviations = buffer('bollinger', (20, n))
+    np.mean(recent, axis=0, out=scratch)
+    np.subtract(recent, scratch, out=deviations)
+    np.square(deviations, out=deviations)
+    np.sum(deviations, axis=0, out=upper)
+    upper /= 19
+    np.sqrt(upper, out=upper)
+    upper *= 2
+    np.subtract(scratch, upper, out=lower)
+    upper += scratch
+    return out
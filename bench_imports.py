@@ -0,0 +1,91 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Import-time guard for the fast-startup entry points. Each module is imported
+# in a fresh interpreter: it must not pull in any of HEAVY_MODULES, and its
+# median import time (over the bare interpreter start) must stay within its
+# budget. Exits non-zero on a regression so it can gate CI or a pre-commit hook.
+#
+#     python bench_imports.py             # check against the budgets
+#     python bench_imports.py --scale 2   # looser budgets on a slow machine
+
+HEAVY_MODULES = ('pandas', 'numpy', 'yfinance', 'plotly', 'nacl', 'requests', 'aiohttp')
+
+# module -> import budget in milliseconds
+BUDGETS_MS = {
+    'worker': 60,
+    'indicators': 15,
+    'trading_daemon': 60,
+    'rate_limit': 30,
+    'response_cache': 30,
+    'metrics': 20,
+}
+
+_PROBE = """
+import sys, time, json
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{'ms': elapsed * 1000, 'heavy': sorted(m for m in {heavy!r} if m in sys.modules)}}))
+"""
+
+
+def measure(module, runs=5):
+    here = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    heavy = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-c', _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                                cwd=here, capture_output=True, text=True, check=True)
+        probe = json.loads(result.stdout.strip().splitlines()[-1])
+        samples.append(probe['ms'])
+        heavy = probe['heavy']
+    return statistics.median(samples), heavy
+
+
+# Slowest imports under `module`, from python -X importtime
+def top_imports(module, limit=10):
+    here = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=here, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].rstrip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail when startup imports regress.")
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiply every budget')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    failures = 0
+    for module, budget in BUDGETS_MS.items():
+        budget *= args.scale
+        elapsed, heavy = measure(module, args.runs)
+        problems = []
+        if heavy:
+            problems.append(f"imports {', '.join(heavy)}")
+        if elapsed > budget:
+            problems.append(f"over budget ({budget:.0f} ms)")
+        status = "FAIL " + "; ".join(problems) if problems else "ok"
+        print(f"{module:<16} {elapsed:7.1f} ms  {status}")
+        if problems:
+            failures += 1
+            for cumulative, name in top_imports(module):
+                print(f"    {cumulative / 1000:7.1f} ms {name}")
+
+    if failures:
+        print(f"\n{failures} module(s) regressed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
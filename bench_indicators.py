@@ -0,0 +1,294 @@
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import backtest_engine
+import backtest_stocks
+import check_stocks
+from bar_store import BarStore
+from indicators import StreamingBollinger, StreamingEMA, StreamingMACD, StreamingRSI
+
+# Speed and agreement of every indicator implementation in the tree on
+# synthetic OHLCV series. Each indicator has a pandas reference (the first
+# entry) plus the NumPy matrix version from backtest_engine, the bar_store
+# kernel and, where one exists, the streaming class from indicators. Every
+# implementation must match the reference within TOLERANCES (same NaN
+# positions too); a mismatch or a slowdown against a saved baseline exits
+# non-zero.
+#
+#     python bench_indicators.py                          # 1e3 .. 1e6 bars
+#     python bench_indicators.py --sizes 1e7 --save bench_indicators.json
+#     python bench_indicators.py --baseline bench_indicators.json
+#
+# The two RSI formulas in the tree differ on purpose: backtest_stocks (and
+# the NumPy backtests) smooth gains/losses with a simple rolling mean, the
+# bots with ewm(span=period). Wilder's smoothing, ewm(alpha=1/period,
+# adjust=False), is the textbook RSI and is here for comparison.
+
+# indicator -> (rtol, atol) against the reference
+TOLERANCES = {
+    'rsi_sma': (1e-9, 1e-7),
+    'rsi_ema': (1e-9, 1e-7),
+    'rsi_wilder': (1e-9, 1e-7),
+    'ema_200': (1e-9, 1e-9),
+    'macd': (1e-9, 1e-9),
+    # pandas' rolling std is an online update with its own rounding
+    'bollinger': (1e-9, 1e-6),
+}
+
+
+# Mean-reverting log-price walk around 100 with an OHLCV frame around it, so
+# even 1e7 bars stay in a realistic price range. Only Close is used by the
+# indicators; the rest keeps the input shaped like a real download.
+def synthetic_bars(n, seed=0, volatility=0.002, reversion=1e-4):
+    rng = np.random.default_rng(seed)
+    log_price = backtest_engine.linear_recurrence(rng.normal(0, volatility, n), 1 - reversion)[0]
+    close = 100 * np.exp(log_price)
+    spread = close * np.abs(rng.normal(0, volatility, n))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    index = pd.date_range("2020-01-01", periods=n, freq="min", tz="UTC")
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) + spread,
+        'Low': np.minimum(open_, close) - spread,
+        'Close': close,
+        'Volume': rng.integers(1, 10_000, n).astype(float),
+    }, index=index)
+
+
+def _pandas_rsi_sma(df):
+    return backtest_stocks.calculate_rsi(df.copy())['RSI']
+
+
+def _pandas_rsi_ema(df):
+    df = df.copy()
+    check_stocks.calculate_rsi(df)
+    return df['rsi_14']
+
+
+def _pandas_rsi_wilder(df, period=14):
+    delta = df['Close'].diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / period, min_periods=period, adjust=False).mean()
+    loss = (-delta.clip(upper=0)).ewm(alpha=1 / period, min_periods=period, adjust=False).mean()
+    return 100 - (100 / (1 + gain / loss))
+
+
+# EMA, MACD and Bollinger as computed by check_stocks.latest_indicators
+def _pandas_ema(df):
+    return df['Close'].ewm(span=200, adjust=False).mean()
+
+
+def _pandas_macd(df):
+    close = df['Close']
+    macd = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    return macd, macd.ewm(span=9, adjust=False).mean()
+
+
+def _pandas_bollinger(df):
+    close = df['Close']
+    rolling_mean = close.rolling(window=20).mean()
+    rolling_std = close.rolling(window=20).std()
+    return rolling_mean, rolling_mean + rolling_std * 2, rolling_mean - rolling_std * 2
+
+
+def _matrix(function):
+    def run(df):
+        result = function(df['Close'].to_numpy())
+        return tuple(rows[0] for rows in result) if isinstance(result, tuple) else result[0]
+    return run
+
+
+# One update() per close, reading the outputs after each bar, the way the
+# daemon's feature engines see the series
+def _streaming(factory, read):
+    def run(df):
+        indicator = factory()
+        rows = []
+        for close in df['Close'].tolist():
+            indicator.update(close)
+            rows.append(read(indicator))
+        return tuple(np.array(column) for column in zip(*rows))
+    return run
+
+
+# Latest values from bar_store (one symbol, every bar held), checked against
+# the reference's last bar. The kernel steps through the bars with vector
+# operations across symbols, so one long symbol is its slowest case (hence
+# --latest-max).
+def _store(*columns):
+    def run(df):
+        store = BarStore(capacity=len(df), fields=('Close',), reserve=1)
+        store.update('bench', df)
+        latest = store.indicators()
+        return tuple(latest[column].to_numpy() for column in columns)
+    return run
+
+
+def _store_bollinger(df):
+    upper, lower = _store('bollinger_upper_20_2', 'bollinger_lower_20_2')(df)
+    return (upper + lower) / 2, upper, lower
+
+
+# indicator -> [(implementation, kind, function(frame) -> array or tuple of arrays)];
+# the first implementation is the reference
+IMPLEMENTATIONS = {
+    'rsi_sma': [
+        ('backtest_stocks.calculate_rsi', 'pandas', _pandas_rsi_sma),
+        ('backtest_engine.rsi_sma_matrix', 'numpy', _matrix(backtest_engine.rsi_sma_matrix)),
+    ],
+    'rsi_ema': [
+        ('check_stocks.calculate_rsi', 'pandas', _pandas_rsi_ema),
+        ('check_stocks.calculate_rsi_wide', 'pandas',
+         lambda df: check_stocks.calculate_rsi_wide(df[['Close']])['Close']),
+        ('backtest_engine.rsi_ema_matrix', 'numpy', _matrix(backtest_engine.rsi_ema_matrix)),
+        ('indicators.StreamingRSI', 'streaming', _streaming(StreamingRSI, lambda i: (i.value,))),
+        ('bar_store.BarStore.indicators', 'latest', _store('rsi_14')),
+    ],
+    'rsi_wilder': [
+        ('ewm(alpha=1/14, adjust=False)', 'pandas', _pandas_rsi_wilder),
+        ('backtest_engine.rsi_wilder_matrix', 'numpy', _matrix(backtest_engine.rsi_wilder_matrix)),
+    ],
+    'ema_200': [
+        ('ewm(span=200, adjust=False)', 'pandas', _pandas_ema),
+        ('backtest_engine.ema_matrix', 'numpy', _matrix(backtest_engine.ema_matrix)),
+        ('indicators.StreamingEMA', 'streaming', _streaming(StreamingEMA, lambda i: (i.value,))),
+        ('bar_store.BarStore.indicators', 'latest', _store('ema_200')),
+    ],
+    'macd': [
+        ('ewm(span=12/26/9, adjust=False)', 'pandas', _pandas_macd),
+        ('backtest_engine.macd_matrix', 'numpy', _matrix(backtest_engine.macd_matrix)),
+        ('indicators.StreamingMACD', 'streaming', _streaming(StreamingMACD, lambda i: (i.value, i.signal))),
+        ('bar_store.BarStore.indicators', 'latest', _store('macd_12_26_9', 'macd_signal_12_26_9')),
+    ],
+    'bollinger': [
+        ('rolling(20).mean()/.std()', 'pandas', _pandas_bollinger),
+        ('backtest_engine.bollinger_matrix', 'numpy', _matrix(backtest_engine.bollinger_matrix)),
+        ('indicators.StreamingBollinger', 'streaming', _streaming(StreamingBollinger, StreamingBollinger.bands)),
+        ('bar_store.BarStore.indicators', 'latest', _store_bollinger),
+    ],
+}
+
+
+def _columns(result):
+    if not isinstance(result, tuple):
+        result = (result,)
+    return [np.asarray(column, dtype=np.float64) for column in result]
+
+
+# Largest difference from the reference beyond tolerance, or None when every
+# column agrees (NaN where the reference is NaN, close everywhere else)
+def mismatch(indicator, reference, result):
+    rtol, atol = TOLERANCES[indicator]
+    expected, actual = _columns(reference), _columns(result)
+    if len(expected) != len(actual):
+        return f"{len(actual)} outputs, expected {len(expected)}"
+    for column, (want, got) in enumerate(zip(expected, actual)):
+        if want.shape != got.shape:
+            return f"output {column} has shape {got.shape}, expected {want.shape}"
+        if not np.array_equal(np.isnan(want), np.isnan(got)):
+            return f"output {column} has NaNs in different places"
+        if not np.allclose(got, want, rtol=rtol, atol=atol, equal_nan=True):
+            return f"output {column} differs by up to {np.nanmax(np.abs(got - want)):.3g}"
+    return None
+
+
+def _time(function, df, repeat):
+    best, result = math.inf, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(df)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+# Time every implementation at every size; returns ({key: seconds}, failures)
+# keyed "indicator/implementation/bars"
+def run(sizes, indicators=None, repeat=3, streaming_max=100_000, latest_max=10_000):
+    results, failures = {}, []
+    # Warm up every implementation (imports, first-call setup) untimed
+    warmup = synthetic_bars(100)
+    for implementations in IMPLEMENTATIONS.values():
+        for _, _, function in implementations:
+            function(warmup)
+    for n in sizes:
+        df = synthetic_bars(n)
+        print(f"\n{n:,} bars")
+        for indicator, implementations in IMPLEMENTATIONS.items():
+            if indicators and indicator not in indicators:
+                continue
+            reference = None
+            reference_seconds = None
+            for name, kind, function in implementations:
+                if (kind == 'streaming' and n > streaming_max) or (kind == 'latest' and n > latest_max):
+                    continue
+                seconds, result = _time(function, df, 1 if kind == 'streaming' else repeat)
+                if reference is None:
+                    reference, reference_seconds, problem = result, seconds, None
+                elif kind == 'latest':
+                    problem = mismatch(indicator, tuple(column[-1:] for column in _columns(reference)), result)
+                else:
+                    problem = mismatch(indicator, reference, result)
+                results[f"{indicator}/{name}/{n}"] = seconds
+                status = "ok" if problem is None else f"MISMATCH {problem}"
+                if problem is not None:
+                    failures.append(f"{indicator} {name} at {n:,} bars: {problem}")
+                print(f"  {indicator:<10} {kind:<9} {name:<34} {seconds * 1e3:10.2f} ms "
+                      f"{reference_seconds / seconds:7.2f}x  {status}")
+    return results, failures
+
+
+# Keys more than `slowdown` times and `noise` seconds slower than in the
+# baseline (sub-millisecond timings jitter by more than any sane slowdown)
+def regressions(results, baseline, slowdown=1.5, noise=1e-3):
+    slower = []
+    for key, seconds in results.items():
+        before = baseline.get(key)
+        if before and seconds > before * slowdown and seconds - before > noise:
+            slower.append(f"{key}: {seconds * 1e3:.2f} ms, was {before * 1e3:.2f} ms")
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark and cross-check every indicator implementation.")
+    parser.add_argument('--sizes', default="1e3,1e4,1e5,1e6",
+                        help='Comma-separated bar counts, e.g. 1e3,1e5,1e7')
+    parser.add_argument('--indicators', help=f'Comma-separated subset of {", ".join(IMPLEMENTATIONS)}')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per implementation; the best is kept')
+    parser.add_argument('--streaming-max', type=float, default=1e5,
+                        help='Largest series to feed bar by bar to the streaming classes')
+    parser.add_argument('--latest-max', type=float, default=1e4,
+                        help='Largest single-symbol window to run through the bar_store kernel')
+    parser.add_argument('--save', metavar='PATH', help='Write the timings to PATH (JSON)')
+    parser.add_argument('--baseline', metavar='PATH', help='Fail when slower than the timings saved in PATH')
+    parser.add_argument('--slowdown', type=float, default=1.5, help='Allowed slowdown against the baseline')
+    args = parser.parse_args()
+
+    sizes = [int(float(size)) for size in args.sizes.split(',')]
+    indicators = args.indicators.split(',') if args.indicators else None
+    results, failures = run(sizes, indicators, args.repeat, int(args.streaming_max), int(args.latest_max))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['seconds']
+        failures += [f"slower: {line}" for line in regressions(results, baseline, args.slowdown)]
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+                       'machine': platform.machine(), 'seconds': results}, f, indent=1, sort_keys=True)
+        print(f"\nTimings written to {args.save}")
+
+    if failures:
+        print(f"\n{len(failures)} problem(s):")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from orders import OrderManager
+from risk import RiskEngine
+
+# Latency guard for the pre-trade risk layer. Measures, in microseconds:
+#   approve  RiskEngine.approve (every check plus the reservation) against a
+#            book of 50 held symbols with every notional limit switched on
+#   submit   OrderManager.submit end to end (risk checks, SQLite writes and
+#            fill bookkeeping) with a client that answers instantly, i.e.
+#            everything the order path adds on top of the HTTP request;
+#            it also fails outright if submit calls get_account itself
+# Exits non-zero when a p99 is over its budget.
+#
+#     python bench_risk.py              # check against the budgets
+#     python bench_risk.py --scale 2    # looser budgets on a slow machine
+
+# benchmark -> p99 budget in microseconds
+BUDGETS_US = {
+    'approve': 100,
+    'submit': 1000,
+}
+
+
+# Fills every market order instantly at a fixed price, without a network.
+# Counts get_account calls made on the main thread: submit must never wait
+# on one (buying power is refreshed in the background).
+class _InstantClient:
+    def __init__(self, price=100.0):
+        self.price = price
+        self.blocking_account_calls = 0
+
+    def get_account(self):
+        if threading.current_thread() is threading.main_thread():
+            self.blocking_account_calls += 1
+        return {"buying_power": "1e12"}
+
+    def get_holdings(self, *asset_codes):
+        return {"results": []}
+
+    def place_order(self, client_order_id, side, order_type, symbol, order_config):
+        quantity = order_config["asset_quantity"]
+        return {"id": str(uuid.uuid4()), "client_order_id": client_order_id, "side": side, "type": order_type,
+                "symbol": symbol, "state": "filled", "filled_asset_quantity": quantity,
+                "average_price": str(self.price)}
+
+
+class _Book:
+    def __init__(self, positions):
+        self._positions = positions
+
+    def position(self, symbol):
+        return self._positions.get(symbol, 0.0)
+
+    def positions(self):
+        return dict(self._positions)
+
+
+def _engine(book, symbols):
+    engine = RiskEngine(book, max_order_notional=1e9, max_symbol_notional=1e12, max_total_notional=1e15,
+                        max_orders_per_window=None, max_symbol_orders_per_window=None)
+    engine.buying_power = 1e12
+    for symbol in symbols:
+        engine.mark(symbol, 100.0)
+    return engine
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def bench_approve(runs, held=50):
+    symbols = [f"S{i}-USD" for i in range(held)]
+    engine = _engine(_Book({symbol: 10.0 for symbol in symbols}), symbols)
+    samples = []
+    for n in range(runs):
+        client_order_id = str(n)
+        side = "buy" if n % 2 else "sell"
+        started = time.perf_counter()
+        engine.approve(client_order_id, side, symbols[n % held], 1, 100.0)
+        samples.append((time.perf_counter() - started) * 1e6)
+        engine.release(client_order_id)
+    return _percentiles(samples)
+
+
+def bench_submit(runs, held=50):
+    symbols = [f"S{i}-USD" for i in range(held)]
+    with tempfile.TemporaryDirectory() as directory:
+        manager = OrderManager(_InstantClient(), os.path.join(directory, "orders.db"), reconcile_interval=3600)
+        manager.risk = _engine(manager, symbols)
+        samples = []
+        try:
+            for n in range(runs):
+                side = "buy" if n % 2 == 0 else "sell"
+                started = time.perf_counter()
+                order = manager.submit(side, symbols[(n // 2) % held], "1", price=100.0)
+                samples.append((time.perf_counter() - started) * 1e6)
+                if order is None:
+                    raise RuntimeError("benchmark order was rejected")
+        finally:
+            manager.close()
+    if manager.client.blocking_account_calls:
+        raise RuntimeError("submit called get_account on the order path")
+    return _percentiles(samples)
+
+
+BENCHMARKS = {
+    'approve': bench_approve,
+    'submit': bench_submit,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail when the pre-trade risk layer gets slow.")
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiply every budget')
+    parser.add_argument('--runs', type=int, default=5000)
+    args = parser.parse_args()
+
+    failures = 0
+    for name, budget in BUDGETS_US.items():
+        budget *= args.scale
+        p50, p99 = BENCHMARKS[name](args.runs)
+        status = "ok" if p99 <= budget else f"FAIL over budget ({budget:.0f} us)"
+        print(f"{name:<8} p50 {p50:8.1f} us  p99 {p99:8.1f} us  {status}")
+        if p99 > budget:
+            failures += 1
+
+    if failures:
+        print(f"\n{failures} benchmark(s) regressed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import json
+import os
+import re
+import time
+
+import numpy as np
+
+# Price + RSI charts written to static files instead of fig.show(). Figures
+# are built as plain plotly JSON (no plotly import, no figure validation)
+# from series decimated to at most `max_points` points, so a day of 1-minute
+# bars for a hundred symbols renders in well under a second.
+#
+# A ChartDashboard is a directory holding index.html plus one small script
+# per symbol under data/. update() only rewrites the scripts of symbols whose
+# bars changed, and the open page reloads those scripts on a timer and redraws
+# in place (Plotly.react), so one browser tab follows every tick.
+
+DEFAULT_CHART_DIR = os.getenv(
+    "CHART_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "charts"))
+
+PLOTLY_JS = "https://cdn.plot.ly/plotly-2.35.2.min.js"
+
+MAX_POINTS = 2000
+
+
+# Bucket boundaries splitting n points into at most `buckets` runs
+def _bucket_starts(n, buckets):
+    size = max(-(-n // max(buckets, 1)), 1)
+    return np.arange(0, n, size)
+
+
+# Indices of the min and max of each bucket, in time order (at most
+# max_points of them), so spikes survive decimation. All-NaN buckets are
+# dropped.
+def minmax_indices(values, max_points=MAX_POINTS):
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n <= max_points:
+        return np.arange(n)
+    size = -(-n // max(max_points // 2, 1))
+    buckets = -(-n // size)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = values
+    padded = padded.reshape(buckets, size)
+    missing = np.isnan(padded)
+    offsets = np.arange(buckets) * size
+    low_at = np.where(missing, np.inf, padded).argmin(axis=1) + offsets
+    high_at = np.where(missing, -np.inf, padded).argmax(axis=1) + offsets
+    keep = ~missing.all(axis=1)
+    return np.unique(np.concatenate([low_at[keep], high_at[keep]]))
+
+
+# OHLC bars merged into at most max_points wider bars (first open, highest
+# high, lowest low, last close), which keeps every extreme visible.
+# Returns (bar start positions, open, high, low, close).
+def decimate_bars(open_, high, low, close, max_points=MAX_POINTS):
+    n = len(close)
+    if n <= max_points:
+        return np.arange(n), open_, high, low, close
+    starts = _bucket_starts(n, max_points)
+    ends = np.append(starts[1:], n) - 1
+    return (starts, open_[starts], np.fmax.reduceat(high, starts), np.fmin.reduceat(low, starts), close[ends])
+
+
+# RSI from ewm(span=period) of gains/losses, as in the RSI scripts
+def rsi_series(close, period=14):
+    delta = close.diff()
+    gain = delta.clip(lower=0).ewm(span=period, min_periods=period).mean()
+    loss = (-delta.clip(upper=0)).ewm(span=period, min_periods=period).mean()
+    return 100 - (100 / (gain / loss + 1))
+
+
+def _values(array):
+    array = np.asarray(array, dtype=np.float64)
+    return [None if value != value else value for value in array.round(8).tolist()]
+
+
+# Plotly figure (a plain dict) of candlesticks and the RSI on a second axis,
+# styled like the rsi_minutes / rsi_history charts. Times are epoch
+# milliseconds (UTC) on a date axis.
+def price_rsi_figure(symbol, df, rsi=None, title=None, max_points=MAX_POINTS):
+    from indicators import price_column
+    open_, high, low, close = (price_column(df, name).to_numpy(dtype=np.float64)
+                               for name in ('Open', 'High', 'Low', 'Close'))
+    times = df.index.as_unit('ms').asi8
+    if rsi is None:
+        rsi = rsi_series(price_column(df, 'Close'))
+    rsi = np.asarray(rsi, dtype=np.float64)
+
+    starts, open_, high, low, close = decimate_bars(open_, high, low, close, max_points)
+    rsi_at = minmax_indices(rsi, max_points)
+    return {
+        'data': [
+            {'type': 'candlestick', 'name': 'Price', 'x': times[starts].tolist(),
+             'open': _values(open_), 'high': _values(high), 'low': _values(low), 'close': _values(close)},
+            {'type': 'scatter', 'mode': 'lines', 'name': 'RSI', 'x': times[rsi_at].tolist(),
+             'y': _values(rsi[rsi_at]), 'line': {'color': 'orange', 'width': 2}, 'yaxis': 'y2'},
+        ],
+        'layout': {
+            'title': {'text': title or f'{symbol} Price and RSI'},
+            'xaxis': {'title': {'text': 'Date'}, 'type': 'date', 'rangeslider': {'visible': False}},
+            'yaxis': {'title': {'text': 'Price'}},
+            'yaxis2': {'title': {'text': 'RSI'}, 'overlaying': 'y', 'side': 'right'},
+            'uirevision': symbol,  # Keep the user's zoom across redraws
+        },
+    }
+
+
+def _write(path, text):
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as f:
+        f.write(text)
+    os.replace(temporary, path)
+
+
+_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="{plotly}"></script>
+<style>body {{ font-family: sans-serif; margin: 0 }} .chart {{ height: {height}px }}</style>
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+_DASHBOARD_SCRIPT = """<script>
+var FILES = {files};
+window.renderChart = function (id, figure) {{
+  Plotly.react(document.getElementById(id), figure.data, figure.layout, {{responsive: true}});
+}};
+function load(file) {{
+  var script = document.createElement('script');
+  script.src = 'data/' + file + '.js?' + Date.now();
+  script.onload = script.onerror = function () {{ script.remove(); }};
+  document.body.appendChild(script);
+}}
+function refresh() {{ FILES.forEach(load); }}
+refresh();
+setInterval(refresh, {refresh_ms});
+</script>"""
+
+
+# One figure in a standalone HTML file
+def write_html(path, figure, height=600):
+    body = (f'<div id="chart" class="chart"></div>\n<script>\nvar figure = {json.dumps(figure)};\n'
+            f'Plotly.newPlot("chart", figure.data, figure.layout, {{responsive: true}});\n</script>')
+    _write(path, _PAGE.format(title=figure['layout']['title']['text'], plotly=PLOTLY_JS, height=height,
+                              body=body))
+    return path
+
+
+# Many figures to PNG in one batch (one kaleido session). Needs the plotly
+# and kaleido packages; returns the paths written.
+def write_images(figures, directory, width=1200, height=600):
+    try:
+        import plotly.io as pio
+    except ImportError:
+        print("PNG charts need plotly and kaleido (pip install plotly kaleido)")
+        return []
+    os.makedirs(directory, exist_ok=True)
+    paths = [os.path.join(directory, f"{_file_name(symbol)}.png") for symbol in figures]
+    figures = list(figures.values())
+    if hasattr(pio, "write_images"):
+        pio.write_images(figures, paths, width=width, height=height)
+    else:
+        for figure, path in zip(figures, paths):
+            pio.write_image(figure, path, width=width, height=height)
+    return paths
+
+
+def _file_name(symbol):
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', symbol)
+
+
+# Incrementally updated HTML dashboard of price + RSI charts, one per symbol
+class ChartDashboard:
+    def __init__(self, directory=DEFAULT_CHART_DIR, max_points=MAX_POINTS, refresh=30, height=450,
+                 title="Price and RSI"):
+        self.directory = directory
+        self.max_points = max_points
+        self.refresh = refresh
+        self.height = height
+        self.title = title
+        self.path = os.path.join(directory, "index.html")
+        self.symbols = []
+        self.renders = 0
+        self._signatures = {}  # symbol -> (bars, last timestamp, last close) last written
+        os.makedirs(os.path.join(directory, "data"), exist_ok=True)
+
+    @staticmethod
+    def _signature(df):
+        if df.empty:
+            return 0, None, None
+        from indicators import price_column
+        return len(df), df.index[-1], float(price_column(df, 'Close').iloc[-1])
+
+    # Render every changed frame ({symbol: OHLCV frame}); returns how many
+    # chart files were rewritten
+    def update(self, frames, title_suffix=""):
+        written = 0
+        for symbol, df in frames.items():
+            if df is None or df.empty:
+                continue
+            signature = self._signature(df)
+            if self._signatures.get(symbol) == signature:
+                continue
+            figure = price_rsi_figure(symbol, df, title=f"{symbol} Price and RSI {title_suffix}".rstrip(),
+                                      max_points=self.max_points)
+            name = _file_name(symbol)
+            script = f"window.renderChart({json.dumps(name)}, {json.dumps(figure, separators=(',', ':'))});\n"
+            _write(os.path.join(self.directory, "data", f"{name}.js"), script)
+            self._signatures[symbol] = signature
+            self.renders += 1
+            written += 1
+            if symbol not in self.symbols:
+                self.symbols.append(symbol)
+                self._write_index()
+        return written
+
+    # The page itself only changes when a symbol is added
+    def _write_index(self):
+        files = [_file_name(symbol) for symbol in self.symbols]
+        body = "\n".join(f'<div id="{name}" class="chart"></div>' for name in files)
+        body += "\n" + _DASHBOARD_SCRIPT.format(files=json.dumps(files), refresh_ms=int(self.refresh * 1000))
+        _write(self.path, _PAGE.format(title=self.title, plotly=PLOTLY_JS, height=self.height, body=body))
+
+    # trading_daemon 'bars' handler: (jobs, frame)
+    def on_bars(self, jobs, frame):
+        self.update({jobs[0].symbol: frame}, time.strftime('%Y-%m-%d %H:%M:%S'))
+
+    def attach(self, daemon):
+        daemon.on('bars', self.on_bars)
+        return self
@@ -1,7 +1,15 @@
-import yfinance as yf
+import argparse
+import re
+import numpy as np
 import pandas as pd
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
+import market_data
+from market_data import FIELDS
+from bar_store import DEFAULT_CAPACITY, BarStore, frame_arrays
+from resample import BarAggregator
+from strategies import get_strategy
 
 # Function to calculate RSI
 def calculate_rsi(df, rsi_period=14):
@@ -22,101 +30,313 @@ def calculate_rsi(df, rsi_period=14):
     return df['rsi_14'].iloc[-1]  # Return the latest RSI value
 
 
+# Timeframes used by the scan: name -> (period, interval)
+TIMEFRAMES = {
+    'monthly': ("200d", "1d"),
+    'weekly': ("1wk", "5m"),
+    'daily': ("1d", "1m"),
+}
+
+# Every timeframe is rolled up from one 1-minute download per batch. yfinance
+# only serves a week of 1-minute bars, so the monthly timeframe still needs a
+# daily download for its older history; the days the minutes cover come from
+# the roll-up, so all three timeframes agree on the latest price.
+MINUTE_PERIOD = "7d"
+DOWNLOADS = {'minutes': (MINUTE_PERIOD, "1m"), 'history': TIMEFRAMES['monthly']}
+
+# Kept at module level so a long-running worker only folds in new minutes.
+# The stores below never hold more than DEFAULT_CAPACITY bars per timeframe,
+# so that is all the aggregator needs to keep.
+aggregator = BarAggregator(intervals=('1m', '5m', '1d'), max_bars=DEFAULT_CAPACITY)
+
+# Closes per timeframe, also kept across scans: each scan appends only the
+# bars it has not seen and computes the indicators over the period window
+# (see bar_store.BarStore). 256 bars hold the 200-day window of daily bars,
+# and weekly/daily RSI over the last 256 bars matches a week of 5-minute bars
+# to well below printing precision (older gains decay by (13/15) ** 256).
+stores = {name: BarStore(fields=('Close',)) for name in TIMEFRAMES}
+
+
+# RSI for every column of a wide close frame, same formula as calculate_rsi
+def calculate_rsi_wide(closes, rsi_period=14):
+    delta = closes.diff()
+    ema_gain = delta.clip(lower=0).ewm(span=rsi_period, min_periods=rsi_period).mean()
+    ema_loss = (-delta.clip(upper=0)).ewm(span=rsi_period, min_periods=rsi_period).mean()
+    rs = ema_gain / ema_loss
+    return 100 - (100 / (rs + 1))
+
+
+# Latest indicator values for a batch of symbols, one row per symbol. With
+# full=False only the RSI is computed (the weekly and daily timeframes).
+# Every bar of every frame is used; the scan itself goes through `stores`.
+def latest_indicators(frames, full=True):
+    frames = {symbol: df for symbol, df in frames.items() if not df.empty}
+    if not frames:
+        return pd.DataFrame()
+    store = BarStore(capacity=max(len(df) for df in frames.values()), fields=('Close',), reserve=len(frames))
+    store.update_many(frames)
+    return store.indicators(full=full)
+
+
 def fetch_and_analyze(symbol):
-    # Get the current timestamp
+    actions, _ = scan_symbols([symbol])
+    return actions[symbol]
+
+
+# Print the indicator summary and return "buy", "sell" or "hold" for one symbol
+def evaluate_signal(symbol, monthly, weekly, daily, current_timestamp):
+    action, message = get_strategy('rsi_trend').evaluate(monthly)
+    if action == "hold":
+        return action
+
+    # Print values for all timeframes
+    print(f"\t{symbol} Latest RSI monthly: {monthly['rsi_14']:.4f}, Weekly: {weekly['rsi_14']:.4f}, daily: {daily['rsi_14']:.4f}")
+    print(f"\t{symbol} Latest 200-day EMA: {monthly['ema_200']:.4f}, MACD: {monthly['macd_12_26_9']:.4f}, Signal: {monthly['macd_signal_12_26_9']:.4f}")
+    print(f"\t{symbol} Bollinger Bands - Upper: {monthly['bollinger_upper_20_2']:.4f}, Lower: {monthly['bollinger_lower_20_2']:.4f}")
+    color = "\033[92m" if action == "buy" else "\033[91m"
+    print(f"\t{color}{symbol}: {message} (Timestamp: {current_timestamp})\033[0m")
+    return action
+
+
+# Roll a batch's 1-minute bars up into the weekly and daily stores and
+# return their latest RSI, each over its timeframe's period
+def _rollup_indicators(symbols, minutes):
+    for symbol in symbols:
+        if symbol in minutes:
+            aggregator.update(symbol, minutes[symbol])
+    latest = {}
+    for name in ('weekly', 'daily'):
+        period, interval = TIMEFRAMES[name]
+        for symbol in symbols:
+            stores[name].append(symbol, *aggregator.arrays(symbol, interval), fields=FIELDS)
+        latest[name] = stores[name].indicators(symbols, full=False, span=market_data.parse_span(period))
+    return latest
+
+
+# Daily history with the days the 1-minute stream covers replaced by the
+# roll-up (as in BarAggregator.extend, on arrays)
+def _monthly_indicators(history):
+    store = stores['monthly']
+    for symbol, frame in history.items():
+        times, values = frame_arrays(frame)
+        rolled_times, rolled = aggregator.arrays(symbol, '1d')
+        if len(rolled_times):
+            # The oldest roll-up bucket may only cover part of its day
+            first = 1 if len(times) else 0
+            older = times <= rolled_times[0]
+            times = np.concatenate([times[older], rolled_times[first:]])
+            values = np.concatenate([values[older], rolled[first:]])
+        store.append(symbol, times, values, fields=FIELDS)
+    return store.indicators(list(history), span=market_data.parse_span(TIMEFRAMES['monthly'][0]))
+
+
+def _download_batch(symbols, period, interval):
+    started = time.perf_counter()
+    frames = market_data.download_many(symbols, period=period, interval=interval)
+    return frames, time.perf_counter() - started
+
+
+# Scan a watchlist: every (download, batch) runs on a bounded thread pool and
+# the indicators for a batch are computed as soon as its data arrives, so CPU
+# work overlaps the downloads still in flight. Returns {symbol: action}
+# (None when a symbol has no data) and the time spent in each phase.
+def scan_symbols(symbols, batch_size=100, workers=4):
     current_timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    timings = {'download': 0.0, 'indicators': 0.0, 'signals': 0.0}
+    started = time.perf_counter()
 
-    # Download data for different timeframes (monthly, weekly, daily)
-    try:
-        df_monthly = yf.download(symbol, period="200d", interval="1d", progress=False)  # monthly data
-        df_weekly = yf.download(symbol, period="1wk", interval="5m", progress=False)  # Weekly data
-        df_daily = yf.download(symbol, period="1d", interval="1m", progress=False)  # daily data
-    except Exception as e:
-        print(f"Error fetching data for {symbol}: {e}")
-        return None  # Skip if there's an error in fetching the data
-
-    if df_monthly.empty or df_weekly.empty or df_daily.empty:
-        print(f"No data for {symbol}. Skipping...")
-        return None  # Skip if no data
-
-    # Calculate RSI for monthly, weekly, and daily
-    latest_rsi_monthly = calculate_rsi(df_monthly)
-    latest_rsi_weekly = calculate_rsi(df_weekly)
-    latest_rsi_daily = calculate_rsi(df_daily)
-    
-    # Calculate 200-Day Exponential Moving Average (EMA)
-    df_monthly['ema_200'] = df_monthly['Close'].ewm(span=200, adjust=False).mean()
-
-    # Calculate MACD (Moving Average Convergence Divergence)
-    df_monthly['ema_12'] = df_monthly['Close'].ewm(span=12, adjust=False).mean()
-    df_monthly['ema_26'] = df_monthly['Close'].ewm(span=26, adjust=False).mean()
-    df_monthly['macd'] = df_monthly['ema_12'] - df_monthly['ema_26']
-    df_monthly['macd_signal'] = df_monthly['macd'].ewm(span=9, adjust=False).mean()
-
-    # Calculate Bollinger Bands
-    df_monthly['rolling_mean'] = df_monthly['Close'].rolling(window=20).mean()
-    df_monthly['rolling_std'] = df_monthly['Close'].rolling(window=20).std()
-    df_monthly['bollinger_upper'] = df_monthly['rolling_mean'] + (df_monthly['rolling_std'] * 2)
-    df_monthly['bollinger_lower'] = df_monthly['rolling_mean'] - (df_monthly['rolling_std'] * 2)
-
-    # Get the latest values for all indicators
-    latest_ema_200 = df_monthly['ema_200'].iloc[-1].item()  # Access last element and ensure it's a scalar
-    latest_macd = df_monthly['macd'].iloc[-1].item()  # Access last element and ensure it's a scalar
-    latest_macd_signal = df_monthly['macd_signal'].iloc[-1].item()  # Access last element and ensure it's a scalar
-    latest_bollinger_upper = df_monthly['bollinger_upper'].iloc[-1].item()  # Access last element and ensure it's a scalar
-    latest_bollinger_lower = df_monthly['bollinger_lower'].iloc[-1].item()  # Access last element and ensure it's a scalar
-    latest_close = df_monthly['Close'].iloc[-1].item()  # Access last element and ensure it's a scalar
-
-    # Check for Buy/Sell conditions
-    if latest_rsi_monthly < 30 and latest_close > latest_ema_200 and latest_macd > latest_macd_signal:
-        # Print values for all timeframes
-        print(f"\t{symbol} Latest RSI monthly: {latest_rsi_monthly:.4f}, Weekly: {latest_rsi_weekly:.4f}, daily: {latest_rsi_daily:.4f}")
-        print(f"\t{symbol} Latest 200-day EMA: {latest_ema_200:.4f}, MACD: {latest_macd:.4f}, Signal: {latest_macd_signal:.4f}")
-        print(f"\t{symbol} Bollinger Bands - Upper: {latest_bollinger_upper:.4f}, Lower: {latest_bollinger_lower:.4f}")
-        print(f"\t\033[92m{symbol}: Buy signal! RSI below 30, above 200-day EMA, MACD bullish crossover. (Timestamp: {current_timestamp})\033[0m")
-        return "buy"
-        
-    elif latest_rsi_monthly > 70 and latest_close < latest_ema_200 and latest_macd < latest_macd_signal:
-        # Print values for all timeframes
-        print(f"\t{symbol} Latest RSI monthly: {latest_rsi_monthly:.4f}, Weekly: {latest_rsi_weekly:.4f}, daily: {latest_rsi_daily:.4f}")
-        print(f"\t{symbol} Latest 200-day EMA: {latest_ema_200:.4f}, MACD: {latest_macd:.4f}, Signal: {latest_macd_signal:.4f}")
-        print(f"\t{symbol} Bollinger Bands - Upper: {latest_bollinger_upper:.4f}, Lower: {latest_bollinger_lower:.4f}")
-        print(f"\t\033[91m{symbol}: Sell signal! RSI above 70, below 200-day EMA, MACD bearish crossover. (Timestamp: {current_timestamp})\033[0m")
-        return "sell"
-
-    # Check for Bollinger Bands breakout conditions
-    elif latest_close > latest_bollinger_upper:
-        # Print values for all timeframes
-        print(f"\t{symbol} Latest RSI monthly: {latest_rsi_monthly:.4f}, Weekly: {latest_rsi_weekly:.4f}, daily: {latest_rsi_daily:.4f}")
-        print(f"\t{symbol} Latest 200-day EMA: {latest_ema_200:.4f}, MACD: {latest_macd:.4f}, Signal: {latest_macd_signal:.4f}")
-        print(f"\t{symbol} Bollinger Bands - Upper: {latest_bollinger_upper:.4f}, Lower: {latest_bollinger_lower:.4f}")
-        print(f"\t\033[91m{symbol}: Sell signal! Price above upper Bollinger Band. Possible overbought condition. (Timestamp: {current_timestamp})\033[0m")
-        return "sell"
-    elif latest_close < latest_bollinger_lower:
-        # Print values for all timeframes
-        print(f"\t{symbol} Latest RSI monthly: {latest_rsi_monthly:.4f}, Weekly: {latest_rsi_weekly:.4f}, daily: {latest_rsi_daily:.4f}")
-        print(f"\t{symbol} Latest 200-day EMA: {latest_ema_200:.4f}, MACD: {latest_macd:.4f}, Signal: {latest_macd_signal:.4f}")
-        print(f"\t{symbol} Bollinger Bands - Upper: {latest_bollinger_upper:.4f}, Lower: {latest_bollinger_lower:.4f}")
-        print(f"\t\033[92m{symbol}: Buy signal! Price below lower Bollinger Band. Possible oversold condition. (Timestamp: {current_timestamp})\033[0m")
-        return "buy"
-    else:
-        return "hold"
+    batches = [symbols[i:i + batch_size] for i in range(0, len(symbols), batch_size)]
+    latest = {name: [] for name in TIMEFRAMES}
+    histories = {}  # batch number -> daily frames waiting for that batch's minutes
+    rolled_up = set()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_download_batch, batch, period, interval): (name, number)
+                   for name, (period, interval) in DOWNLOADS.items() for number, batch in enumerate(batches)}
+        for future in as_completed(futures):
+            name, number = futures[future]
+            try:
+                frames, elapsed = future.result()
+            except Exception as e:
+                print(f"Error fetching {name} data: {e}")
+                continue
+            timings['download'] += elapsed
 
+            phase_started = time.perf_counter()
+            if name == 'minutes':
+                for timeframe, table in _rollup_indicators(batches[number], frames).items():
+                    latest[timeframe].append(table)
+                rolled_up.add(number)
+            else:
+                histories[number] = frames
+            # The monthly frame needs both downloads of the batch
+            if number in rolled_up and number in histories:
+                latest['monthly'].append(_monthly_indicators(histories.pop(number)))
+            timings['indicators'] += time.perf_counter() - phase_started
 
-def analyze_multiple_symbols(symbols):
+    # Batches whose minute download failed still get their monthly row
+    for history in histories.values():
+        latest['monthly'].append(_monthly_indicators(history))
+
+    phase_started = time.perf_counter()
+    tables = {name: pd.concat(parts) if parts else pd.DataFrame() for name, parts in latest.items()}
+    actions = {}
     for symbol in symbols:
-        action = fetch_and_analyze(symbol)
+        if any(symbol not in table.index for table in tables.values()):
+            print(f"No data for {symbol}. Skipping...")
+            actions[symbol] = None
+            continue
+        actions[symbol] = evaluate_signal(symbol, tables['monthly'].loc[symbol], tables['weekly'].loc[symbol],
+                                          tables['daily'].loc[symbol], current_timestamp)
+    timings['signals'] = time.perf_counter() - phase_started
+    timings['total'] = time.perf_counter() - started
+    return actions, timings
+
+
+def analyze_multiple_symbols(symbols):
+    actions, timings = scan_symbols(symbols)
+    for symbol, action in actions.items():
         if action:
             if action != "hold":
                 print(f"{symbol}: {action}")
         else:
             print(f"No action for {symbol}")
 
+    # Download time is summed over the worker threads, so it can exceed the total
+    print(f"Scanned {len(symbols)} symbols in {timings['total']:.2f}s "
+          f"(download {timings['download']:.2f}s, indicators {timings['indicators']:.2f}s, "
+          f"signals {timings['signals']:.2f}s)")
+
 # List of symbols to analyze
 symbols_to_analyze = ['AAPL', 'GOOGL', 'MSFT', 'AMZN', 'NVDA', 'OKLO', 'SOUN', 'BBAI', 'WW', 'GM', 'JOBY', 'ACHR', 'APLD', 'QUBT', 'QBTS', 'ARBE', 'PLTR']
 
-# Run the analysis on all symbols in the list
-# while True:
-#     print("Starting a new iteration...")
-analyze_multiple_symbols(symbols_to_analyze)
-#     time.sleep(60)  # Sleep for 60 seconds (1 minute) before fetching again
+# Ticker-shaped first fields (drops headers, footers and free text)
+_TICKER = re.compile(r'[A-Z0-9][A-Z0-9.^=-]*')
+
+
+# Tickers from a universe file: one per line, or a delimited listing (comma,
+# tab or '|' separated, e.g. an exchange's nasdaqlisted.txt) with the ticker
+# in its Symbol / Ticker column, else the first one. Blank lines and '#'
+# comments are skipped and duplicates keep their first position.
+def load_universe(path):
+    symbols = {}
+    column = 0
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            delimiter = next((d for d in '|,\t' if d in line), None)
+            fields = [field.strip().strip('"') for field in line.split(delimiter)] if delimiter else line.split()
+            names = [field.lower() for field in fields]
+            header = next((i for i, name in enumerate(names) if name in ('symbol', 'ticker', 'act symbol')), None)
+            if header is not None:
+                column = header
+                continue
+            if column < len(fields) and _TICKER.fullmatch(fields[column].upper()):
+                symbols.setdefault(fields[column].upper(), None)
+    return list(symbols)
+
+
+# Screen one shard (run in a worker process): the monthly timeframe's daily
+# bars from the bar cache, topped up first unless cached_only, go into a
+# BarStore straight from the cached records, and the strategy runs on the
+# indicator table as array comparisons. Returns the hits (every symbol whose
+# action is not "hold", with its indicators and the strategy's message) and
+# how many symbols had data.
+def _screen_shard(symbols, strategy_name, cached_only=False):
+    period, interval = TIMEFRAMES['monthly']
+    if not cached_only:
+        try:
+            market_data.download_many(symbols, period=period, interval=interval)
+        except Exception as e:
+            print(f"Error refreshing {len(symbols)} symbols, screening the cached bars: {e}")
+    store = BarStore(fields=('Close',), reserve=len(symbols))
+    for symbol in symbols:
+        bars = market_data.cache.read_bars(symbol, interval)
+        if bars is not None and len(bars):
+            store.append(symbol, bars['timestamp'], bars['Close'])
+    table = store.indicators(span=market_data.parse_span(period))
+
+    strategy = get_strategy(strategy_name)
+    actions = strategy.evaluate_many(table)
+    hit = actions != "hold"
+    hits = table[hit].copy()
+    hits.insert(0, 'action', actions[hit])
+    hits['message'] = [strategy.evaluate(row)[1] for _, row in hits.iterrows()]
+    return hits, len(table)
+
+
+# Screen a whole universe with `strategy` on the monthly timeframe. The
+# symbols are cut into shards of shard_size, screened on a process pool
+# (in-process when there is only one shard or workers=1). Returns the hits,
+# buys first and most oversold first, and the scan's counts and timing.
+def screen_universe(symbols, strategy='rsi_trend', workers=None, shard_size=500, cached_only=False):
+    started = time.perf_counter()
+    get_strategy(strategy)  # Fail before starting any process
+    shards = [symbols[i:i + shard_size] for i in range(0, len(symbols), shard_size)]
+    parts, with_data = [], 0
+
+    def collect(result):
+        nonlocal with_data
+        hits, count = result
+        with_data += count
+        if not hits.empty:
+            parts.append(hits)
+
+    if len(shards) <= 1 or workers == 1:
+        for shard in shards:
+            collect(_screen_shard(shard, strategy, cached_only))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_screen_shard, shard, strategy, cached_only): shard for shard in shards}
+            for future in as_completed(futures):
+                try:
+                    collect(future.result())
+                except Exception as e:
+                    print(f"Error screening {len(futures[future])} symbols ({futures[future][0]}...): {e}")
+
+    hits = pd.concat(parts).sort_values(['action', 'rsi_14']) if parts else pd.DataFrame(columns=['action'])
+    summary = {'symbols': len(symbols), 'with_data': with_data, 'shards': len(shards),
+               'seconds': time.perf_counter() - started}
+    return hits, summary
+
+
+def print_hits(hits, summary):
+    for symbol, hit in hits.iterrows():
+        color = "\033[92m" if hit['action'] == "buy" else "\033[91m"
+        print(f"{color}{symbol}: {hit['action']} - {hit['message']} "
+              f"(RSI {hit['rsi_14']:.2f}, close {hit['close']:.4g})\033[0m")
+    counts = hits['action'].value_counts()
+    print(f"Screened {summary['symbols']} symbols ({summary['with_data']} with data, {summary['shards']} shards) "
+          f"in {summary['seconds']:.2f}s: {counts.get('buy', 0)} buy, {counts.get('sell', 0)} sell")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check a watchlist on three timeframes, or screen a whole "
+                                                 "universe of tickers for buy/sell hits.")
+    parser.add_argument('symbols', nargs='*', help='Symbols to check (default: the built-in watchlist)')
+    parser.add_argument('--universe', metavar='FILE',
+                        help='Screen every ticker in FILE (one per line or an exchange listing); '
+                             'only the hits are printed')
+    parser.add_argument('--strategy', default='rsi_trend', help='Strategy the screener applies')
+    parser.add_argument('--workers', type=int, default=None, help='Screener processes (default: one per CPU)')
+    parser.add_argument('--shard-size', type=int, default=500, help='Symbols per screener task')
+    parser.add_argument('--cached', action='store_true', help='Screen the locally cached bars without downloading')
+    parser.add_argument('--output', metavar='PATH', help='Also write the hits to PATH (CSV)')
+    args = parser.parse_args()
+
+    if not args.universe:
+        # Run the analysis on all symbols in the list
+        analyze_multiple_symbols(args.symbols or symbols_to_analyze)
+        return
+
+    symbols = load_universe(args.universe)
+    hits, summary = screen_universe(symbols, args.strategy, args.workers, args.shard_size, args.cached)
+    print_hits(hits, summary)
+    if args.output:
+        hits.to_csv(args.output, index_label='symbol')
+        print(f"Hits written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+import math
+
+
+# Pull a single price column out of a yfinance frame as a flat Series.
+# yfinance returns (Price, Ticker) MultiIndex columns even for one symbol, so
+# df['Close'] can come back as a one-column DataFrame. pandas is imported here
+# rather than at module level so the streaming engine loads without it.
+def price_column(df, name='Close'):
+    import pandas as pd
+    column = df[name]
+    if isinstance(column, pd.DataFrame):
+        column = column.iloc[:, 0]
+    return column
+
+
+def _format(value):
+    return f"{value:g}"
+
+
+# Streaming indicators, each updated in constant time per close. Every one
+# keeps its state in plain attributes with _state()/_restore() so the engine
+# can rewind a bar that is still forming, and names its outputs after its
+# parameters (rsi_14, ema_200, macd_12_26_9, ...). The formulas match the
+# pandas versions used by the bots.
+
+# RSI from ewm(span=period, min_periods=period) of gains/losses (adjust=True)
+class StreamingRSI:
+    def __init__(self, period=14):
+        self.period = period
+        self.name = f"rsi_{period}"
+        self._decay = 1 - 2 / (period + 1)
+        self._reset()
+
+    def _reset(self):
+        # Adjusted EMA of gains/losses kept as weighted sum / weight
+        self._last = math.nan
+        self._gain_sum = 0.0
+        self._loss_sum = 0.0
+        self._weight = 0.0
+        self._count = 0
+
+    def _state(self):
+        return self._last, self._gain_sum, self._loss_sum, self._weight, self._count
+
+    def _restore(self, state):
+        self._last, self._gain_sum, self._loss_sum, self._weight, self._count = state
+
+    def update(self, close):
+        # The first bar has no diff, so the EMAs start on the second bar
+        if not math.isnan(self._last):
+            delta = close - self._last
+            gain = delta if delta > 0 else 0.0
+            loss = -delta if delta < 0 else 0.0
+            self._gain_sum = gain + self._decay * self._gain_sum
+            self._loss_sum = loss + self._decay * self._loss_sum
+            self._weight = 1.0 + self._decay * self._weight
+            self._count += 1
+        self._last = close
+
+    @property
+    def value(self):
+        if self._count < self.period:
+            return math.nan
+        ema_gain = self._gain_sum / self._weight
+        ema_loss = self._loss_sum / self._weight
+        if ema_loss == 0:
+            return 100.0 if ema_gain > 0 else math.nan
+        rs = ema_gain / ema_loss
+        return 100 - (100 / (rs + 1))
+
+    def outputs(self):
+        return {self.name: self.value}
+
+
+# EMA with ewm(span=period, adjust=False)
+class StreamingEMA:
+    def __init__(self, period=200):
+        self.period = period
+        self.name = f"ema_{period}"
+        self._alpha = 2 / (period + 1)
+        self._reset()
+
+    def _reset(self):
+        self.value = math.nan
+
+    def _state(self):
+        return self.value
+
+    def _restore(self, state):
+        self.value = state
+
+    def update(self, close):
+        if math.isnan(self.value):
+            self.value = close
+        else:
+            self.value += self._alpha * (close - self.value)
+
+    def outputs(self):
+        return {self.name: self.value}
+
+
+# MACD line (fast EMA - slow EMA) and its signal EMA, all adjust=False
+class StreamingMACD:
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.suffix = f"{fast}_{slow}_{signal}"
+        self.name = f"macd_{self.suffix}"
+        self._alpha_fast = 2 / (fast + 1)
+        self._alpha_slow = 2 / (slow + 1)
+        self._alpha_signal = 2 / (signal + 1)
+        self._reset()
+
+    def _reset(self):
+        self._ema_fast = math.nan
+        self._ema_slow = math.nan
+        self.signal = math.nan
+
+    def _state(self):
+        return self._ema_fast, self._ema_slow, self.signal
+
+    def _restore(self, state):
+        self._ema_fast, self._ema_slow, self.signal = state
+
+    def update(self, close):
+        if math.isnan(self._ema_fast):
+            self._ema_fast = self._ema_slow = close
+            self.signal = 0.0
+        else:
+            self._ema_fast += self._alpha_fast * (close - self._ema_fast)
+            self._ema_slow += self._alpha_slow * (close - self._ema_slow)
+            self.signal += self._alpha_signal * (self.value - self.signal)
+
+    @property
+    def value(self):
+        return self._ema_fast - self._ema_slow
+
+    def outputs(self):
+        return {self.name: self.value, f"macd_signal_{self.suffix}": self.signal}
+
+
+# Bollinger Bands: rolling mean and sample std over a ring buffer with running
+# sums, shifted by the first price to limit cancellation
+class StreamingBollinger:
+    def __init__(self, window=20, width=2):
+        self.window = window
+        self.width = width
+        self.suffix = f"{window}_{_format(width)}"
+        self.name = f"bollinger_{self.suffix}"
+        self._values = [0.0] * window
+        self._reset()
+
+    def _reset(self):
+        self._bars = 0
+        self._shift = math.nan
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._head = 0
+
+    def _state(self):
+        return self._bars, self._shift, self._sum, self._sum_sq, self._head, self._values[self._head]
+
+    def _restore(self, state):
+        self._bars, self._shift, self._sum, self._sum_sq, self._head, slot = state
+        self._values[self._head] = slot
+
+    def update(self, close):
+        if self._bars == 0:
+            self._shift = close
+        shifted = close - self._shift
+        # Drop the oldest close once the window is full
+        if self._bars >= self.window:
+            old = self._values[self._head]
+            self._sum -= old
+            self._sum_sq -= old * old
+        self._values[self._head] = shifted
+        self._sum += shifted
+        self._sum_sq += shifted * shifted
+        self._head = (self._head + 1) % self.window
+        self._bars += 1
+
+    # (rolling mean, upper band, lower band)
+    def bands(self):
+        n = self.window
+        if self._bars < n:
+            return math.nan, math.nan, math.nan
+        mean = self._sum / n
+        variance = max((self._sum_sq - self._sum * self._sum / n) / (n - 1), 0.0)
+        std = math.sqrt(variance)
+        mean += self._shift
+        return mean, mean + std * self.width, mean - std * self.width
+
+    def outputs(self):
+        mean, upper, lower = self.bands()
+        return {
+            f"rolling_mean_{self.suffix}": mean,
+            f"bollinger_upper_{self.suffix}": upper,
+            f"bollinger_lower_{self.suffix}": lower,
+        }
+
+
+INDICATORS = {
+    'rsi': StreamingRSI,
+    'ema': StreamingEMA,
+    'macd': StreamingMACD,
+    'bollinger': StreamingBollinger,
+}
+
+
+# Build a streaming indicator from its name, e.g. "rsi_14", "ema_200",
+# "macd_12_26_9" or "bollinger_20_2"
+def make_indicator(spec):
+    kind, *params = spec.split('_')
+    if kind not in INDICATORS:
+        raise ValueError(f"Unknown indicator {spec!r}; choose from {', '.join(INDICATORS)}")
+    return INDICATORS[kind](*(float(p) if '.' in p else int(p) for p in params))
+
+
+# Feeds each close once through a set of distinct streaming indicators and
+# returns all their outputs in one flat feature dict. Indicators are deduped by
+# name, so strategies that ask for the same rsi_14 share one computation.
+class FeatureEngine:
+    def __init__(self, indicators=()):
+        self.indicators = {}
+        for spec in indicators:
+            self.add(spec)
+        self.last_timestamp = None
+        self._checkpoint = None
+        self._reset()
+
+    # Add an indicator (name or instance); it must be added before the first bar
+    def add(self, spec):
+        indicator = make_indicator(spec) if isinstance(spec, str) else spec
+        return self.indicators.setdefault(indicator.name, indicator)
+
+    def _reset(self):
+        self.bars = 0
+        self.close = math.nan
+        for indicator in self.indicators.values():
+            indicator._reset()
+
+    def _state(self):
+        return self.bars, self.close, tuple(indicator._state() for indicator in self.indicators.values())
+
+    def _restore(self, state):
+        self.bars, self.close, states = state
+        for indicator, indicator_state in zip(self.indicators.values(), states):
+            indicator._restore(indicator_state)
+
+    # Feed one bar close. Pass new_bar=False to revise the bar that is still
+    # forming (yfinance keeps updating the latest candle until it closes).
+    def update(self, close, new_bar=True):
+        close = float(close)
+        if new_bar:
+            self._checkpoint = self._state()
+        elif self._checkpoint is not None:
+            self._restore(self._checkpoint)
+        else:
+            return self.update(close)
+
+        for indicator in self.indicators.values():
+            indicator.update(close)
+        self.close = close
+        self.bars += 1
+        return self.snapshot()
+
+    # Latest value of every feature, keyed by output name plus 'close'
+    def snapshot(self):
+        features = {'close': self.close}
+        for indicator in self.indicators.values():
+            features.update(indicator.outputs())
+        return features
+
+    # Warm start: rebuild the state from a history frame in one pass
+    def seed_from_frame(self, df):
+        self._reset()
+        self._checkpoint = None
+        self.last_timestamp = None
+        return self.update_from_frame(df)
+
+    # Feed only the bars of df that are newer than what we have already seen.
+    # A bar with the same timestamp as the last one revises it in place.
+    def update_from_frame(self, df):
+        closes = price_column(df)
+        if self.last_timestamp is not None:
+            closes = closes[closes.index >= self.last_timestamp]
+        for timestamp, close in closes.items():
+            if math.isnan(close):
+                continue
+            self.update(close, new_bar=timestamp != self.last_timestamp)
+            self.last_timestamp = timestamp
+        return self.snapshot()
+
+
+# The RSI, EMA200, MACD and Bollinger set used by the bots, with the snapshot
+# keyed like the DataFrame columns the scripts used to build (rsi_14, ema_200,
+# macd, macd_signal, rolling_mean, bollinger_upper, bollinger_lower)
+class StreamingIndicators(FeatureEngine):
+    def __init__(self, rsi_period=14, ema_period=200, macd_fast=12, macd_slow=26,
+                 macd_signal=9, bollinger_window=20, bollinger_width=2):
+        self.rsi_period = rsi_period
+        self.bollinger_window = bollinger_window
+        self.bollinger_width = bollinger_width
+        self._rsi = StreamingRSI(rsi_period)
+        self._ema = StreamingEMA(ema_period)
+        self._macd = StreamingMACD(macd_fast, macd_slow, macd_signal)
+        self._bollinger = StreamingBollinger(bollinger_window, bollinger_width)
+        super().__init__([self._rsi, self._ema, self._macd, self._bollinger])
+
+    @property
+    def rsi(self):
+        return self._rsi.value
+
+    @property
+    def ema_200(self):
+        return self._ema.value
+
+    @property
+    def macd(self):
+        return self._macd.value
+
+    @property
+    def macd_signal(self):
+        return self._macd.signal
+
+    def bollinger(self):
+        return self._bollinger.bands()
+
+    def snapshot(self):
+        rolling_mean, upper, lower = self.bollinger()
+        return {
+            'close': self.close,
+            'rsi_14': self.rsi,
+            'ema_200': self.ema_200,
+            'macd': self.macd,
+            'macd_signal': self.macd_signal,
+            'rolling_mean': rolling_mean,
+            'bollinger_upper': upper,
+            'bollinger_lower': lower,
+        }
@@ -0,0 +1,392 @@
+import argparse
+import asyncio
+import json
+import math
+import threading
+import time
+from collections import deque
+
+from aiohttp import WSMsgType, web
+
+# Local web server that the analysis loop pushes bar, indicator and order
+# events into; browsers connected to it get the events as deltas over a
+# WebSocket and append them to their charts (Plotly.extendTraces), so a
+# figure is drawn once and never rebuilt.
+#
+# One feed serves every viewer: publish() only queues the event, and the
+# server thread encodes everything queued in the last `flush_interval`
+# seconds as one JSON message and hands that same string to every socket.
+# A viewer that falls `max_backlog` messages behind is disconnected (its page
+# reconnects and starts from a fresh snapshot) so it can't hold memory.
+#
+#     feed = LiveFeed(port=8765).start()
+#     feed.publish_bar("BTC-USD", "1m", timestamp, bar, features)
+#
+# or `trading_daemon.py ... --live 8765` to follow every job.
+
+# Event fields: n (sequence number), t ('bar' or 'order'), s (symbol),
+# i (interval), x (epoch ms); bars carry o/h/l/c and the chart features
+# rsi/macd/signal/upper/lower (null when not computed), orders side and price.
+_FEATURES = (('rsi', 'rsi'), ('signal', 'macd_signal'), ('macd', 'macd'),
+             ('upper', 'bollinger_upper'), ('lower', 'bollinger_lower'))
+
+
+def _number(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) or math.isinf(value) else round(value, 8)
+
+
+def _epoch_ms(timestamp):
+    if timestamp is None:
+        return int(time.time() * 1000)
+    if hasattr(timestamp, "timestamp"):
+        timestamp = timestamp.timestamp()
+    return int(timestamp * 1000)
+
+
+# The first feature-engine output of each kind (rsi_14 -> rsi,
+# macd_12_26_9 -> macd, ...); works for StreamingIndicators' short names too
+def chart_features(features):
+    picked = {}
+    for name, value in features.items():
+        for key, prefix in _FEATURES:
+            if name.startswith(prefix):
+                picked.setdefault(key, _number(value))
+                break
+    return picked
+
+
+class LiveFeed:
+    def __init__(self, host="127.0.0.1", port=8765, history=500, flush_interval=0.25, max_backlog=64):
+        self.host = host
+        self.port = port
+        self.history_size = history
+        self.flush_interval = flush_interval
+        self.max_backlog = max_backlog
+        self.messages = 0
+        self.dropped = 0
+        self._sequence = 0
+        self._bars = {}  # (symbol, interval) -> deque of bar events
+        self._orders = deque(maxlen=history)
+        self._pending = []
+        self._lock = threading.Lock()
+        self._clients = {}  # asyncio.Queue -> WebSocketResponse
+        self._loop = None
+        self._wake = None
+        self._thread = None
+        self._seen = set()  # (symbol, interval) already backfilled by on_bars
+        self._daemon = None
+
+    # Queue one event for every viewer; safe to call from any thread
+    def publish(self, event):
+        with self._lock:
+            self._sequence += 1
+            event['n'] = self._sequence
+            self._remember(event)
+            self._pending.append(event)
+            first = len(self._pending) == 1
+        if first and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        return event
+
+    def _remember(self, event):
+        if event['t'] == 'order':
+            self._orders.append(event)
+            return
+        bars = self._bars.get((event['s'], event['i']))
+        if bars is None:
+            bars = self._bars[(event['s'], event['i'])] = deque(maxlen=self.history_size)
+        if bars and bars[-1]['x'] == event['x']:
+            bars.pop()  # Revision of the bar that is still forming
+        bars.append(event)
+
+    # `bar` is {'open', 'high', 'low', 'close'}; `features` a feature-engine
+    # snapshot (rsi_14, macd_12_26_9, bollinger_upper_20_2, ...)
+    def publish_bar(self, symbol, interval, timestamp, bar, features=None):
+        event = {'t': 'bar', 's': symbol, 'i': interval, 'x': _epoch_ms(timestamp),
+                 'o': _number(bar.get('open')), 'h': _number(bar.get('high')),
+                 'l': _number(bar.get('low')), 'c': _number(bar.get('close'))}
+        event.update(chart_features(features or {}))
+        return self.publish(event)
+
+    def publish_order(self, symbol, side, price, interval=None, timestamp=None, quantity=None):
+        return self.publish({'t': 'order', 's': symbol, 'i': interval, 'x': _epoch_ms(timestamp),
+                             'side': side, 'price': _number(price), 'quantity': quantity})
+
+    # Everything a new viewer needs, oldest first
+    def history(self):
+        with self._lock:
+            events = [event for bars in self._bars.values() for event in bars] + list(self._orders)
+        return sorted(events, key=lambda event: event['n'])
+
+    async def _flush(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            await asyncio.sleep(self.flush_interval)  # Let a tick's events pile up
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch or not self._clients:
+                continue
+            message = json.dumps(batch, separators=(',', ':'))
+            self.messages += 1
+            for queue, socket in list(self._clients.items()):
+                try:
+                    queue.put_nowait(message)
+                except asyncio.QueueFull:
+                    self.dropped += 1
+                    self._clients.pop(queue, None)
+                    asyncio.ensure_future(socket.close())
+
+    @staticmethod
+    async def _send(socket, queue):
+        while True:
+            await socket.send_str(await queue.get())
+
+    async def _socket(self, request):
+        socket = web.WebSocketResponse(heartbeat=30)
+        await socket.prepare(request)
+        # Registered before the snapshot is taken, so no event falls between
+        # the two; the page skips the ones it gets twice (by sequence number)
+        queue = asyncio.Queue(self.max_backlog)
+        self._clients[queue] = socket
+        sender = None
+        try:
+            await socket.send_str(json.dumps({'t': 'snapshot', 'events': self.history()}, separators=(',', ':')))
+            sender = asyncio.ensure_future(self._send(socket, queue))
+            async for message in socket:
+                if message.type == WSMsgType.ERROR:
+                    break
+        finally:
+            self._clients.pop(queue, None)
+            if sender is not None:
+                sender.cancel()
+        return socket
+
+    async def _page(self, request):
+        return web.Response(text=_PAGE, content_type="text/html")
+
+    async def _snapshot(self, request):
+        return web.json_response(self.history())
+
+    def _serve(self, ready):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._wake = asyncio.Event()
+        app = web.Application()
+        app.add_routes([web.get("/", self._page), web.get("/ws", self._socket), web.get("/snapshot", self._snapshot)])
+        runner = web.AppRunner(app, handle_signals=False)
+        try:
+            loop.run_until_complete(runner.setup())
+            site = web.TCPSite(runner, self.host, self.port)
+            loop.run_until_complete(site.start())
+        except OSError as e:
+            print(f"Live dashboard failed to start on {self.host}:{self.port}: {e}")
+            loop.close()
+            ready.set()
+            return
+        self.port = site._server.sockets[0].getsockname()[1]  # The real port when 0 was asked for
+        self._loop = loop
+        flusher = loop.create_task(self._flush())
+        if self._pending:
+            self._wake.set()
+        ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            flusher.cancel()
+            loop.run_until_complete(runner.cleanup())
+            loop.close()
+
+    # Serve from a background thread; returns once the port is open
+    def start(self):
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._serve, args=(ready,), name="live-dashboard", daemon=True)
+        self._thread.start()
+        ready.wait()
+        if self._loop is not None:
+            print(f"Live dashboard on http://{self.host}:{self.port}/")
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop = None
+
+    # trading_daemon 'bars' handler: runs after the daemon's own handler, so
+    # the (symbol, interval) feature engine already holds this tick's values.
+    # The first frame of a key also backfills the closes before it.
+    def on_bars(self, jobs, frame):
+        from indicators import price_column
+        symbol, interval = jobs[0].symbol, jobs[0].interval
+        engine = self._daemon.engines.get((symbol, interval))
+        if engine is None or engine.last_timestamp is None or frame.empty:
+            return
+        frame = frame[frame.index <= engine.last_timestamp]
+        if frame.empty:
+            return
+        columns = {name.lower(): price_column(frame, name).to_numpy(dtype=float)
+                   for name in ('Open', 'High', 'Low', 'Close')}
+        if (symbol, interval) not in self._seen:
+            self._seen.add((symbol, interval))
+            start = max(len(frame) - self.history_size, 0)
+            for row in range(start, len(frame) - 1):
+                self.publish_bar(symbol, interval, frame.index[row],
+                                 {name: column[row] for name, column in columns.items()})
+        self.publish_bar(symbol, interval, frame.index[-1], {name: column[-1] for name, column in columns.items()},
+                         engine.snapshot())
+
+    # trading_daemon 'order' handler: (job, side, price)
+    def on_order(self, job, side, price=None):
+        self.publish_order(job.symbol, side, price, interval=job.interval, quantity=job.quantity)
+
+    def attach(self, daemon):
+        self._daemon = daemon
+        daemon.on('bars', self.on_bars)
+        daemon.on('order', self.on_order)
+        return self
+
+
+_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Live indicators</title>
+<script src="https://cdn.plot.ly/plotly-2.35.2.min.js"></script>
+<style>body { font-family: sans-serif; margin: 0 } .chart { height: 480px } #status { padding: 4px 8px }</style>
+</head>
+<body>
+<div id="status">connecting...</div>
+<div id="charts"></div>
+<script>
+var MAX_POINTS = 5000;
+// Trace order: close, upper, lower, rsi, macd, signal, buys, sells
+var FIELDS = ['c', 'upper', 'lower', 'rsi', 'macd', 'signal'];
+var charts = {}, lastSequence = 0;
+
+function chart(key) {
+  if (charts[key]) return charts[key];
+  var div = document.createElement('div');
+  div.className = 'chart';
+  document.getElementById('charts').appendChild(div);
+  var line = function (name, axis, color, dash) {
+    return {type: 'scattergl', mode: 'lines', name: name, x: [], y: [], yaxis: axis,
+            line: {color: color, width: 1.5, dash: dash || 'solid'}};
+  };
+  var marker = function (name, color, symbol) {
+    return {type: 'scattergl', mode: 'markers', name: name, x: [], y: [],
+            marker: {color: color, size: 10, symbol: symbol}};
+  };
+  Plotly.newPlot(div, [
+    line('Close', 'y', '#1f77b4'), line('Upper band', 'y', '#999', 'dot'), line('Lower band', 'y', '#999', 'dot'),
+    line('RSI', 'y2', 'orange'), line('MACD', 'y3', '#2ca02c'), line('Signal', 'y3', '#d62728'),
+    marker('Buy', '#2ca02c', 'triangle-up'), marker('Sell', '#d62728', 'triangle-down')
+  ], {
+    title: {text: key}, margin: {t: 40, r: 60},
+    xaxis: {type: 'date'}, yaxis: {domain: [0.4, 1], title: {text: 'Price'}},
+    yaxis2: {domain: [0, 0.33], range: [0, 100], title: {text: 'RSI'}},
+    yaxis3: {overlaying: 'y2', side: 'right', title: {text: 'MACD'}}
+  }, {responsive: true});
+  return charts[key] = {div: div, lastX: null};
+}
+
+// Apply a list of events: one extendTraces call per chart per batch
+function apply(events) {
+  var batches = {};
+  events.forEach(function (event) {
+    if (event.n <= lastSequence) return;
+    lastSequence = event.n;
+    var key = event.s + ' ' + (event.i || 'orders');
+    var batch = batches[key] || (batches[key] = {target: chart(key), events: []});
+    batch.events.push(event);
+  });
+  Object.keys(batches).forEach(function (key) {
+    var target = batches[key].target, x = [[], [], [], [], [], [], [], []], y = [[], [], [], [], [], [], [], []];
+    var redraw = false;
+    batches[key].events.forEach(function (event) {
+      if (event.t === 'order') {
+        var trace = event.side === 'buy' ? 6 : 7;
+        x[trace].push(event.x); y[trace].push(event.price);
+        return;
+      }
+      var last = x[0].length - 1;
+      if (last >= 0 && x[0][last] === event.x) {
+        // Revised again before it was drawn: overwrite the pending point
+        FIELDS.forEach(function (field, trace) { y[trace][last] = event[field]; });
+        return;
+      }
+      if (event.x === target.lastX) {
+        // The bar still forming was revised after it was drawn: replace its
+        // points in place
+        FIELDS.forEach(function (field, trace) {
+          var data = target.div.data[trace];
+          if (data.x.length && data.x[data.x.length - 1] === event.x) { data.y[data.y.length - 1] = event[field]; }
+        });
+        redraw = true;
+        return;
+      }
+      target.lastX = event.x;
+      FIELDS.forEach(function (field, trace) { x[trace].push(event.x); y[trace].push(event[field]); });
+    });
+    var traces = [];
+    x.forEach(function (points, trace) { if (points.length) traces.push(trace); });
+    if (traces.length) {
+      Plotly.extendTraces(target.div, {x: traces.map(function (t) { return x[t]; }),
+                                       y: traces.map(function (t) { return y[t]; })}, traces, MAX_POINTS);
+    } else if (redraw) {
+      Plotly.redraw(target.div);
+    }
+  });
+}
+
+function connect(delay) {
+  var socket = new WebSocket((location.protocol === 'https:' ? 'wss://' : 'ws://') + location.host + '/ws');
+  socket.onopen = function () { document.getElementById('status').textContent = 'live'; delay = 500; };
+  socket.onmessage = function (message) {
+    var data = JSON.parse(message.data);
+    apply(Array.isArray(data) ? data : data.events);
+  };
+  socket.onclose = function () {
+    document.getElementById('status').textContent = 'reconnecting...';
+    setTimeout(function () { connect(Math.min(delay * 2, 10000)); }, delay);
+  };
+}
+connect(500);
+</script>
+</body>
+</html>
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the live dashboard with a synthetic random-walk feed.")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--symbols', default="BTC-USD,ETH-USD")
+    parser.add_argument('--every', type=float, default=1.0, help='Seconds between synthetic bars')
+    args = parser.parse_args()
+
+    import random
+    from indicators import FeatureEngine
+    feed = LiveFeed(port=args.port).start()
+    engines = {symbol: FeatureEngine(['rsi_14', 'macd_12_26_9', 'bollinger_20_2'])
+               for symbol in args.symbols.split(',')}
+    prices = {symbol: 100.0 for symbol in engines}
+    try:
+        while True:
+            now = time.time()
+            for symbol, engine in engines.items():
+                open_ = prices[symbol]
+                close = prices[symbol] = open_ * math.exp(random.gauss(0, 0.002))
+                bar = {'open': open_, 'high': max(open_, close), 'low': min(open_, close), 'close': close}
+                feed.publish_bar(symbol, "1s", now, bar, engine.update(close))
+            time.sleep(args.every)
+    except KeyboardInterrupt:
+        feed.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from indicators import price_column
+
+FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+# One record per bar: UTC timestamp in nanoseconds plus the OHLCV columns
+BAR_DTYPE = np.dtype([('timestamp', '<i8')] + [(field, '<f8') for field in FIELDS])
+
+DEFAULT_CACHE_DIR = os.getenv(
+    "MARKET_DATA_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".market_data"))
+
+_UNITS = {'m': 'minutes', 'h': 'hours', 'd': 'days', 'wk': 'weeks'}
+
+
+# Length of a yfinance period/interval string such as "200d", "1wk", "5m" or
+# "1y". Returns None for open-ended periods ("max", "ytd").
+def parse_span(text):
+    match = re.fullmatch(r'(\d+)(mo|wk|m|h|d|y)', text)
+    if not match:
+        return None
+    count, unit = int(match.group(1)), match.group(2)
+    if unit == 'mo':
+        return timedelta(days=30 * count)
+    if unit == 'y':
+        return timedelta(days=365 * count)
+    return timedelta(**{_UNITS[unit]: count})
+
+
+def _download(symbol, **kwargs):
+    import yfinance as yf
+    return yf.download(symbol, progress=False, **kwargs)
+
+
+# Flatten a yfinance frame to float OHLCV columns, dropping bars with no close
+def _normalize(df):
+    if df is None or df.empty:
+        return pd.DataFrame(columns=list(FIELDS), dtype=np.float64)
+    frame = pd.DataFrame(
+        {field: price_column(df, field) if field in df else np.nan for field in FIELDS}, index=df.index)
+    frame = frame.astype(np.float64)
+    if isinstance(frame.index, pd.DatetimeIndex):
+        frame.index = frame.index.as_unit('ns')  # As read back from the cache
+    return frame[frame['Close'].notna()]
+
+
+def _timestamp(value, tz):
+    ts = pd.Timestamp(value)
+    if tz is not None and ts.tzinfo is None:
+        return ts.tz_localize(tz)
+    if tz is None and ts.tzinfo is not None:
+        return ts.tz_convert(None)
+    return ts
+
+
+# On-disk OHLCV cache keyed by (symbol, interval). Bars live in one memory-mapped
+# .npy record array per key; a refresh downloads only the bars from the last
+# cached timestamp on (re-fetching that bar, which may still have been forming)
+# and merges them in. `downloader` has the yf.download signature so tests and
+# offline runs can swap in a fake.
+class BarCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, downloader=None):
+        self.cache_dir = cache_dir
+        self.downloader = downloader or _download
+
+    def _paths(self, symbol, interval):
+        name = re.sub(r'[^A-Za-z0-9._-]', '_', symbol)
+        directory = os.path.join(self.cache_dir, interval)
+        return os.path.join(directory, f"{name}.npy"), os.path.join(directory, f"{name}.json")
+
+    # Just the cached records of a key (BAR_DTYPE, UTC timestamps), or None.
+    # The file is read in one go and its header is only checked, not parsed
+    # as np.load does, which is most of the cost of reading thousands of
+    # small files in a scan.
+    def read_bars(self, symbol, interval):
+        data_path, _ = self._paths(symbol, interval)
+        try:
+            with open(data_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        if data[:6] != b'\x93NUMPY':
+            raise ValueError(f"{data_path} is not a .npy file")
+        size = 2 if data[6] == 1 else 4
+        offset = 8 + size + int.from_bytes(data[8:8 + size], 'little')
+        if b"'fortran_order': False" not in data[:offset] or (len(data) - offset) % BAR_DTYPE.itemsize:
+            return np.load(data_path)
+        return np.frombuffer(data, dtype=BAR_DTYPE, offset=offset)
+
+    # Cached bars and metadata for a key; an empty frame when nothing is stored
+    def load(self, symbol, interval):
+        data_path, meta_path = self._paths(symbol, interval)
+        if not os.path.exists(data_path) or not os.path.exists(meta_path):
+            return _normalize(None), {}
+        with open(meta_path) as f:
+            meta = json.load(f)
+        bars = np.load(data_path, mmap_mode='r')
+        index = pd.DatetimeIndex(pd.to_datetime(np.asarray(bars['timestamp']), unit='ns', utc=True))
+        index = index.tz_convert(meta['tz']) if meta.get('tz') else index.tz_convert(None)
+        frame = pd.DataFrame({field: np.asarray(bars[field]) for field in FIELDS}, index=index)
+        return frame, meta
+
+    def store(self, symbol, interval, frame, meta):
+        data_path, meta_path = self._paths(symbol, interval)
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+
+        index = frame.index
+        index = index.tz_convert('UTC') if index.tz is not None else index
+        bars = np.empty(len(frame), dtype=BAR_DTYPE)
+        bars['timestamp'] = index.as_unit('ns').asi8
+        for field in FIELDS:
+            bars[field] = frame[field].to_numpy(dtype=np.float64)
+
+        # Write to a temp file and rename so readers never see a partial file
+        for path, write in ((data_path, lambda f: np.save(f, bars)),
+                            (meta_path, lambda f: f.write(json.dumps(meta).encode()))):
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, path)
+
+    # Merge downloaded bars over the cached ones (newer values win) and save.
+    # `checked_to` is the end of the range that was downloaded: when it is in
+    # the past and the download worked, every bar up to it is now cached, so
+    # the range never needs a top-up again however old its last bar is
+    # (weekends, holidays, a halted symbol).
+    def _merge(self, symbol, interval, cached, meta, fresh, covered_from=None, checked_to=None):
+        fresh = _normalize(fresh)
+        downloaded = not fresh.empty
+        if fresh.empty:
+            # Still record the coverage so an empty backfill is not retried
+            if cached.empty:
+                return cached, meta
+            fresh, tz = cached, meta.get('tz')
+        else:
+            tz = str(fresh.index.tz) if fresh.index.tz is not None else None
+            if not cached.empty:
+                if tz and cached.index.tz is not None:
+                    cached.index = cached.index.tz_convert(tz)
+                fresh = pd.concat([cached, fresh])
+                fresh = fresh[~fresh.index.duplicated(keep='last')].sort_index()
+        if covered_from is not None:
+            covered = pd.Timestamp(meta['covered_from']) if meta.get('covered_from') else None
+            covered_from = _timestamp(covered_from, tz)
+            meta['covered_from'] = str(min(covered, covered_from) if covered is not None else covered_from)
+        if checked_to is not None and downloaded:
+            checked_to = _timestamp(checked_to, tz)
+            if checked_to <= _anchor(None, tz):
+                checked = _timestamp(meta['checked_to'], tz) if meta.get('checked_to') else None
+                meta['checked_to'] = str(max(checked, checked_to) if checked is not None else checked_to)
+        meta['tz'] = tz
+        self.store(symbol, interval, fresh, meta)
+        return fresh, meta
+
+    def _fetch(self, symbol, interval, cached, meta, covered_from, **kwargs):
+        fresh = self.downloader(symbol, interval=interval, **kwargs)
+        return self._merge(symbol, interval, cached, meta, fresh, covered_from, kwargs.get('end'))
+
+    # Whether the cached range ends before `end` (None meaning "now")
+    @staticmethod
+    def _needs_top_up(frame, meta, interval, end):
+        return end is None or BarCache._stale(frame, meta, interval, end)
+
+    # Whether bars may be missing between the cache and `end` (or now): the
+    # newest bar, or the end of a range already confirmed complete
+    # (checked_to), is more than one interval older, and the gap is not just
+    # a weekend of a symbol that does not trade on weekends
+    @staticmethod
+    def _stale(frame, meta, interval, end):
+        step = parse_span(interval) or timedelta(days=1)
+        tz = meta.get('tz')
+        anchor = _anchor(end, tz)
+        covered = frame.index[-1]
+        if meta.get('checked_to'):
+            covered = max(covered, _timestamp(meta['checked_to'], tz))
+        if covered >= anchor - step:
+            return False
+        return not _weekend_gap(frame.index, covered + step, anchor)
+
+    # The whole requested range for `symbols` in one download (what a cold
+    # cache needs)
+    def _download_full(self, symbols, interval, period, start, end):
+        if start is None:
+            return self.downloader(symbols, interval=interval, period=period or 'max')
+        return self.downloader(symbols, interval=interval, start=start, end=end)
+
+    # Merge a top-up into a warm key. The top-up starts at the last cached
+    # bar, so an empty one means the download failed rather than that nothing
+    # traded; if the cache is stale by then, the whole range is downloaded
+    # again instead of serving old bars as the latest ones.
+    def _merge_top_up(self, symbol, interval, frame, meta, fresh, period, span_start, start, end):
+        if _normalize(fresh).empty and self._stale(frame, meta, interval, end):
+            print(f"Top-up of {symbol} {interval} bars failed; downloading the full range again")
+            fresh = self._download_full(symbol, interval, period, start, end)
+            if _normalize(fresh).empty:
+                print(f"Could not refresh {symbol} {interval} bars; cached bars end at {frame.index[-1]}")
+            return self._merge(symbol, interval, frame, meta, fresh, span_start or datetime(1900, 1, 1), end)
+        return self._merge(symbol, interval, frame, meta, fresh, checked_to=end)
+
+    # Bring one cached key up to date: a full download when nothing is cached,
+    # otherwise a backfill before the cached range and a top-up after it
+    def _refresh(self, symbol, interval, frame, meta, period, span_start, start, end):
+        if frame.empty:
+            if start is None:
+                return self._fetch(symbol, interval, frame, meta, span_start or datetime(1900, 1, 1),
+                                   period=period or 'max')
+            return self._fetch(symbol, interval, frame, meta, start, start=start, end=end)
+
+        covered = pd.Timestamp(meta['covered_from']) if meta.get('covered_from') else None
+        if span_start is not None and (covered is None or _timestamp(span_start, meta.get('tz')) < covered):
+            frame, meta = self._fetch(symbol, interval, frame, meta, span_start,
+                                      start=span_start, end=frame.index[0])
+        if self._needs_top_up(frame, meta, interval, end):
+            fresh = self.downloader(symbol, interval=interval, start=frame.index[-1], end=end)
+            frame, meta = self._merge_top_up(symbol, interval, frame, meta, fresh, period, span_start, start, end)
+        return frame, meta
+
+    # Bars for one symbol, like yf.download(symbol, period=..., interval=...) or
+    # yf.download(symbol, start=..., end=..., interval=...), served from the
+    # cache and topped up from the network. refresh=False reads the cache only.
+    def get(self, symbol, period=None, interval='1d', start=None, end=None, refresh=True):
+        frame, meta = self.load(symbol, interval)
+        span_start = _span_start(period, start)
+        if refresh:
+            frame, meta = self._refresh(symbol, interval, frame, meta, period, span_start, start, end)
+        return _trim(frame, meta, period, start, end)
+
+    # Same as get() for many symbols, but the network traffic is batched into
+    # multi-ticker downloads: one for the symbols with nothing cached and one
+    # top-up per timezone, starting at the oldest last bar in that group.
+    def get_many(self, symbols, period=None, interval='1d', start=None, end=None, refresh=True):
+        loaded = {symbol: self.load(symbol, interval) for symbol in symbols}
+        span_start = _span_start(period, start)
+
+        if refresh:
+            cold = []
+            warm = {}
+            for symbol, (frame, meta) in loaded.items():
+                covered = pd.Timestamp(meta['covered_from']) if meta.get('covered_from') else None
+                if frame.empty:
+                    cold.append(symbol)
+                elif span_start is not None and (covered is None or _timestamp(span_start, meta.get('tz')) < covered):
+                    # Backfills are rare; let the single-symbol path handle them
+                    loaded[symbol] = self._refresh(symbol, interval, frame, meta, period, span_start, start, end)
+                elif self._needs_top_up(frame, meta, interval, end):
+                    warm.setdefault(meta.get('tz'), []).append(symbol)
+
+            for group in warm.values():
+                since = min(loaded[symbol][0].index[-1] for symbol in group)
+                wide = self.downloader(group, interval=interval, start=since, end=end)
+                for symbol in group:
+                    frame, meta = loaded[symbol]
+                    fresh = _ticker_frame(wide, symbol, group)
+                    if _normalize(fresh).empty and self._stale(frame, meta, interval, end):
+                        # Failed top-up of a stale key: download it again with the cold ones
+                        print(f"Top-up of {symbol} {interval} bars failed; downloading the full range again")
+                        cold.append(symbol)
+                    else:
+                        loaded[symbol] = self._merge(symbol, interval, frame, meta, fresh, checked_to=end)
+            if cold:
+                wide = self._download_full(cold, interval, period, start, end)
+                for symbol in cold:
+                    fresh = _ticker_frame(wide, symbol, cold)
+                    if not loaded[symbol][0].empty and _normalize(fresh).empty:
+                        print(f"Could not refresh {symbol} {interval} bars; "
+                              f"cached bars end at {loaded[symbol][0].index[-1]}")
+                    loaded[symbol] = self._merge(symbol, interval, *loaded[symbol], fresh,
+                                                 span_start or datetime(1900, 1, 1), end)
+
+        return {symbol: _trim(frame, meta, period, start, end) for symbol, (frame, meta) in loaded.items()}
+
+
+# Earliest timestamp a period/start request asks for (None for "max")
+def _span_start(period, start):
+    if start is not None or not period or period == 'max':
+        return start
+    span = parse_span(period)
+    return datetime.now() - span if span else datetime(datetime.now().year, 1, 1)
+
+
+# `end` in the cache's timezone, or now when the request is open-ended
+def _anchor(end, tz):
+    if end is not None:
+        return _timestamp(end, tz)
+    return pd.Timestamp.now(tz=tz) if tz is not None else pd.Timestamp.now()
+
+
+# Whether [start, end) lies within one weekend and the symbol never trades on
+# weekends (none of its cached bars falls on a Saturday or Sunday)
+def _weekend_gap(index, start, end):
+    if start.dayofweek < 5 or (index.dayofweek >= 5).any():
+        return False
+    monday = start.normalize() + pd.Timedelta(days=7 - start.dayofweek)
+    return end <= monday
+
+
+# Trim cached bars to the requested window. Periods are measured back from
+# `end` or, for open-ended requests, from now (as _span_start does), so a
+# cache that could not be refreshed never passes old bars off as recent.
+def _trim(frame, meta, period, start, end):
+    if frame.empty:
+        return frame
+    tz = meta.get('tz')
+    span = parse_span(period) if period else None
+    if start is not None:
+        frame = frame[frame.index >= _timestamp(start, tz)]
+    elif span is not None:
+        frame = frame[frame.index > _anchor(end, tz) - span]
+    elif period == 'ytd':
+        frame = frame[frame.index.year == _anchor(end, tz).year]
+    if end is not None:
+        frame = frame[frame.index < _timestamp(end, tz)]
+    return frame.copy()
+
+
+# One ticker's columns out of a multi-ticker yf.download frame
+def _ticker_frame(wide, symbol, batch):
+    if wide is None or wide.empty:
+        return None
+    if isinstance(wide.columns, pd.MultiIndex):
+        if symbol not in wide.columns.get_level_values(-1):
+            return None
+        return wide.xs(symbol, axis=1, level=-1)
+    return wide if len(batch) == 1 else None
+
+
+# Shared cache used by the scripts
+cache = BarCache()
+
+
+# Drop-in for yf.download(symbol, ...) on a single symbol, backed by the cache
+def download(symbol, period=None, interval='1d', start=None, end=None, refresh=True):
+    return cache.get(symbol, period=period, interval=interval, start=start, end=end, refresh=refresh)
+
+
+# Batched version of download(): {symbol: frame} for a list of symbols
+def download_many(symbols, period=None, interval='1d', start=None, end=None, refresh=True):
+    return cache.get_many(symbols, period=period, interval=interval, start=start, end=end, refresh=refresh)
@@ -0,0 +1,278 @@
+import bisect
+import contextlib
+import json
+import sys
+import threading
+import time
+from collections import Counter
+
+# Latency spans along the signal-to-order path. Wrap a stage in
+#
+#     with metrics.span('fetch'):
+#         ...
+#
+# and, once enable() has been called, its wall time goes into a per-stage
+# histogram. The stages used by the daemon and clients:
+#   tick     one scheduler wake-up, start to end
+#   fetch    bar download for one (interval, period) group
+#   compute  feature engine update for one (symbol, interval)
+#   decide   one strategy evaluate()
+#   risk     pre-trade checks for one order
+#   sign     request signing (get_authorization_header)
+#   send     HTTP round-trip
+# While disabled, span() hands back one shared no-op context manager, so an
+# instrumented call costs a global lookup and an empty with block.
+STAGES = ('tick', 'fetch', 'compute', 'decide', 'risk', 'sign', 'send')
+
+# Bucket upper bounds in seconds: 1 us to ~1000 s, four per doubling (~19%
+# wide), so p50/p99 read from the buckets are within a few percent
+_BOUNDS = [1e-6 * 2 ** (i / 4) for i in range(121)]
+
+_enabled = False
+_noop = contextlib.nullcontext()
+
+
+# Fixed-bucket latency histogram. observe() is a bisect and an increment
+# under a lock, so stages timed on the worker pool can share one.
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(_BOUNDS, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    # Latency at quantile q (0..1), interpolated within its bucket
+    def quantile(self, q):
+        with self._lock:
+            counts, count, largest = list(self.counts), self.count, self.max
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for index, n in enumerate(counts):
+            if n and seen + n >= rank:
+                low = _BOUNDS[index - 1] if index else 0.0
+                high = _BOUNDS[index] if index < len(_BOUNDS) else largest
+                return min(low + (high - low) * (rank - seen) / n, largest)
+            seen += n
+        return largest
+
+    def snapshot(self):
+        return {'count': self.count, 'sum': self.total, 'max': self.max,
+                'p50': self.quantile(0.5), 'p99': self.quantile(0.99)}
+
+
+class _Span:
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+# stage -> Histogram, created on first use
+histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def histogram(stage):
+    found = histograms.get(stage)
+    if found is None:
+        with _histograms_lock:
+            found = histograms.setdefault(stage, Histogram())
+    return found
+
+
+def span(stage):
+    if not _enabled:
+        return _noop
+    return _Span(histogram(stage))
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def enabled():
+    return _enabled
+
+
+def reset():
+    with _histograms_lock:
+        histograms.clear()
+
+
+# {stage: {count, sum, max, p50, p99}} in seconds
+def snapshot():
+    return {stage: found.snapshot() for stage, found in sorted(histograms.items())}
+
+
+def _label(value):
+    return f"{value:.6g}"
+
+
+# Prometheus text exposition: a histogram per stage plus p50/p99 gauges
+def prometheus_text():
+    lines = ["# HELP trading_stage_seconds Latency of each stage of the signal-to-order path.",
+             "# TYPE trading_stage_seconds histogram"]
+    quantiles = ["# HELP trading_stage_quantile_seconds Latency quantiles read from the stage histograms.",
+                 "# TYPE trading_stage_quantile_seconds gauge"]
+    for stage, found in sorted(histograms.items()):
+        with found._lock:
+            counts, count, total = list(found.counts), found.count, found.total
+        cumulative = 0
+        for index, bound in enumerate(_BOUNDS):
+            cumulative += counts[index]
+            if index % 4 == 0:  # Export one bound per doubling
+                lines.append(f'trading_stage_seconds_bucket{{stage="{stage}",le="{_label(bound)}"}} {cumulative}')
+        lines.append(f'trading_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+        lines.append(f'trading_stage_seconds_sum{{stage="{stage}"}} {total!r}')
+        lines.append(f'trading_stage_seconds_count{{stage="{stage}"}} {count}')
+        for q in (0.5, 0.99):
+            quantiles.append(f'trading_stage_quantile_seconds{{stage="{stage}",quantile="{q}"}} '
+                             f'{found.quantile(q)!r}')
+    return "\n".join(lines + quantiles) + "\n"
+
+
+# Serve prometheus_text() at http://host:port/metrics from a daemon thread
+def serve(port=9108, host="127.0.0.1"):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+# Append one line {"time": ..., "stages": snapshot()} to a JSONL file
+def write_jsonl(path):
+    with open(path, "a") as f:
+        f.write(json.dumps({'time': time.time(), 'stages': snapshot()}) + "\n")
+
+
+# Statistical profiler for every thread: samples all stacks every `interval`
+# seconds and counts them, so work on the download and order pools shows up
+# too (cProfile only sees the thread that enabled it). save() writes collapsed
+# stacks ("outer;inner;leaf count"), the input format of flamegraph tools.
+class SamplingProfiler:
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def save(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    # Functions seen in the most thread samples (anywhere on the stack)
+    def top(self, limit=20):
+        functions = Counter()
+        for stack, count in self.stacks.items():
+            for function in set(stack.split(";")):
+                functions[function] += count
+        return functions.most_common(limit)
+
+
+# Profile the body of a with block and write the result to `path`:
+# kind='cprofile' -> pstats file of the calling thread (open with pstats or
+# snakeviz), kind='sample' -> collapsed stacks of every thread
+@contextlib.contextmanager
+def profile(path, kind='cprofile', interval=0.001):
+    if kind == 'sample':
+        profiler = SamplingProfiler(interval).start()
+        try:
+            yield profiler
+        finally:
+            profiler.stop()
+            profiler.save(path)
+            print(f"Profile of {profiler.samples} samples written to {path}; samples per function:")
+            for function, count in profiler.top(10):
+                print(f"{count:7}  {function}")
+    elif kind == 'cprofile':
+        import cProfile
+        import pstats
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield profiler
+        finally:
+            profiler.disable()
+            profiler.dump_stats(path)
+            print(f"Profile written to {path}")
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
+    else:
+        raise ValueError(f"Unknown profiler {kind!r}, expected 'cprofile' or 'sample'")
+
+
+# One line per stage: count, p50, p99 and max in milliseconds
+def report():
+    rows = [f"{'stage':<8} {'count':>7} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+    for stage, stats in snapshot().items():
+        rows.append(f"{stage:<8} {stats['count']:>7} {stats['p50'] * 1e3:9.2f} {stats['p99'] * 1e3:9.2f} "
+                    f"{stats['max'] * 1e3:9.2f}")
+    return "\n".join(rows)
@@ -0,0 +1,330 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import metrics
+
+DEFAULT_ORDER_DB = os.getenv(
+    "ORDER_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "orders.db"))
+
+# Order states reported by the crypto API; anything else is still working.
+# Two more are local to the store: 'pending' while the place_order request is
+# in flight (it may wait out a long rate-limit pause) and 'unknown' once it
+# returned without a response (a timeout or 5xx may still have placed the
+# order). Only 'unknown' orders can be timed out by reconcile().
+FINAL_STATES = ("filled", "canceled", "failed", "rejected")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    client_order_id TEXT PRIMARY KEY,
+    id TEXT,
+    symbol TEXT NOT NULL,
+    side TEXT NOT NULL,
+    type TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    state TEXT NOT NULL,
+    filled_quantity REAL NOT NULL DEFAULT 0,
+    average_price REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS orders_state ON orders (state);
+"""
+
+
+def _float(value, default=0.0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+# Epoch seconds of an API timestamp ("2024-05-01T12:00:00.123456-04:00"),
+# NaN when missing or unparseable
+def _epoch(text):
+    try:
+        return datetime.fromisoformat(text.replace("Z", "+00:00")).timestamp()
+    except (AttributeError, TypeError, ValueError):
+        return float("nan")
+
+
+# Tracks every order from submission to a final state. Each client_order_id
+# is written to a local SQLite store (WAL mode, so readers never block the
+# writer) before the request is sent, so a crash mid-request still leaves a
+# record to reconcile. Working orders are reconciled with one bulk
+# get_orders call per interval rather than a get_order per order, and every
+# increase in an order's filled quantity is applied to an in-memory position
+# book, so strategies can read positions without calling get_holdings.
+# With a risk.RiskEngine, every order must pass its pre-trade checks first;
+# refused orders are stored as 'rejected' and never sent. An order whose
+# request failed stays 'unknown', holding its risk reservation, until
+# reconcile() either finds it on the exchange or sees that it is not there.
+# With reconcile_interval=None no background thread is started and the
+# caller runs reconcile() itself (the backtest simulator does).
+class OrderManager:
+    def __init__(self, client, path=DEFAULT_ORDER_DB, reconcile_interval=5.0, max_pages=5, risk=None,
+                 unknown_grace=30.0, verbose=True):
+        self.client = client
+        self.risk = risk
+        self.path = path
+        self.reconcile_interval = reconcile_interval
+        self.max_pages = max_pages
+        self.unknown_grace = unknown_grace
+        self.verbose = verbose
+        self.requests = 0
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._positions = {}
+        self._load_positions()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # Rebuild the position book from the fills already in the store
+    def _load_positions(self):
+        rows = self._db.execute(
+            "SELECT symbol, SUM(CASE side WHEN 'buy' THEN filled_quantity ELSE -filled_quantity END) AS net "
+            "FROM orders GROUP BY symbol")
+        self._positions = {row["symbol"]: row["net"] for row in rows if row["net"]}
+
+    # Replace the book with the broker's holdings (one get_holdings call), for
+    # positions opened before this store existed. Crypto holdings are keyed by
+    # asset code, so they are booked under "<code>-<quote_currency>".
+    def sync_positions(self, quote_currency="USD"):
+        response = self.client.get_holdings()
+        self.requests += 1
+        if response is None:
+            return False
+        positions = {}
+        for row in response.get("results", []):
+            quantity = _float(row.get("total_quantity"))
+            if quantity:
+                positions[f"{row.get('asset_code')}-{quote_currency}"] = quantity
+        with self._lock:
+            self._positions = positions
+        return True
+
+    def position(self, symbol):
+        return self._positions.get(symbol, 0.0)
+
+    # Copy of the whole book; like position(), safe to call without the lock
+    def positions(self):
+        return dict(self._positions)
+
+    # Send an order and record it; returns the API response (None when the
+    # risk checks refuse it or the request fails). `price` is what the
+    # strategy saw, used by the risk checks to value the order. The checks
+    # only read in-memory state: buying power is refreshed by the background
+    # thread (and primed by get_order_manager), never on the order path.
+    def submit(self, side, symbol, quantity, order_type="market", order_config=None, client_order_id=None,
+               price=None):
+        client_order_id = client_order_id or str(uuid.uuid4())
+        order_config = order_config or {"asset_quantity": str(quantity)}
+        reason = None
+        if self.risk is not None:
+            with metrics.span('risk'):
+                reason = self.risk.approve(client_order_id, side, symbol, quantity, price)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO orders (client_order_id, symbol, side, type, quantity, state, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (client_order_id, symbol, side, order_type, _float(quantity),
+                 'pending' if reason is None else 'rejected', now, now))
+        if reason is not None:
+            if self.verbose:
+                print(f"Order rejected by risk checks: {side} {quantity} {symbol}: {reason}")
+            return None
+
+        order = self.client.place_order(client_order_id, side, order_type, symbol, order_config)
+        self.requests += 1
+        if order is None:
+            # The exchange may have accepted it anyway; reconcile() decides
+            with self._lock:
+                self._db.execute("UPDATE orders SET state = 'unknown', updated_at = ? WHERE client_order_id = ?",
+                                 (time.time(), client_order_id))
+            if self.verbose:
+                print(f"No response placing {side} {quantity} {symbol} ({client_order_id}); "
+                      f"it will be looked up on the exchange")
+        else:
+            self._record(order)
+        self.start()
+        return order
+
+    def _refresh_risk(self):
+        if time.monotonic() - self.risk.last_refresh >= self.risk.refresh_interval:
+            self.risk.refresh(self.client)
+
+    def cancel(self, client_order_id):
+        order = self.order(client_order_id)
+        if order is None or order["id"] is None or order["state"] in FINAL_STATES:
+            return None
+        self.requests += 1
+        return self.client.cancel_order(order["id"])
+
+    # _apply under the store lock, then pass any new fill to the risk engine
+    # (outside the lock, so the two never wait on each other)
+    def _record(self, order):
+        with self._lock:
+            fill = self._apply(order)
+        if fill is not None and self.risk is not None:
+            client_order_id, delta, average_price, final = fill
+            if delta:
+                self.risk.filled(client_order_id, delta, average_price)
+            if final:
+                self.risk.release(client_order_id)
+        return fill is not None
+
+    # Write an order response to the store and book any new fills. Returns
+    # (client_order_id, new fill quantity, average price, final state
+    # reached) when the stored order changed, else None.
+    def _apply(self, order):
+        client_order_id = order.get("client_order_id")
+        row = self._db.execute("SELECT * FROM orders WHERE client_order_id = ?", (client_order_id,)).fetchone()
+        if row is None:
+            return None  # Placed outside this manager
+        filled = _float(order.get("filled_asset_quantity"), row["filled_quantity"])
+        state = order.get("state") or row["state"]
+        average_price = _float(order.get("average_price"), row["average_price"])
+        self._db.execute(
+            "UPDATE orders SET id = ?, state = ?, filled_quantity = ?, average_price = ?, updated_at = ? "
+            "WHERE client_order_id = ?",
+            (order.get("id") or row["id"], state, filled, average_price, time.time(), client_order_id))
+        delta = filled - row["filled_quantity"]
+        if delta:
+            signed = delta if row["side"] == "buy" else -delta
+            self._positions[row["symbol"]] = self._positions.get(row["symbol"], 0.0) + signed
+        if row["state"] == state and not delta:
+            return None
+        final = state in FINAL_STATES and row["state"] not in FINAL_STATES
+        return client_order_id, delta, average_price, final
+
+    def open_orders(self):
+        placeholders = ", ".join("?" * len(FINAL_STATES))
+        with self._lock:
+            return [dict(row) for row in self._db.execute(
+                f"SELECT * FROM orders WHERE state NOT IN ({placeholders}) ORDER BY created_at", FINAL_STATES)]
+
+    def order(self, client_order_id):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM orders WHERE client_order_id = ?", (client_order_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    # One bulk pass over get_orders (newest first), following `next` pages
+    # only while some working order has not been seen yet. Orders are
+    # matched by client_order_id. An 'unknown' order whose request returned
+    # more than unknown_grace ago, and that the pass shows is absent (the
+    # listing ended or reached orders created before it), is marked 'failed'
+    # and its risk reservation released. 'pending' orders are never timed
+    # out: their request has not returned yet. Returns how many stored
+    # orders changed.
+    def reconcile(self):
+        working = self.open_orders()
+        waiting = {order["client_order_id"] for order in working}
+        if not waiting:
+            return 0
+        changed = 0
+        listed_all = False
+        oldest_listed = float("inf")
+        response = self.client.get_orders()
+        for _ in range(self.max_pages):
+            self.requests += 1
+            if response is None:
+                break
+            for order in response.get("results", []):
+                oldest_listed = min(oldest_listed, _epoch(order.get("created_at")))
+                if order.get("client_order_id") in waiting:
+                    waiting.discard(order["client_order_id"])
+                    changed += self._record(order)
+            next_page = response.get("next")
+            if not next_page:
+                listed_all = True
+                break
+            if not waiting:
+                break
+            parts = urlsplit(next_page)
+            response = self.client.make_api_request("GET", parts.path + (f"?{parts.query}" if parts.query else ""))
+
+        now = time.time()
+        for row in working:
+            client_order_id = row["client_order_id"]
+            if (client_order_id in waiting and row["state"] == 'unknown'
+                    and now - row["updated_at"] >= self.unknown_grace
+                    and (listed_all or oldest_listed < row["created_at"] - self.unknown_grace)):
+                with self._lock:
+                    self._db.execute("UPDATE orders SET state = 'failed', updated_at = ? WHERE client_order_id = ?",
+                                     (now, client_order_id))
+                if self.risk is not None:
+                    self.risk.release(client_order_id)
+                changed += 1
+        return changed
+
+    # Buying power is refreshed first thing, so an engine nobody primed is
+    # usable within one request rather than one reconcile_interval
+    def _run(self):
+        while True:
+            try:
+                if self.risk is not None:
+                    self._refresh_risk()
+            except Exception as e:
+                print(f"Risk refresh failed: {e}")
+            if self._stop.wait(self.reconcile_interval):
+                break
+            try:
+                self.reconcile()
+            except Exception as e:
+                print(f"Order reconciliation failed: {e}")
+
+    # Background reconciliation and risk refresh; started by the first submit
+    # (or by get_order_manager)
+    def start(self):
+        if self.reconcile_interval is None:
+            return self
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="order-reconcile", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def close(self):
+        self.stop()
+        with self._lock:
+            self._db.close()
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+# Process-wide manager, like get_client. The first call decides the client
+# (the shared crypto client by default), the store and the risk limits
+# (keyword arguments for risk.RiskEngine). The position book starts from the
+# account's holdings and the risk engine from the account's buying power, so
+# the first order's checks have everything in memory; the background thread
+# keeps buying power fresh from then on.
+def get_order_manager(client=None, risk_limits=None, **kwargs):
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            from risk import RiskEngine
+            if client is None:
+                from robinhood_client import get_client
+                client = get_client()
+            _manager = OrderManager(client, **kwargs)
+            _manager.risk = RiskEngine(_manager, **(risk_limits or {}))
+            _manager.sync_positions()
+            _manager.risk.refresh(client)
+            _manager.start()
+        return _manager
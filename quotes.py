@@ -0,0 +1,176 @@
+import math
+import threading
+import time
+from datetime import datetime
+from typing import NamedTuple
+
+import numpy as np
+
+
+class Quote(NamedTuple):
+    symbol: str
+    bid: float
+    ask: float
+    price: float
+    timestamp: float  # Exchange timestamp, seconds since the epoch
+
+
+def _parse_timestamp(value):
+    if not value:
+        return math.nan
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return math.nan
+
+
+def _parse_price(row, *keys):
+    for key in keys:
+        value = row.get(key)
+        if value not in (None, ""):
+            return float(value)
+    return math.nan
+
+
+# (symbol, bid, ask, price, timestamp) for each row of a best_bid_ask response
+def parse_quotes(response):
+    rows = response.get("results", []) if isinstance(response, dict) else []
+    for row in rows:
+        yield (row.get("symbol"),
+               _parse_price(row, "bid_inclusive_of_sell_spread", "bid_price", "price"),
+               _parse_price(row, "ask_inclusive_of_buy_spread", "ask_price", "price"),
+               _parse_price(row, "price"),
+               _parse_timestamp(row.get("timestamp")))
+
+
+# Latest best bid/ask for a fixed watchlist, stored column-wise: one NumPy
+# array per field indexed by the symbol's position in `symbols`. Readers get
+# a consistent row or a copy of the columns under a lock; no network access.
+class QuoteBook:
+    def __init__(self, symbols):
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        n = len(self.symbols)
+        self.bid = np.full(n, np.nan)
+        self.ask = np.full(n, np.nan)
+        self.price = np.full(n, np.nan)
+        self.timestamp = np.full(n, np.nan)
+        self.updated = np.full(n, np.nan)  # Local time.time() when the row was written
+        self._lock = threading.Lock()
+
+    # Write the rows of a best_bid_ask response ({"results": [...]})
+    def update(self, response, received=None):
+        received = time.time() if received is None else received
+        rows = 0
+        with self._lock:
+            for symbol, bid, ask, price, timestamp in parse_quotes(response):
+                rows += 1
+                i = self.index.get(symbol)
+                if i is None:
+                    continue
+                self.bid[i] = bid
+                self.ask[i] = ask
+                self.price[i] = price
+                self.timestamp[i] = timestamp
+                self.updated[i] = received
+        return rows
+
+    def quote(self, symbol):
+        i = self.index[symbol]
+        with self._lock:
+            return Quote(symbol, float(self.bid[i]), float(self.ask[i]), float(self.price[i]),
+                         float(self.timestamp[i]))
+
+    # Copies of every column, taken together
+    def snapshot(self):
+        with self._lock:
+            return {
+                'symbol': list(self.symbols),
+                'bid': self.bid.copy(),
+                'ask': self.ask.copy(),
+                'price': self.price.copy(),
+                'timestamp': self.timestamp.copy(),
+                'updated': self.updated.copy(),
+            }
+
+    # Seconds since each row was last refreshed (NaN when never filled)
+    def age(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            return now - self.updated
+
+
+# Polls best_bid_ask for the whole watchlist on a fixed cadence from one
+# background thread and keeps the QuoteBook current. Strategies read quotes
+# from the book, so the request rate depends only on the cadence and the
+# number of chunks, never on how many strategies are running. Keep the interval
+# above the client's best_bid_ask cache TTL so every poll reaches the server.
+# Listeners added with subscribe() get every raw response as
+# listener(response, received) on the polling thread.
+class QuoteSnapshotService:
+    def __init__(self, client, symbols, interval=1.0, chunk_size=100):
+        self.client = client
+        self.book = QuoteBook(symbols)
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self.requests = 0
+        self.errors = 0
+        self.last_poll = math.nan
+        self.listeners = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    # One batched request per chunk of symbols; returns rows received
+    def poll_once(self):
+        received = 0
+        symbols = self.book.symbols
+        for start in range(0, len(symbols), self.chunk_size):
+            response = self.client.get_best_bid_ask(*symbols[start:start + self.chunk_size])
+            self.requests += 1
+            if response is None:
+                self.errors += 1
+                continue
+            now = time.time()
+            received += self.book.update(response, now)
+            for listener in self.listeners:
+                try:
+                    listener(response, now)
+                except Exception as e:
+                    print(f"Quote listener {getattr(listener, '__name__', listener)} failed: {e}")
+        self.last_poll = time.time()
+        return received
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+        return listener
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.poll_once()
+            except Exception as e:
+                self.errors += 1
+                print(f"Quote poll failed: {e}")
+            self._stop.wait(max(self.interval - (time.monotonic() - started), 0.0))
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="quote-snapshots", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    # Latest quote for a symbol, or None when it is missing or older than max_age seconds
+    def latest(self, symbol, max_age=None):
+        quote = self.book.quote(symbol)
+        if math.isnan(quote.bid) and math.isnan(quote.ask):
+            return None
+        if max_age is not None and self.book.age()[self.book.index[symbol]] > max_age:
+            return None
+        return quote
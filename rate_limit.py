@@ -0,0 +1,181 @@
+import heapq
+import itertools
+import threading
+import time
+
+# Priority lanes, lowest value served first
+ORDERS = 0  # place_order / cancel_order
+ACCOUNT = 1  # order status, account info
+MARKET_DATA = 2  # best bid/ask, estimated price, holdings, trading pairs
+
+LANE_NAMES = {ORDERS: 'orders', ACCOUNT: 'account', MARKET_DATA: 'market_data'}
+
+# Robinhood crypto API limits: 100 requests per minute, bursts of up to 300
+DEFAULT_RATE = 100 / 60
+DEFAULT_BURST = 300
+
+
+# Lane for a signed request: every POST is an order or a cancel, market data
+# and position lookups yield to everything else
+def request_lane(method, path):
+    if method == "POST":
+        return ORDERS
+    if "/marketdata/" in path or "/holdings/" in path or "/trading_pairs/" in path:
+        return MARKET_DATA
+    return ACCOUNT
+
+
+# Seconds to wait from a Retry-After header (delta-seconds or an HTTP date),
+# falling back to `default` when the header is missing or unreadable
+def retry_after_seconds(value, default):
+    if not value:
+        return default
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+# Token bucket shared by the sync and async schedulers. Callers queue in a heap
+# ordered by (lane, arrival) and only the head of the queue may take a token,
+# so a queued order always goes before any queued market-data request.
+class _TokenBucket:
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        self.rate = rate
+        self.capacity = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._queue = []
+        self._arrivals = itertools.count()
+        self._stats = {lane: {'requests': 0, 'wait_total': 0.0, 'wait_max': 0.0} for lane in LANE_NAMES}
+
+    # Take a token now and return 0, or return how long until one is available
+    def _take(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    # Take back the ticket of a caller that gave up (cancelled, timed out or
+    # interrupted) so the callers behind it are not stuck waiting on it
+    def _abandon(self, ticket):
+        if ticket in self._queue:
+            self._queue.remove(ticket)
+            heapq.heapify(self._queue)
+
+    def _record(self, lane, waited):
+        stats = self._stats[lane]
+        stats['requests'] += 1
+        stats['wait_total'] += waited
+        stats['wait_max'] = max(stats['wait_max'], waited)
+
+    # Stop handing out tokens for `seconds` (server asked us to back off)
+    def _pause(self, seconds):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+    # Queue depth and wait times per lane
+    def metrics(self):
+        depth = {lane: 0 for lane in LANE_NAMES}
+        for lane, _ in list(self._queue):
+            depth[lane] += 1
+        return {
+            LANE_NAMES[lane]: {
+                'queue_depth': depth[lane],
+                'requests': stats['requests'],
+                'wait_total': stats['wait_total'],
+                'wait_avg': stats['wait_total'] / stats['requests'] if stats['requests'] else 0.0,
+                'wait_max': stats['wait_max'],
+            }
+            for lane, stats in self._stats.items()
+        }
+
+
+# Thread-safe scheduler for the requests-based clients
+class RequestScheduler(_TokenBucket):
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        super().__init__(rate, burst)
+        self._condition = threading.Condition()
+
+    # Block until this lane may send a request; returns the time spent waiting
+    def acquire(self, lane=ACCOUNT):
+        started = time.monotonic()
+        with self._condition:
+            ticket = (lane, next(self._arrivals))
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    if self._queue[0] == ticket:
+                        delay = self._take()
+                        if delay == 0:
+                            heapq.heappop(self._queue)
+                            self._condition.notify_all()
+                            break
+                        self._condition.wait(delay)
+                    else:
+                        self._condition.wait()
+            except BaseException:  # KeyboardInterrupt and the like
+                self._abandon(ticket)
+                self._condition.notify_all()
+                raise
+            waited = time.monotonic() - started
+            self._record(lane, waited)
+        return waited
+
+    def pause(self, seconds):
+        with self._condition:
+            self._pause(seconds)
+            self._condition.notify_all()
+
+
+# asyncio flavour of RequestScheduler for AsyncCryptoAPITrading. It must only
+# be used from one event loop. asyncio is imported on first use so the sync
+# clients do not pay for it at startup.
+class AsyncRequestScheduler(_TokenBucket):
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        super().__init__(rate, burst)
+        self._condition = None
+
+    async def acquire(self, lane=ACCOUNT):
+        import asyncio
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        started = time.monotonic()
+        async with self._condition:
+            ticket = (lane, next(self._arrivals))
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    if self._queue[0] == ticket:
+                        delay = self._take()
+                        if delay == 0:
+                            heapq.heappop(self._queue)
+                            self._condition.notify_all()
+                            break
+                        try:
+                            await asyncio.wait_for(self._condition.wait(), delay)
+                        except asyncio.TimeoutError:
+                            pass
+                    else:
+                        await self._condition.wait()
+            except BaseException:  # Cancelled, e.g. by a request timeout
+                self._abandon(ticket)
+                self._condition.notify_all()
+                raise
+            waited = time.monotonic() - started
+            self._record(lane, waited)
+        return waited
+
+    def pause(self, seconds):
+        self._pause(seconds)
@@ -0,0 +1,207 @@
+import json
+import math
+import os
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+
+from quotes import parse_quotes
+
+# One fixed-width record per quote or bar close. interval is 0 for a
+# best_bid_ask quote and the bar length in seconds for a bar (60 for 1m,
+# 86400 for 1d); bars only carry a price (the close), bid and ask are NaN.
+RECORD_DTYPE = np.dtype([('timestamp', '<f8'), ('symbol', '<u4'), ('interval', '<u4'),
+                         ('bid', '<f8'), ('ask', '<f8'), ('price', '<f8')])
+
+QUOTE = 0
+
+DEFAULT_LOG_DIR = os.getenv(
+    "TICK_LOG_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".tick_log"))
+
+_SUFFIX = ".ticks"
+
+
+def _interval_seconds(interval):
+    from market_data import parse_span
+    span = parse_span(interval)
+    if span is None:
+        raise ValueError(f"Can't record bars of interval {interval!r}")
+    return int(span.total_seconds())
+
+
+def _day(day_number):
+    return datetime.fromtimestamp(day_number * 86400, tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+# Symbol <-> id table shared by every day file of a log. Ids are assigned in
+# order of first appearance and never change, so old files stay readable.
+class SymbolTable:
+    def __init__(self, directory):
+        self.path = os.path.join(directory, "symbols.json")
+        self.symbols = []
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.symbols = json.load(f)
+        self.ids = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+    def id(self, symbol):
+        symbol_id = self.ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = self.ids[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            # Written before any record that uses the id
+            temporary = f"{self.path}.tmp"
+            with open(temporary, "w") as f:
+                json.dump(self.symbols, f)
+            os.replace(temporary, self.path)
+        return symbol_id
+
+
+# Appends quotes and bars to one raw RECORD_DTYPE file per UTC day
+# (<directory>/YYYY-MM-DD.ticks), no header, so a file is a NumPy array on
+# disk. Each batch is written with one write() call and flushed; a crash can
+# at worst leave a partial record at the end, which TickLog ignores and the
+# next append to that day cuts off.
+# Unchanged quotes (same exchange timestamp and prices) are not written again.
+class TickRecorder:
+    def __init__(self, directory=DEFAULT_LOG_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.symbols = SymbolTable(directory)
+        self.records = 0
+        self._files = {}  # day -> open file
+        self._last_quote = {}  # symbol id -> (timestamp, bid, ask, price)
+        self._last_bar = {}  # (symbol id, interval) -> timestamp of the newest bar written
+        self._lock = threading.Lock()
+
+    def _file(self, day):
+        f = self._files.get(day)
+        if f is None:
+            # Keep only today's (and a straggling yesterday's) file open
+            for old in sorted(self._files)[:-1]:
+                self._files.pop(old).close()
+            f = self._files[day] = open(os.path.join(self.directory, day + _SUFFIX), "ab")
+            # Drop a partial record left by a crash so new ones stay aligned
+            partial = f.seek(0, os.SEEK_END) % RECORD_DTYPE.itemsize
+            if partial:
+                f.truncate(f.tell() - partial)
+        return f
+
+    def append(self, records):
+        records = np.asarray(records, dtype=RECORD_DTYPE)
+        if not len(records):
+            return 0
+        with self._lock:
+            days = (records['timestamp'] // 86400).astype(np.int64)
+            for day in np.unique(days):
+                f = self._file(_day(day))
+                f.write(records[days == day].tobytes())
+                f.flush()
+            self.records += len(records)
+        return len(records)
+
+    # Record a best_bid_ask response; the QuoteSnapshotService listener signature
+    def record_quotes(self, response, received=None):
+        rows = []
+        for symbol, bid, ask, price, timestamp in parse_quotes(response):
+            if symbol is None:
+                continue
+            if math.isnan(timestamp):
+                timestamp = received if received is not None else datetime.now(tz=timezone.utc).timestamp()
+            with self._lock:
+                symbol_id = self.symbols.id(symbol)
+                quote = (timestamp, bid, ask, price)
+                if self._last_quote.get(symbol_id) == quote:
+                    continue
+                self._last_quote[symbol_id] = quote
+            rows.append((timestamp, symbol_id, QUOTE, bid, ask, price))
+        return self.append(rows)
+
+    # Record the closed bars of an OHLCV frame (market_data / yfinance). The
+    # newest bar may still be forming, so it is left for a later call, and
+    # bars already written are skipped: passing the whole window every poll
+    # is fine.
+    def record_bars(self, symbol, interval, frame):
+        if frame is None or len(frame) < 2:
+            return 0
+        seconds = _interval_seconds(interval)
+        timestamps = frame.index[:-1].as_unit('ns').asi8 / 1e9
+        closes = frame['Close'].to_numpy(dtype=np.float64)[:-1]
+        with self._lock:
+            symbol_id = self.symbols.id(symbol)
+            newest = self._last_bar.get((symbol_id, seconds), -math.inf)
+            fresh = (timestamps > newest) & ~np.isnan(closes)
+            if not fresh.any():
+                return 0
+            self._last_bar[(symbol_id, seconds)] = timestamps[fresh][-1]
+        records = np.zeros(int(fresh.sum()), dtype=RECORD_DTYPE)
+        records['timestamp'] = timestamps[fresh]
+        records['symbol'] = symbol_id
+        records['interval'] = seconds
+        records['bid'] = np.nan
+        records['ask'] = np.nan
+        records['price'] = closes[fresh]
+        return self.append(records)
+
+    # trading_daemon 'bars' handler: (jobs, frame)
+    def on_bars(self, jobs, frame):
+        self.record_bars(jobs[0].symbol, jobs[0].interval, frame)
+
+    # Record everything a quote service polls and a daemon downloads
+    def attach(self, quote_service=None, daemon=None):
+        if quote_service is not None:
+            quote_service.subscribe(self.record_quotes)
+        if daemon is not None:
+            daemon.on('bars', self.on_bars)
+        return self
+
+    def close(self):
+        with self._lock:
+            for f in self._files.values():
+                f.close()
+            self._files.clear()
+
+
+# Read side of a TickRecorder directory. Every day file is memory-mapped
+# read-only and handed out as a NumPy record array view, so scanning months
+# of data never parses or copies it; filtering (a boolean mask) is the first
+# copy.
+class TickLog:
+    def __init__(self, directory=DEFAULT_LOG_DIR):
+        self.directory = directory
+
+    # Re-read on every access: the recorder may have added symbols since
+    @property
+    def symbols(self):
+        return SymbolTable(self.directory).symbols
+
+    def days(self, start=None, end=None):
+        days = sorted(name[:-len(_SUFFIX)] for name in os.listdir(self.directory) if name.endswith(_SUFFIX))
+        return [day for day in days if (start is None or day >= start) and (end is None or day <= end)]
+
+    # Zero-copy view of one day's records (whole records only)
+    def read(self, day):
+        path = os.path.join(self.directory, day + _SUFFIX)
+        count = os.path.getsize(path) // RECORD_DTYPE.itemsize
+        if not count:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return np.memmap(path, dtype=RECORD_DTYPE, mode='r', shape=(count,))
+
+    # Day views between start and end ("YYYY-MM-DD", inclusive)
+    def scan(self, start=None, end=None):
+        for day in self.days(start, end):
+            yield day, self.read(day)
+
+    # Quotes (or bars of one interval in seconds) for the given symbols over
+    # a date range, concatenated in file order
+    def select(self, start=None, end=None, symbols=None, interval=QUOTE):
+        known = self.symbols
+        ids = None if symbols is None else [known.index(s) for s in symbols if s in known]
+        parts = []
+        for _, records in self.scan(start, end):
+            mask = records['interval'] == interval
+            if ids is not None:
+                mask &= np.isin(records['symbol'], ids)
+            parts.append(records[mask])
+        return np.concatenate(parts) if parts else np.empty(0, dtype=RECORD_DTYPE)
@@ -0,0 +1,210 @@
+import numpy as np
+import pandas as pd
+
+from market_data import FIELDS, parse_span
+
+# Roll-ups built from the 1-minute stream
+DEFAULT_INTERVALS = ('5m', '1h', '1d')
+
+
+def _interval_ns(interval):
+    span = parse_span(interval)
+    if span is None or span.total_seconds() % 60:
+        raise ValueError(f"Can't roll 1-minute bars up to {interval!r}")
+    return int(span.total_seconds()) * 10 ** 9
+
+
+# OHLCV roll-up of one interval for one symbol. Buckets are aligned to the
+# bars' wall clock (midnight for 1d, the top of the hour for 1h), so a 1d bar
+# lines up with the daily bars yfinance returns. Closed buckets are appended
+# to `chunks` and never touched again; `current` is the bucket still forming.
+# With `max_bars` set, only that many of the newest buckets are kept (older
+# ones are dropped once twice as many have piled up).
+class _Rollup:
+    def __init__(self, interval, max_bars=None):
+        self.interval = interval
+        self.width = _interval_ns(interval)
+        self.max_bars = max_bars
+        self.chunks = []  # (bucket starts, (n x 5) OHLCV) per closed batch
+        self.closed = 0  # buckets held in `chunks`
+        self.current = None  # (bucket start, [open, high, low, close, volume])
+
+    # Fold sorted minute bars (wall-clock ns, (n x 5) OHLCV) into the roll-up
+    def add(self, times, values):
+        buckets = times - times % self.width
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(times)] - 1
+        rolled = np.column_stack([
+            values[starts, 0],
+            np.maximum.reduceat(values[:, 1], starts),
+            np.minimum.reduceat(values[:, 2], starts),
+            values[ends, 3],
+            np.add.reduceat(values[:, 4], starts),
+        ])
+        bucket_starts = buckets[starts]
+
+        if self.current is not None:
+            if bucket_starts[0] == self.current[0]:
+                rolled[0] = _merge(self.current[1], rolled[0])
+            else:
+                self.chunks.append((np.array([self.current[0]]), np.array([self.current[1]])))
+                self.closed += 1
+        if len(bucket_starts) > 1:
+            self.chunks.append((bucket_starts[:-1], rolled[:-1]))
+            self.closed += len(bucket_starts) - 1
+        self.current = (bucket_starts[-1], rolled[-1])
+        if self.max_bars is not None and self.closed > 2 * self.max_bars:
+            self._compact()
+
+    # Join the closed chunks into one (so later reads concatenate a single
+    # array), dropping buckets beyond max_bars
+    def _compact(self):
+        times = np.concatenate([chunk[0] for chunk in self.chunks])
+        values = np.concatenate([chunk[1] for chunk in self.chunks])
+        if self.max_bars is not None and len(times) > self.max_bars:
+            times, values = times[-self.max_bars:].copy(), values[-self.max_bars:].copy()
+        self.chunks = [(times, values)]
+        self.closed = len(times)
+
+    # Closed buckets plus the forming one, with `pending` (a minute that may
+    # still change) merged into the forming bucket or starting a new one
+    def arrays(self, pending=None):
+        if len(self.chunks) > 1:
+            self._compact()
+        times = [chunk[0] for chunk in self.chunks]
+        values = [chunk[1] for chunk in self.chunks]
+        current = self.current
+        if pending is not None:
+            pending_bucket = pending[0] - pending[0] % self.width
+            if current is not None and current[0] == pending_bucket:
+                current = (current[0], _merge(current[1], pending[1]))
+            else:
+                if current is not None:
+                    times.append(np.array([current[0]]))
+                    values.append(np.array([current[1]]))
+                current = (pending_bucket, pending[1])
+        if current is not None:
+            times.append(np.array([current[0]]))
+            values.append(np.array([current[1]]))
+        if not times:
+            return np.empty(0, dtype=np.int64), np.empty((0, len(FIELDS)))
+        times, values = np.concatenate(times), np.concatenate(values)
+        if self.max_bars is not None and len(times) > self.max_bars:
+            return times[-self.max_bars:], values[-self.max_bars:]
+        return times, values
+
+
+def _merge(bar, later):
+    merged = bar.copy()
+    merged[1] = max(bar[1], later[1])
+    merged[2] = min(bar[2], later[2])
+    merged[3] = later[3]
+    merged[4] = bar[4] + later[4]
+    return merged
+
+
+# Incrementally rolls each symbol's 1-minute bars up into coarser OHLCV
+# bars. Feed it the 1-minute frames from market_data (the whole window every
+# time is fine): only minutes newer than the last one seen are folded in. The
+# newest minute is held back as pending until a later one arrives, because
+# yfinance keeps revising the bar that is still forming. The 1-minute series
+# itself is only kept when '1m' is one of the intervals, and `max_bars` caps
+# how many bars each interval keeps so a long-running scanner stays bounded.
+class BarAggregator:
+    def __init__(self, intervals=DEFAULT_INTERVALS, max_bars=None):
+        self.intervals = tuple(intervals)
+        self.max_bars = max_bars
+        self._symbols = {}
+
+    def _state(self, symbol):
+        state = self._symbols.get(symbol)
+        if state is None:
+            state = self._symbols[symbol] = {
+                'tz': None,
+                'last': None,  # wall-clock ns of the last committed minute
+                'pending': None,  # (wall-clock ns, OHLCV) of the newest minute
+                'rollups': {interval: _Rollup(interval, self.max_bars) for interval in self.intervals},
+            }
+        return state
+
+    # Fold a 1-minute OHLCV frame into the symbol's series; returns how many
+    # new minutes were committed
+    def update(self, symbol, frame):
+        if frame.empty:
+            return 0
+        state = self._state(symbol)
+        index = pd.DatetimeIndex(frame.index)
+        if state['tz'] is None:
+            state['tz'] = index.tz
+        times = index.tz_localize(None).as_unit('ns').asi8 if index.tz is not None else index.as_unit('ns').asi8
+        values = frame[list(FIELDS)].to_numpy(dtype=np.float64, copy=True)
+        values[:, 4] = np.nan_to_num(values[:, 4])
+
+        floor = state['last'] if state['last'] is not None else np.iinfo(np.int64).min
+        fresh = times > floor
+        times, values = times[fresh], values[fresh]
+        if not len(times):
+            return 0
+
+        # The last minute of this frame becomes the new pending bar; the one
+        # pending before it is final unless this frame re-sent it
+        commit_times, commit_values = times[:-1], values[:-1]
+        pending = state['pending']
+        if pending is not None and pending[0] < times[0]:
+            commit_times = np.r_[pending[0], commit_times]
+            commit_values = np.vstack([pending[1], commit_values])
+        state['pending'] = (times[-1], values[-1])
+
+        if len(commit_times):
+            for rollup in state['rollups'].values():
+                rollup.add(commit_times, commit_values)
+            state['last'] = commit_times[-1]
+        return len(commit_times)
+
+    # (wall-clock ns times, (n x 5) OHLCV) for one of the intervals, newest
+    # bucket included even while it is still forming
+    def arrays(self, symbol, interval):
+        if interval not in self.intervals:
+            raise ValueError(f"{interval!r} is not rolled up (intervals: {', '.join(self.intervals)})")
+        state = self._symbols.get(symbol)
+        if state is None:
+            return np.empty(0, dtype=np.int64), np.empty((0, len(FIELDS)))
+        return state['rollups'][interval].arrays(state['pending'])
+
+    # The same bars as an OHLCV frame in the symbol's timezone
+    def bars(self, symbol, interval):
+        state = self._symbols.get(symbol)
+        if state is None:
+            return pd.DataFrame(columns=list(FIELDS), dtype=np.float64)
+        times, values = self.arrays(symbol, interval)
+        index = pd.to_datetime(times, unit='ns')
+        if state['tz'] is not None:
+            index = index.tz_localize(state['tz'], ambiguous=True, nonexistent='shift_forward')
+        return pd.DataFrame(values, index=index, columns=list(FIELDS))
+
+    # Daily (or other) history from a longer download with the bars the
+    # 1-minute stream covers replaced by the roll-up, so every timeframe
+    # agrees on the latest price
+    def extend(self, symbol, interval, history):
+        rolled = self.bars(symbol, interval)
+        if rolled.empty:
+            return history
+        if history.empty:
+            return rolled
+        if history.index.tz is None and rolled.index.tz is not None:
+            rolled.index = rolled.index.tz_localize(None)
+        elif history.index.tz is not None:
+            rolled.index = rolled.index.tz_localize(history.index.tz) if rolled.index.tz is None \
+                else rolled.index.tz_convert(history.index.tz)
+        # The oldest roll-up bucket may only cover part of its interval
+        older = history[history.index <= rolled.index[0]]
+        return pd.concat([older[list(FIELDS)], rolled.iloc[1:]])
+
+    def symbols(self):
+        return list(self._symbols)
+
+    def reset(self, symbol=None):
+        if symbol is None:
+            self._symbols.clear()
+        else:
+            self._symbols.pop(symbol, None)
@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+# TTL + LRU store shared by the sync and async response caches. Keys are
+# request paths; invalidate() drops every key under the given path prefixes
+# and bumps a generation counter so a request that was already in flight
+# when the data changed does not put its stale answer back.
+class _TTLStore:
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, entry[1]
+
+    def _put(self, key, value, ttl, generation):
+        # Errors come back as None and are never cached
+        if value is None or generation != self._generation:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _invalidate(self, prefixes):
+        self._generation += 1
+        for key in [key for key in self._entries if key.startswith(tuple(prefixes))]:
+            del self._entries[key]
+
+    def clear(self):
+        self._invalidate(("",))
+
+
+# Thread-safe cache for the requests-based clients. Concurrent fetches of the
+# same key share one call to `load`.
+class ResponseCache(_TTLStore):
+    def __init__(self, max_entries=256):
+        super().__init__(max_entries)
+        self._lock = threading.Lock()
+        self._in_flight = {}  # key -> (done event, result holder)
+
+    def fetch(self, key, ttl, load):
+        with self._lock:
+            found, value = self._get(key)
+            if found:
+                self.hits += 1
+                return value
+            self.misses += 1
+            waiter = self._in_flight.get(key)
+            if waiter is None:
+                waiter = self._in_flight[key] = (threading.Event(), [])
+                leader = True
+                generation = self._generation
+            else:
+                leader = False
+
+        done, result = waiter
+        if not leader:
+            done.wait()
+            return result[0] if result else None
+
+        value = None
+        try:
+            value = load()
+        finally:
+            with self._lock:
+                self._put(key, value, ttl, generation)
+                del self._in_flight[key]
+            result.append(value)
+            done.set()
+        return value
+
+    def invalidate(self, *prefixes):
+        with self._lock:
+            self._invalidate(prefixes)
+
+
+# asyncio flavour: identical GETs issued together await one shared task.
+# asyncio is imported on first use, as in rate_limit.AsyncRequestScheduler.
+class AsyncResponseCache(_TTLStore):
+    def __init__(self, max_entries=256):
+        super().__init__(max_entries)
+        self._in_flight = {}  # key -> asyncio.Future
+
+    async def fetch(self, key, ttl, load):
+        import asyncio
+        found, value = self._get(key)
+        if found:
+            self.hits += 1
+            return value
+        self.misses += 1
+        future = self._in_flight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = self._in_flight[key] = asyncio.ensure_future(load())
+        generation = self._generation
+        try:
+            value = await asyncio.shield(future)
+        finally:
+            self._in_flight.pop(key, None)
+        self._put(key, value, ttl, generation)
+        return value
+
+    def invalidate(self, *prefixes):
+        self._invalidate(prefixes)
@@ -0,0 +1,187 @@
+import math
+import threading
+import time
+from collections import deque
+
+
+def _float(value, default=math.nan):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+# Pre-trade checks run in-process before an order is sent. Everything is
+# answered from memory:
+#   buying power  last get_account value, debited/credited locally as fills
+#                 arrive and corrected by refresh()
+#   holdings      the order manager's position book (book.position/positions)
+#   prices        the price passed with the order, else the last mark()
+# Approved orders hold a reservation until they fill or finish, so two
+# quick buys can't spend the same cash and two sells can't sell the same
+# coins. A limit of None is not checked.
+class RiskEngine:
+    def __init__(self, book=None, max_order_notional=None, max_symbol_notional=None,
+                 max_total_notional=None, max_orders_per_window=20, max_symbol_orders_per_window=3,
+                 window=60.0, allow_short=False, refresh_interval=60.0):
+        self.book = book
+        self.max_order_notional = max_order_notional
+        self.max_symbol_notional = max_symbol_notional
+        self.max_total_notional = max_total_notional
+        self.max_orders_per_window = max_orders_per_window
+        self.max_symbol_orders_per_window = max_symbol_orders_per_window
+        self.window = window
+        self.allow_short = allow_short
+        self.refresh_interval = refresh_interval
+        self.buying_power = math.nan
+        self.last_refresh = -math.inf
+        self.halted = None  # Reason string while trading is halted
+        self.rejections = 0
+        self._marks = {}  # symbol -> last known price
+        self._reservations = {}  # client_order_id -> [side, symbol, remaining quantity, price]
+        self._pending_buy = {}  # symbol -> reserved buy notional
+        self._pending_sell = {}  # symbol -> reserved sell quantity
+        self._pending_buy_total = 0.0
+        self._sent = deque()  # send times, all symbols
+        self._sent_by_symbol = {}  # symbol -> deque of send times
+        self._lock = threading.RLock()
+
+    # Buying power from get_account (answered from the client's short cache)
+    def refresh(self, client):
+        account = client.get_account()
+        self.last_refresh = time.monotonic()
+        buying_power = _float(account.get("buying_power")) if isinstance(account, dict) else math.nan
+        if math.isnan(buying_power):
+            return False
+        with self._lock:
+            self.buying_power = buying_power
+        return True
+
+    def mark(self, symbol, price):
+        self._marks[symbol] = float(price)
+
+    def halt(self, reason="halted"):
+        self.halted = reason
+
+    def resume(self):
+        self.halted = None
+
+    @staticmethod
+    def _expire(times, cutoff):
+        while times and times[0] <= cutoff:
+            times.popleft()
+
+    # Returns None when the order may be sent, else the reason it may not
+    def check(self, side, symbol, quantity, price=None, now=None):
+        now = time.monotonic() if now is None else now
+        quantity = float(quantity)
+        with self._lock:
+            if self.halted:
+                return self._reject(f"trading halted: {self.halted}")
+            if side not in ("buy", "sell"):
+                return self._reject(f"unknown side {side!r}")
+            if not quantity > 0:
+                return self._reject(f"quantity must be positive, got {quantity:g}")
+
+            cutoff = now - self.window
+            self._expire(self._sent, cutoff)
+            if self.max_orders_per_window is not None and len(self._sent) >= self.max_orders_per_window:
+                return self._reject(f"{len(self._sent)} orders in the last {self.window:g}s")
+            symbol_sent = self._sent_by_symbol.get(symbol)
+            if symbol_sent is not None:
+                self._expire(symbol_sent, cutoff)
+                if self.max_symbol_orders_per_window is not None and \
+                        len(symbol_sent) >= self.max_symbol_orders_per_window:
+                    return self._reject(f"{len(symbol_sent)} {symbol} orders in the last {self.window:g}s")
+
+            if price is None:
+                price = self._marks.get(symbol)
+            if price is None or not price > 0:
+                return self._reject(f"no price for {symbol}")
+            price = float(price)
+            notional = quantity * price
+            if self.max_order_notional is not None and notional > self.max_order_notional:
+                return self._reject(f"order notional {notional:.2f} over {self.max_order_notional:.2f}")
+
+            position = self.book.position(symbol) if self.book is not None else 0.0
+            if side == "sell":
+                available = position - self._pending_sell.get(symbol, 0.0)
+                if not self.allow_short and quantity > available + 1e-12:
+                    return self._reject(f"sell {quantity:g} {symbol} with {max(available, 0.0):g} available")
+                return None
+
+            if math.isnan(self.buying_power):
+                return self._reject("buying power unknown")
+            spendable = self.buying_power - self._pending_buy_total
+            if notional > spendable:
+                return self._reject(f"buy {notional:.2f} with {spendable:.2f} buying power")
+            if self.max_symbol_notional is not None:
+                exposure = position * price + self._pending_buy.get(symbol, 0.0) + notional
+                if exposure > self.max_symbol_notional:
+                    return self._reject(f"{symbol} exposure {exposure:.2f} over {self.max_symbol_notional:.2f}")
+            if self.max_total_notional is not None:
+                exposure = self._pending_buy_total + notional
+                held = self.book.positions() if self.book is not None else {}
+                for held_symbol, held_quantity in held.items():
+                    mark = price if held_symbol == symbol else self._marks.get(held_symbol, 0.0)
+                    exposure += max(held_quantity, 0.0) * mark
+                if exposure > self.max_total_notional:
+                    return self._reject(f"total exposure {exposure:.2f} over {self.max_total_notional:.2f}")
+            return None
+
+    # check() and, when it passes, reserve() as one step; returns the reason
+    # for a rejection or None
+    def approve(self, client_order_id, side, symbol, quantity, price=None, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            reason = self.check(side, symbol, quantity, price, now)
+            if reason is None:
+                self.reserve(client_order_id, side, symbol, quantity, price, now)
+            return reason
+
+    def _reject(self, reason):
+        self.rejections += 1
+        return reason
+
+    # Hold cash (buys) or coins (sells) for an approved order and count it
+    # against the rate limits
+    def reserve(self, client_order_id, side, symbol, quantity, price=None, now=None):
+        now = time.monotonic() if now is None else now
+        price = float(price if price is not None else self._marks.get(symbol, 0.0))
+        quantity = float(quantity)
+        with self._lock:
+            self._sent.append(now)
+            self._sent_by_symbol.setdefault(symbol, deque()).append(now)
+            self._marks[symbol] = price
+            self._reservations[client_order_id] = [side, symbol, quantity, price]
+            self._adjust(side, symbol, quantity, price)
+
+    def _adjust(self, side, symbol, quantity, price):
+        if side == "buy":
+            self._pending_buy[symbol] = self._pending_buy.get(symbol, 0.0) + quantity * price
+            self._pending_buy_total += quantity * price
+        else:
+            self._pending_sell[symbol] = self._pending_sell.get(symbol, 0.0) + quantity
+
+    # A fill of `quantity` at `price`: move it from the reservation to the
+    # buying power (the position book is updated by the order manager)
+    def filled(self, client_order_id, quantity, price=None):
+        with self._lock:
+            reservation = self._reservations.get(client_order_id)
+            if reservation is None:
+                return
+            side, symbol, remaining, reserved_price = reservation
+            quantity = min(float(quantity), remaining)
+            price = reserved_price if price is None or math.isnan(price) else float(price)
+            self._adjust(side, symbol, -quantity, reserved_price)
+            reservation[2] -= quantity
+            if not math.isnan(self.buying_power):
+                self.buying_power += -quantity * price if side == "buy" else quantity * price
+
+    # Drop what is left of a reservation (order finished, failed or was rejected)
+    def release(self, client_order_id):
+        with self._lock:
+            reservation = self._reservations.pop(client_order_id, None)
+            if reservation is not None:
+                side, symbol, remaining, price = reservation
+                self._adjust(side, symbol, -remaining, price)
@@ -0,0 +1,131 @@
+import asyncio
+import json
+from typing import Any, Dict, Iterable, Optional
+
+import aiohttp
+
+import metrics
+from rate_limit import AsyncRequestScheduler, request_lane
+from response_cache import AsyncResponseCache
+from robinhood_client import CRYPTO_BASE_URL, CryptoAPITrading
+
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+# asyncio variant of CryptoAPITrading. Every endpoint method is inherited and
+# returns a coroutine, signing is the same Ed25519 scheme, and at most
+# max_concurrency requests are in flight at once over one aiohttp session.
+# Retries follow the sync client: connection errors and 429s for every method,
+# read errors and 5xx for GETs only. Requests go through an
+# AsyncRequestScheduler with the same priority lanes as the sync client.
+#
+#     async with AsyncCryptoAPITrading() as client:
+#         statuses = await client.get_orders_status(order_ids)
+class AsyncCryptoAPITrading(CryptoAPITrading):
+    def __init__(self, base_url: str = CRYPTO_BASE_URL, max_concurrency: int = 10, **kwargs):
+        kwargs.setdefault("pool_size", max_concurrency)
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+        super().__init__(base_url, **kwargs)
+
+    # The aiohttp session has to be created inside the running event loop
+    def _create_session(self):
+        return None
+
+    def _create_scheduler(self):
+        return AsyncRequestScheduler()
+
+    def _create_response_cache(self, cache_size):
+        return AsyncResponseCache(cache_size)
+
+    def _ensure_session(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+            self.session = aiohttp.ClientSession(connector=connector,
+                                                 timeout=aiohttp.ClientTimeout(total=self.timeout))
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def make_api_request(self, method: str, path: str, body: str = "") -> Any:
+        ttl = self._cache_ttl(method, path)
+        if ttl is not None:
+            return await self.response_cache.fetch(path, ttl, lambda: self._send(method, path, body))
+        response = await self._send(method, path, body)
+        if method == "POST":
+            self.response_cache.invalidate(*self.invalidated_by_orders)
+        return response
+
+    async def _send(self, method: str, path: str, body: str = "") -> Any:
+        self._ensure_session()
+        url = self.base_url + path
+        payload = json.loads(body) if body else None
+        lane = request_lane(method, path)
+
+        retry_delay = 0.0
+        for attempt in range(self.retries + 1):
+            await asyncio.sleep(retry_delay)
+            retry_delay = self.backoff_factor * 2 ** attempt
+            can_retry = attempt < self.retries
+
+            # Wait for a token in our lane before taking one of the connection
+            # slots, so queued market data never holds a slot an order needs
+            await self.scheduler.acquire(lane)
+            async with self._semaphore:
+                # Sign every attempt: the timestamp is part of the signature
+                with metrics.span('sign'):
+                    timestamp = self._get_current_timestamp() - 2
+                    headers = self.get_authorization_header(method, path, body, timestamp)
+                try:
+                    with metrics.span('send'):
+                        async with self.session.request(method, url, headers=headers, json=payload) as response:
+                            if response.status == 429 and can_retry:
+                                retry_after = response.headers.get("Retry-After")
+                                self.scheduler.pause(self._throttle_delay(retry_after, attempt))
+                                retry_delay = 0.0
+                                continue
+                            if response.status in RETRY_STATUSES and method == "GET" and can_retry:
+                                continue
+                            if response.status >= 400:
+                                detail = await response.text()
+                                print(f"Error making API request: {response.status} {response.reason} for url: {url} "
+                                      f"{detail}".rstrip())
+                                return None
+                            return await response.json()
+                except aiohttp.ClientConnectorError as e:
+                    if can_retry:
+                        continue
+                    print(f"Error making API request: {e}")
+                    return None
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    if method == "GET" and can_retry:
+                        continue
+                    print(f"Error making API request: {e!r}")
+                    return None
+
+    # Await many requests at once; results come back in the order given
+    @staticmethod
+    async def gather(*requests: Any) -> list:
+        return list(await asyncio.gather(*requests))
+
+    # orders: iterables of place_order arguments
+    # (client_order_id, side, order_type, symbol, order_config)
+    async def place_orders(self, orders: Iterable[tuple]) -> list:
+        return await self.gather(*(self.place_order(*order) for order in orders))
+
+    async def cancel_orders(self, order_ids: Iterable[str]) -> Dict[str, Any]:
+        order_ids = list(order_ids)
+        return dict(zip(order_ids, await self.gather(*(self.cancel_order(order_id) for order_id in order_ids))))
+
+    async def get_orders_status(self, order_ids: Iterable[str]) -> Dict[str, Optional[Any]]:
+        order_ids = list(order_ids)
+        return dict(zip(order_ids, await self.gather(*(self.get_order(order_id) for order_id in order_ids))))
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+    async def __aenter__(self):
+        self._ensure_session()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
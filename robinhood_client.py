@@ -0,0 +1,278 @@
+import base64
+import datetime
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import requests
+from dotenv import load_dotenv
+from nacl.signing import SigningKey
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import metrics
+from rate_limit import RequestScheduler, request_lane, retry_after_seconds
+from response_cache import ResponseCache
+
+# Load environment variables from .env file
+load_dotenv()
+
+CRYPTO_BASE_URL = "https://trading.robinhood.com"
+STOCK_BASE_URL = "https://api.robinhood.com"
+
+
+# Keep-alive session with a fixed-size connection pool. Connection errors are
+# retried for every method (the request never reached the server), but read
+# errors and 5xx responses are only retried for GETs so an order POST is never
+# sent twice. 429s are left to the client's request scheduler.
+def create_session(pool_size=10, retries=3, backoff_factor=0.3):
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+        raise_on_status=False,
+        respect_retry_after_header=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# Signed client shared by the crypto and stock APIs. The private key is decoded
+# and the SigningKey built once, and every request goes through the same pooled
+# session, so only the first call pays for the TCP+TLS handshake. Requests are
+# paced by a token-bucket scheduler that lets orders and cancels jump ahead of
+# queued market-data calls; pass one scheduler to several clients to share a
+# rate limit. GETs under a path in `cache_ttls` are answered from a short-TTL
+# response cache, and any POST drops the cached paths in `invalidated_by_orders`.
+class RobinhoodClient:
+    cache_ttls: Dict[str, float] = {}
+    invalidated_by_orders: tuple = ()
+
+    def __init__(self, base_url: str, api_key: Optional[str] = None, base64_private_key: Optional[str] = None,
+                 pool_size: int = 10, retries: int = 3, timeout: float = 10, backoff_factor: float = 0.3,
+                 scheduler: Optional[Any] = None, cache_size: int = 256):
+        self.api_key = api_key or os.getenv("API_KEY")
+        base64_private_key = base64_private_key or os.getenv("BASE64_PRIVATE_KEY")
+        if not self.api_key or not base64_private_key:
+            raise ValueError("API_KEY or BASE64_PRIVATE_KEY not set in the environment variables.")
+        self.private_key = SigningKey(base64.b64decode(base64_private_key))
+        self.base_url = base_url
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.scheduler = scheduler or self._create_scheduler()
+        self.response_cache = self._create_response_cache(cache_size)
+        self.session = self._create_session()
+
+    def _create_session(self):
+        return create_session(pool_size=self.pool_size, retries=self.retries, backoff_factor=self.backoff_factor)
+
+    def _create_scheduler(self):
+        return RequestScheduler()
+
+    def _create_response_cache(self, cache_size):
+        return ResponseCache(cache_size)
+
+    # TTL for a cacheable GET, None when the request must go to the server
+    def _cache_ttl(self, method: str, path: str) -> Optional[float]:
+        if method != "GET":
+            return None
+        for prefix, ttl in self.cache_ttls.items():
+            if path.startswith(prefix):
+                return ttl
+        return None
+
+    # Seconds to hold every lane after a 429
+    def _throttle_delay(self, retry_after: Optional[str], attempt: int) -> float:
+        return retry_after_seconds(retry_after, self.backoff_factor * 2 ** attempt)
+
+    @staticmethod
+    def _get_current_timestamp() -> int:
+        return int(datetime.datetime.now(tz=datetime.timezone.utc).timestamp())
+
+    @staticmethod
+    def get_query_params(key: str, *args: Optional[str]) -> str:
+        if not args:
+            return ""
+
+        params = []
+        for arg in args:
+            params.append(f"{key}={arg}")
+
+        return "?" + "&".join(params)
+
+    def make_api_request(self, method: str, path: str, body: str = "") -> Any:
+        ttl = self._cache_ttl(method, path)
+        if ttl is not None:
+            return self.response_cache.fetch(path, ttl, lambda: self._send(method, path, body))
+        response = self._send(method, path, body)
+        if method == "POST":
+            self.response_cache.invalidate(*self.invalidated_by_orders)
+        return response
+
+    def _send(self, method: str, path: str, body: str = "") -> Any:
+        url = self.base_url + path
+        lane = request_lane(method, path)
+
+        try:
+            for attempt in range(self.retries + 1):
+                self.scheduler.acquire(lane)
+                with metrics.span('sign'):
+                    timestamp = self._get_current_timestamp() - 2
+                    headers = self.get_authorization_header(method, path, body, timestamp)
+                with metrics.span('send'):
+                    response = self.session.request(method, url, headers=headers,
+                                                    json=json.loads(body) if body else None, timeout=self.timeout)
+                # A 429 was rejected before processing, so even an order can be resent
+                if response.status_code == 429 and attempt < self.retries:
+                    self.scheduler.pause(self._throttle_delay(response.headers.get("Retry-After"), attempt))
+                    continue
+                response.raise_for_status()  # This will raise an HTTPError for bad responses (4xx, 5xx)
+                return response.json()
+        except requests.RequestException as e:
+            detail = e.response.text if e.response is not None else ""
+            print(f"Error making API request: {e} {detail}".rstrip())
+            return None
+
+    def get_authorization_header(self, method: str, path: str, body: str, timestamp: int) -> Dict[str, str]:
+        message_to_sign = f"{self.api_key}{timestamp}{path}{method}{body}"
+        signed = self.private_key.sign(message_to_sign.encode("utf-8"))
+
+        return {
+            "x-api-key": self.api_key,
+            "x-signature": base64.b64encode(signed.signature).decode("utf-8"),
+            "x-timestamp": str(timestamp),
+        }
+
+    def close(self):
+        self.session.close()
+
+
+class CryptoAPITrading(RobinhoodClient):
+    # Seconds each read-only endpoint may be served from the cache
+    cache_ttls = {
+        "/api/v1/crypto/trading/trading_pairs/": 3600,
+        "/api/v1/crypto/trading/accounts/": 5,
+        "/api/v1/crypto/trading/holdings/": 5,
+        "/api/v1/crypto/marketdata/best_bid_ask/": 0.5,
+    }
+    # Orders and cancels change buying power and positions
+    invalidated_by_orders = ("/api/v1/crypto/trading/accounts/", "/api/v1/crypto/trading/holdings/")
+
+    def __init__(self, base_url: str = CRYPTO_BASE_URL, **kwargs):
+        super().__init__(base_url, **kwargs)
+
+    def get_account(self) -> Any:
+        path = "/api/v1/crypto/trading/accounts/"
+        return self.make_api_request("GET", path)
+
+    # The symbols argument must be formatted in trading pairs, e.g "BTC-USD", "ETH-USD". If no symbols are provided,
+    # all supported symbols will be returned
+    def get_trading_pairs(self, *symbols: Optional[str]) -> Any:
+        query_params = self.get_query_params("symbol", *symbols)
+        path = f"/api/v1/crypto/trading/trading_pairs/{query_params}"
+        return self.make_api_request("GET", path)
+
+    # The asset_codes argument must be formatted as the short form name for a crypto, e.g "BTC", "ETH". If no asset
+    # codes are provided, all crypto holdings will be returned
+    def get_holdings(self, *asset_codes: Optional[str]) -> Any:
+        query_params = self.get_query_params("asset_code", *asset_codes)
+        path = f"/api/v1/crypto/trading/holdings/{query_params}"
+        return self.make_api_request("GET", path)
+
+    # The symbols argument must be formatted in trading pairs, e.g "BTC-USD", "ETH-USD". If no symbols are provided,
+    # the best bid and ask for all supported symbols will be returned
+    def get_best_bid_ask(self, *symbols: Optional[str]) -> Any:
+        query_params = self.get_query_params("symbol", *symbols)
+        path = f"/api/v1/crypto/marketdata/best_bid_ask/{query_params}"
+        return self.make_api_request("GET", path)
+
+    # The symbol argument must be formatted in a trading pair, e.g "BTC-USD", "ETH-USD"
+    # The side argument must be "bid", "ask", or "both".
+    # Multiple quantities can be specified in the quantity argument, e.g. "0.1,1,1.999".
+    def get_estimated_price(self, symbol: str, side: str, quantity: str) -> Any:
+        path = f"/api/v1/crypto/marketdata/estimated_price/?symbol={symbol}&side={side}&quantity={quantity}"
+        return self.make_api_request("GET", path)
+
+    def place_order(
+            self,
+            client_order_id: str,
+            side: str,
+            order_type: str,
+            symbol: str,
+            order_config: Dict[str, str],
+    ) -> Any:
+        body = {
+            "client_order_id": client_order_id,
+            "side": side,
+            "type": order_type,
+            "symbol": symbol,
+            f"{order_type}_order_config": order_config,
+        }
+        path = "/api/v1/crypto/trading/orders/"
+        return self.make_api_request("POST", path, json.dumps(body))
+
+    def cancel_order(self, order_id: str) -> Any:
+        path = f"/api/v1/crypto/trading/orders/{order_id}/cancel/"
+        return self.make_api_request("POST", path)
+
+    def get_order(self, order_id: str) -> Any:
+        path = f"/api/v1/crypto/trading/orders/{order_id}/"
+        return self.make_api_request("GET", path)
+
+    def get_orders(self) -> Any:
+        path = "/api/v1/crypto/trading/orders/"
+        return self.make_api_request("GET", path)
+
+
+class APITrading(RobinhoodClient):
+    def __init__(self, base_url: str = STOCK_BASE_URL, **kwargs):
+        super().__init__(base_url, **kwargs)
+
+    def get_account(self) -> Any:
+        path = "/api/v1/portfolio/"  # Adjusted for stock portfolio
+        return self.make_api_request("GET", path)
+
+    def get_orders(self) -> Any:
+        path = "/api/v1/orders/"  # Adjusted for stock orders
+        return self.make_api_request("GET", path)
+
+    def get_holdings(self, *asset_codes: Optional[str]) -> Any:
+        query_params = self.get_query_params("symbol", *asset_codes)  # "symbol" for stock
+        path = f"/api/v1/portfolio/holdings/{query_params}"
+        return self.make_api_request("GET", path)
+
+    def place_stock_order(self, client_order_id: str, side: str, order_type: str, symbol: str, order_config: Dict[str, str]) -> Any:
+        body = {
+            "client_order_id": client_order_id,
+            "side": side,
+            "type": order_type,
+            "symbol": symbol,
+            f"{order_type}_order_config": order_config,
+        }
+        path = "/api/v1/orders/"  # Corrected path for stock orders
+        return self.make_api_request("POST", path, json.dumps(body))
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+# Process-wide client per (class, base_url), created on first use and reused
+# by every later call so the pool and signer stay warm between orders
+def get_client(client_class=CryptoAPITrading, **kwargs):
+    key = (client_class, kwargs.get("base_url"))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = client_class(**kwargs)
+        return client
@@ -1,12 +1,11 @@
-import yfinance as yf
-import pandas as pd
-import plotly.express as px
+import os
+import market_data
 
 # Define the symbol (EUR/USD forex pair)
 symbol = 'GOOG'
 
 # Download historical data (daily data, adjust the period as needed)
-df = yf.download(symbol, period="1y", interval="1d")  # Adjust period and interval as needed
+df = market_data.download(symbol, period="1y", interval="1d")  # Adjust period and interval as needed
 
 # Display first few rows of data
 print(df.head())
@@ -31,42 +30,10 @@ df['rsi_14'] = 100 - (100 / (df['rs'] + 1))
 # Display results
 print(df[['Close', 'rsi_14', 'rs', 'ema_gain', 'ema_loss']].tail())
 
-# You can also plot the data (optional)
-import plotly.graph_objects as go
+# Write the chart to a static HTML file and open it
+import webbrowser
+from charts import price_rsi_figure, write_html
 
-fig = go.Figure()
-
-# Add the candlestick chart
-fig.add_trace(go.Candlestick(
-    x=df.index,
-    open=df['Open'],
-    high=df['High'],
-    low=df['Low'],
-    close=df['Close'],
-    name="Price"
-))
-
-# Add the RSI
-fig.add_trace(go.Scatter(
-    x=df.index,
-    y=df['rsi_14'],
-    mode='lines',
-    name='RSI',
-    line=dict(color='orange', width=2),
-    yaxis='y2'
-))
-
-# Update layout
-fig.update_layout(
-    title=f'{symbol} Price and RSI',
-    xaxis_title='Date',
-    yaxis_title='Price',
-    yaxis2=dict(
-        title='RSI',
-        overlaying='y',
-        side='right'
-    ),
-    xaxis_rangeslider_visible=False
-)
-
-fig.show()
+path = write_html(f"{symbol}_rsi.html", price_rsi_figure(symbol, df, rsi=df['rsi_14']))
+print(f"Chart written to {path}")
+webbrowser.open(f"file://{os.path.abspath(path)}")
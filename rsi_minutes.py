@@ -1,79 +1,49 @@
-import yfinance as yf
-import pandas as pd
-import time
-import plotly.graph_objects as go
+import os
+import webbrowser
 from datetime import datetime
+import market_data
+from charts import ChartDashboard
+from indicators import FeatureEngine
+from trading_daemon import run_every
 
-def fetch_and_analyze(symbol):
+def fetch_and_analyze(symbol, show_chart=True):
     # Get the current timestamp
     current_timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
     # Download historical data (minute data)
-    df = yf.download(symbol, period="1d", interval="1m")  # 1-minute interval for today
+    df = market_data.download(symbol, period="1d", interval="1m")  # 1-minute interval for today
     print(f"Data fetched at: {current_timestamp}")
     
-    # Calculate RSI (Relative Strength Index)
-    rsi_period = 14
-    
-    # Calculate gains and losses
-    df['gain'] = df['Close'].diff().clip(lower=0)  # Clip negative values to 0 for gains
-    df['loss'] = -df['Close'].diff().clip(upper=0)  # Clip positive values to 0 and negate for losses
-    
-    # Exponential Moving Averages of gains and losses
-    df['ema_gain'] = df['gain'].ewm(span=rsi_period, min_periods=rsi_period).mean()
-    df['ema_loss'] = df['loss'].ewm(span=rsi_period, min_periods=rsi_period).mean()
-    
-    # Relative Strength (RS)
-    df['rs'] = df['ema_gain'] / df['ema_loss']
-    
-    # RSI Calculation
-    df['rsi_14'] = 100 - (100 / (df['rs'] + 1))
-    
+    # Update the streaming RSI with the bars we have not seen yet.
+    # The first call seeds the engine from the full day of minutes.
+    engine = indicator_engines.get(symbol)
+    if engine is None:
+        engine = indicator_engines[symbol] = FeatureEngine(['rsi_14'])
+        latest = engine.seed_from_frame(df)
+    else:
+        latest = engine.update_from_frame(df)
+
     # Display results
-    print(df[['Close', 'rsi_14', 'rs', 'ema_gain', 'ema_loss']].tail())
+    print(f"Latest close: {latest['close']:.4f}, RSI: {latest['rsi_14']:.2f} (bar {engine.last_timestamp})")
 
-    # Plot the data (optional)
-    fig = go.Figure()
-    
-    # Add the candlestick chart
-    fig.add_trace(go.Candlestick(
-        x=df.index,
-        open=df['Open'],
-        high=df['High'],
-        low=df['Low'],
-        close=df['Close'],
-        name="Price"
-    ))
+    # Redraw the chart in the dashboard file; the open tab reloads it in
+    # place instead of a new browser render every minute
+    if not show_chart:
+        return
+    dashboard.update({symbol: df}, current_timestamp)
+    if dashboard.renders == 1:
+        print(f"Chart: {dashboard.path}")
+        webbrowser.open(f"file://{os.path.abspath(dashboard.path)}")
 
-    # Add the RSI
-    fig.add_trace(go.Scatter(
-        x=df.index,
-        y=df['rsi_14'],
-        mode='lines',
-        name='RSI',
-        line=dict(color='orange', width=2),
-        yaxis='y2'
-    ))
-
-    # Update layout
-    fig.update_layout(
-        title=f'{symbol} Price and RSI {current_timestamp}',
-        xaxis_title='Date',
-        yaxis_title='Price',
-        yaxis2=dict(
-            title='RSI',
-            overlaying='y',
-            side='right'
-        ),
-        xaxis_rangeslider_visible=False
-    )
-    
-    fig.show()
+# Streaming indicator state per symbol, kept across loop iterations
+indicator_engines = {}
 
 # Define the symbol (you can change this to any symbol)
 symbol = 'GOOG'
 
+# Charts go to CHART_DIR (default ./charts), one file per symbol
+dashboard = ChartDashboard(refresh=60)
+
 # Run the function every minute (adjust sleep for different intervals)
-while True:
-    fetch_and_analyze(symbol)
-    time.sleep(60)  # Sleep for 60 seconds (1 minute) before fetching again
+# (aligned to minute boundaries; trading_daemon.py runs many symbols in one process)
+run_every(60, fetch_and_analyze, symbol)
@@ -0,0 +1,405 @@
+import argparse
+import base64
+import json
+import math
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, NamedTuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from orders import OrderManager
+from robinhood_client import CryptoAPITrading
+from strategies import feature_engine, get_strategy
+
+# Recorded best_bid_ask rows: seconds since the epoch, index into the replay's
+# symbol list, best bid and ask (inclusive of Robinhood's spread)
+QUOTE_DTYPE = np.dtype([('timestamp', '<f8'), ('symbol', '<u4'), ('bid', '<f8'), ('ask', '<f8')])
+
+# Recorded estimated_price rows. side is +1 for "ask" (what a buy pays) and -1
+# for "bid" (what a sell receives); price is the estimate for `quantity`.
+ESTIMATE_DTYPE = np.dtype([('timestamp', '<f8'), ('symbol', '<u4'), ('side', 'i1'),
+                           ('quantity', '<f8'), ('price', '<f8')])
+
+BUY, SELL = 1, -1
+
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+# Recorded quotes and price estimates for a set of symbols, split into one
+# sorted column set per symbol so a lookup is a binary search. Estimates are
+# turned into a per-unit price impact (how far the estimate for `quantity`
+# sits beyond the touch) and carried forward onto every later quote.
+class TickReplay:
+    def __init__(self, symbols, quotes, estimates=None):
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        quotes = np.asarray(quotes, dtype=QUOTE_DTYPE)
+        estimates = np.asarray(estimates if estimates is not None else [], dtype=ESTIMATE_DTYPE)
+        self.events = len(quotes) + len(estimates)
+
+        self.times, self.bid, self.ask = [], [], []
+        self.buy_impact, self.sell_impact = [], []
+        quote_order = np.argsort(quotes['symbol'], kind='stable')
+        quote_bounds = np.searchsorted(quotes['symbol'][quote_order], np.arange(len(self.symbols) + 1))
+        for i in range(len(self.symbols)):
+            rows = quotes[quote_order[quote_bounds[i]:quote_bounds[i + 1]]]
+            rows = rows[np.argsort(rows['timestamp'], kind='stable')]
+            # Contiguous columns: searchsorted copies a strided view on every call
+            self.times.append(np.ascontiguousarray(rows['timestamp']))
+            self.bid.append(np.ascontiguousarray(rows['bid']))
+            self.ask.append(np.ascontiguousarray(rows['ask']))
+            own = estimates[estimates['symbol'] == i]
+            self.buy_impact.append(self._impact(rows, own[own['side'] == BUY], BUY))
+            self.sell_impact.append(self._impact(rows, own[own['side'] == SELL], SELL))
+
+    # Per-unit impact in effect at each quote (NaN before the first estimate)
+    @staticmethod
+    def _impact(rows, estimates, side):
+        impact = np.full(len(rows), np.nan)
+        if not len(rows) or not len(estimates):
+            return impact
+        estimates = estimates[np.argsort(estimates['timestamp'], kind='stable')]
+        touch = np.searchsorted(rows['timestamp'], estimates['timestamp'], side='right') - 1
+        valid = touch >= 0
+        reference = np.where(side == BUY, rows['ask'], rows['bid'])[np.maximum(touch, 0)]
+        per_unit = np.where(valid & (estimates['quantity'] > 0),
+                            side * (estimates['price'] - reference) / np.maximum(estimates['quantity'], 1e-12),
+                            np.nan)
+        per_unit = np.maximum(per_unit, 0.0)
+        latest = np.searchsorted(estimates['timestamp'], rows['timestamp'], side='right') - 1
+        impact[latest >= 0] = per_unit[latest[latest >= 0]]
+        return impact
+
+    # Position of the quote in effect at `timestamp`, -1 before the first one
+    def locate(self, symbol, timestamp):
+        return int(np.searchsorted(self.times[self.index[symbol]], timestamp, side='right')) - 1
+
+    # Replay of a recorder.TickLog directory between two "YYYY-MM-DD" days
+    @classmethod
+    def from_log(cls, log, start=None, end=None, symbols=None):
+        records = log.select(start, end, symbols)
+        known = log.symbols
+        symbols = list(symbols) if symbols is not None else known
+        remap = np.full(len(known), len(symbols), dtype=np.uint32)
+        for i, symbol in enumerate(symbols):
+            if symbol in known:
+                remap[known.index(symbol)] = i
+        quotes = np.empty(len(records), dtype=QUOTE_DTYPE)
+        quotes['timestamp'] = records['timestamp']
+        quotes['symbol'] = remap[records['symbol']]
+        quotes['bid'] = records['bid']
+        quotes['ask'] = records['ask']
+        return cls(symbols, quotes)
+
+    def start(self):
+        firsts = [times[0] for times in self.times if len(times)]
+        return min(firsts) if firsts else math.nan
+
+    def end(self):
+        lasts = [times[-1] for times in self.times if len(times)]
+        return max(lasts) if lasts else math.nan
+
+
+# Execution costs for a simulated market order: the order crosses the spread
+# (buys pay the ask, sells receive the bid), moves the price by a per-unit
+# impact times its size (from the recorded estimated_price snapshots when
+# there are any, `impact_per_unit` otherwise), pays `slippage_bps` on top and
+# a proportional fee. `latency` seconds pass between sending and filling.
+class FillModel:
+    def __init__(self, fee_rate=0.0, slippage_bps=0.0, impact_per_unit=0.0, latency=0.0):
+        self.fee_rate = fee_rate
+        self.slippage_bps = slippage_bps
+        self.impact_per_unit = impact_per_unit
+        self.latency = latency
+
+    def price(self, side, bid, ask, quantity, impact=math.nan):
+        touch = ask if side == BUY else bid
+        impact = self.impact_per_unit if math.isnan(impact) else impact
+        price = touch + side * (impact * quantity + touch * self.slippage_bps / 10000)
+        return max(price, 0.0)
+
+    def fee(self, notional):
+        return notional * self.fee_rate
+
+
+# CryptoAPITrading whose requests are answered from a TickReplay at the
+# simulated time `now` instead of the network. Every endpoint method of the
+# live client works unchanged, so strategy and order code can be pointed at it
+# as-is. Market orders fill immediately (after the model's latency) against
+# the quote in effect; orders the account can't cover are rejected the way
+# the API rejects them, with None returned (and the error printed when
+# verbose, since a backtest can produce thousands of them). The base client is
+# set up with throwaway credentials; nothing is ever signed or sent.
+class SimulatedCryptoAPITrading(CryptoAPITrading):
+    def __init__(self, replay, fill_model=None, cash=10000.0, verbose=False):
+        super().__init__(base_url="simulated://", api_key="SIMULATED",
+                         base64_private_key=base64.b64encode(bytes(32)).decode())
+        self.replay = replay
+        self.fill_model = fill_model or FillModel()
+        self.cash = float(cash)
+        self.holdings = {}  # asset code -> quantity
+        self.orders = {}  # order id -> order response
+        self.fills = []
+        self.fees = 0.0
+        self.rejections = 0
+        self.now = replay.start()
+        self.verbose = verbose
+        self._symbols_by_code = {symbol.split("-")[0]: symbol for symbol in replay.symbols}
+        self._routes = (
+            ("GET", "/api/v1/crypto/trading/accounts/", self._account),
+            ("GET", "/api/v1/crypto/trading/trading_pairs/", self._trading_pairs),
+            ("GET", "/api/v1/crypto/trading/holdings/", self._holdings),
+            ("GET", "/api/v1/crypto/marketdata/best_bid_ask/", self._best_bid_ask),
+            ("GET", "/api/v1/crypto/marketdata/estimated_price/", self._estimated_price),
+            ("POST", "/api/v1/crypto/trading/orders/", self._place_order),
+            ("GET", "/api/v1/crypto/trading/orders/", self._orders),
+        )
+
+    def _reject(self, message):
+        self.rejections += 1
+        if self.verbose:
+            print(f"Error making API request: {message}")
+        return None
+
+    def make_api_request(self, method: str, path: str, body: str = "") -> Any:
+        parts = urlsplit(path)
+        query = parse_qs(parts.query)
+        for route_method, prefix, handler in self._routes:
+            if method == route_method and parts.path.startswith(prefix):
+                return handler(parts.path[len(prefix):], query, json.loads(body) if body else {})
+        return self._reject(f"{method} {path} is not supported by the simulator")
+
+    def _quote(self, symbol, timestamp):
+        if symbol not in self.replay.index:
+            return None
+        position = self.replay.locate(symbol, timestamp)
+        if position < 0:
+            return None
+        i = self.replay.index[symbol]
+        return i, position, self.replay.bid[i][position], self.replay.ask[i][position]
+
+    def _account(self, rest, query, body):
+        return {"account_number": "SIMULATED", "status": "active",
+                "buying_power": f"{self.cash:.2f}", "buying_power_currency": "USD"}
+
+    def _trading_pairs(self, rest, query, body):
+        symbols = query.get("symbol") or self.replay.symbols
+        return {"results": [{"symbol": symbol, "status": "tradable"}
+                            for symbol in symbols if symbol in self.replay.index]}
+
+    def _holdings(self, rest, query, body):
+        codes = query.get("asset_code") or list(self.holdings)
+        return {"results": [{"account_number": "SIMULATED", "asset_code": code,
+                             "total_quantity": f"{self.holdings.get(code, 0.0):.8f}",
+                             "quantity_available_for_trading": f"{self.holdings.get(code, 0.0):.8f}"}
+                            for code in codes if self.holdings.get(code)]}
+
+    def _best_bid_ask(self, rest, query, body):
+        results = []
+        for symbol in query.get("symbol") or self.replay.symbols:
+            quote = self._quote(symbol, self.now)
+            if quote is None:
+                continue
+            i, position, bid, ask = quote
+            results.append({"symbol": symbol, "price": str((bid + ask) / 2),
+                            "bid_inclusive_of_sell_spread": str(bid), "ask_inclusive_of_buy_spread": str(ask),
+                            "timestamp": _iso(self.replay.times[i][position])})
+        return {"results": results}
+
+    def _estimated_price(self, rest, query, body):
+        symbol = query.get("symbol", [""])[0]
+        side = query.get("side", ["both"])[0]
+        quote = self._quote(symbol, self.now)
+        if quote is None:
+            return self._reject(f"No quote for {symbol} at {_iso(self.now)}")
+        i, position, bid, ask = quote
+        sides = {"ask": (BUY,), "bid": (SELL,), "both": (SELL, BUY)}.get(side, ())
+        results = []
+        for quantity in query.get("quantity", ["1"])[0].split(","):
+            for order_side in sides:
+                impact = (self.replay.buy_impact if order_side == BUY else self.replay.sell_impact)[i][position]
+                price = self.fill_model.price(order_side, bid, ask, float(quantity), impact)
+                results.append({"symbol": symbol, "side": "ask" if order_side == BUY else "bid",
+                                "price": str(price), "quantity": quantity,
+                                "bid_inclusive_of_sell_spread": str(bid), "ask_inclusive_of_buy_spread": str(ask),
+                                "timestamp": _iso(self.replay.times[i][position])})
+        return {"results": results}
+
+    def _orders(self, rest, query, body):
+        if not rest:
+            return {"next": None, "previous": None, "results": list(self.orders.values())}
+        order = self.orders.get(rest.strip("/"))
+        return order if order is not None else self._reject(f"404 order {rest.strip('/')} not found")
+
+    def _place_order(self, rest, query, body):
+        if rest:  # orders/<id>/cancel/: simulated market orders are already filled
+            return self._reject(f"400 order {rest.split('/')[0]} can't be canceled")
+        symbol, order_type = body.get("symbol"), body.get("type")
+        side = {"buy": BUY, "sell": SELL}.get(body.get("side"))
+        if order_type != "market" or side is None:
+            return self._reject(f"400 only buy/sell market orders are simulated, got {body.get('side')} {order_type}")
+        config = body.get("market_order_config") or {}
+        quantity = float(config.get("asset_quantity", 0))
+        if quantity <= 0:
+            return self._reject("400 asset_quantity must be positive")
+
+        filled_at = self.now + self.fill_model.latency
+        quote = self._quote(symbol, filled_at)
+        if quote is None:
+            return self._reject(f"400 no market for {symbol} at {_iso(filled_at)}")
+        i, position, bid, ask = quote
+        impact = (self.replay.buy_impact if side == BUY else self.replay.sell_impact)[i][position]
+        price = self.fill_model.price(side, bid, ask, quantity, impact)
+        notional = price * quantity
+        fee = self.fill_model.fee(notional)
+        code = symbol.split("-")[0]
+        if side == BUY and notional + fee > self.cash:
+            return self._reject(f"400 insufficient buying power for {quantity:g} {symbol}")
+        if side == SELL and self.holdings.get(code, 0.0) < quantity:
+            return self._reject(f"400 insufficient {code} to sell {quantity:g}")
+
+        self.cash -= side * notional + fee
+        self.holdings[code] = self.holdings.get(code, 0.0) + side * quantity
+        self.fees += fee
+        order_id = str(uuid.uuid4())
+        order = {
+            "id": order_id, "account_number": "SIMULATED", "client_order_id": body.get("client_order_id"),
+            "side": body["side"], "type": "market", "symbol": symbol, "state": "filled",
+            "average_price": price, "filled_asset_quantity": quantity,
+            "created_at": _iso(self.now), "updated_at": _iso(filled_at),
+            "executions": [{"effective_price": str(price), "quantity": str(quantity), "timestamp": _iso(filled_at)}],
+            "market_order_config": config,
+        }
+        self.orders[order_id] = order
+        self.fills.append((filled_at, symbol, side, quantity, price, fee))
+        if self.verbose:
+            print(f"{_iso(filled_at)} filled {body['side']} {quantity:g} {symbol} @ {price:.6f} (fee {fee:.4f})")
+        return order
+
+    # Cash plus holdings valued at the bid (what selling them would fetch)
+    def equity(self, timestamp=None):
+        timestamp = self.now if timestamp is None else timestamp
+        value = self.cash
+        for code, quantity in self.holdings.items():
+            quote = self._quote(self._symbols_by_code[code], timestamp) if quantity else None
+            if quote is not None:
+                value += quantity * quote[2]
+        return value
+
+
+class SimulationResult(NamedTuple):
+    decision_times: np.ndarray  # Bar closes at which the strategies ran
+    equity: np.ndarray  # Account equity after each decision time
+    fills: list  # (timestamp, symbol, side, quantity, price, fee)
+    final_value: float
+    total_fees: float
+    events: int  # Recorded quotes and estimates replayed
+    elapsed: float  # Wall-clock seconds
+
+
+# Replays a TickReplay through registered strategies and a simulated client.
+# The quote stream itself is handled column-wise: each symbol's quotes are cut
+# into `bar_seconds` bars in one pass and only the bar closes (the last mid of
+# each bar) are visited in Python, in time order across symbols. At each close
+# the symbol's FeatureEngine takes the mid, every strategy on the symbol is
+# evaluated exactly as in trading_daemon, and buy/sell signals go out as
+# market orders through an OrderManager on the simulated client, just like
+# place_market_order. Its store is in memory and it reconciles only at the
+# end of the run (simulated orders fill or fail at once).
+class EventBacktest:
+    def __init__(self, replay, strategies, bar_seconds=60, quantity="1", fill_model=None, cash=10000.0,
+                 verbose=False):
+        self.replay = replay
+        self.bar_seconds = bar_seconds
+        self.quantity = quantity
+        self.verbose = verbose
+        self.client = SimulatedCryptoAPITrading(replay, fill_model, cash, verbose)
+        self.orders = OrderManager(self.client, ":memory:", reconcile_interval=None, unknown_grace=0.0,
+                                   verbose=verbose)
+        # strategies: one name/Strategy for every symbol or {symbol: [names or Strategies]}
+        if not isinstance(strategies, dict):
+            strategies = {symbol: strategies for symbol in replay.symbols}
+        self.strategies = {}
+        for symbol, chosen in strategies.items():
+            chosen = chosen if isinstance(chosen, (list, tuple)) else [chosen]
+            self.strategies[symbol] = [get_strategy(s) if isinstance(s, str) else s for s in chosen]
+        self.engines = {symbol: feature_engine(chosen) for symbol, chosen in self.strategies.items()}
+
+    # Bar closes for every symbol: (close time, symbol index, mid price), time ordered
+    def _decisions(self):
+        times, symbols, mids = [], [], []
+        for symbol in self.strategies:
+            i = self.replay.index[symbol]
+            quote_times = self.replay.times[i]
+            if not len(quote_times):
+                continue
+            bars = np.floor(quote_times / self.bar_seconds)
+            last = np.flatnonzero(np.r_[bars[1:] != bars[:-1], True])
+            times.append((bars[last] + 1) * self.bar_seconds)
+            symbols.append(np.full(len(last), i))
+            mids.append((self.replay.bid[i][last] + self.replay.ask[i][last]) / 2)
+        if not times:
+            return np.empty(0), np.empty(0, dtype=int), np.empty(0)
+        times, symbols, mids = np.concatenate(times), np.concatenate(symbols), np.concatenate(mids)
+        order = np.argsort(times, kind='stable')
+        return times[order], symbols[order], mids[order]
+
+    def run(self):
+        started = time.perf_counter()
+        client = self.client
+        decision_times, decision_symbols, mids = self._decisions()
+        equity = np.empty(len(decision_times))
+        for n in range(len(decision_times)):
+            client.now = decision_times[n]
+            symbol = self.replay.symbols[decision_symbols[n]]
+            features = self.engines[symbol].update(mids[n])
+            for strategy in self.strategies[symbol]:
+                action, message = strategy.evaluate(features)
+                if action in ("buy", "sell"):
+                    if self.verbose:
+                        print(f"{_iso(client.now)} {symbol} [{strategy.name}] {message}")
+                    self.orders.submit(action, symbol, self.quantity, price=mids[n])
+            equity[n] = client.equity()
+        # Orders the simulator refused are not in its order list: mark them failed
+        self.orders.reconcile()
+        final_value = client.equity(self.replay.end()) if len(decision_times) else client.cash
+        return SimulationResult(decision_times, equity, client.fills, final_value, client.fees,
+                                self.replay.events, time.perf_counter() - started)
+
+
+def main():
+    from recorder import DEFAULT_LOG_DIR, TickLog
+
+    parser = argparse.ArgumentParser(description="Replay recorded quotes through a strategy.")
+    parser.add_argument('symbols', nargs='*', help='Pairs to trade (default: every recorded pair)')
+    parser.add_argument('--log', default=DEFAULT_LOG_DIR, help='TickRecorder directory')
+    parser.add_argument('--start', help='First day, YYYY-MM-DD')
+    parser.add_argument('--end', help='Last day, YYYY-MM-DD')
+    parser.add_argument('--strategy', default='rsi')
+    parser.add_argument('--bar', type=float, default=60, help='Bar length in seconds')
+    parser.add_argument('--quantity', default="1")
+    parser.add_argument('--cash', type=float, default=10000)
+    parser.add_argument('--fee', type=float, default=0.0, help='Fee as a fraction of notional')
+    parser.add_argument('--slippage-bps', type=float, default=0.0)
+    parser.add_argument('--impact', type=float, default=0.0, help='Price impact per unit traded')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds from order to fill')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    replay = TickReplay.from_log(TickLog(args.log), args.start, args.end, args.symbols or None)
+    fill_model = FillModel(args.fee, args.slippage_bps, args.impact, args.latency)
+    result = EventBacktest(replay, args.strategy, bar_seconds=args.bar, quantity=args.quantity,
+                           fill_model=fill_model, cash=args.cash, verbose=args.verbose).run()
+    print(f"Replayed {result.events} events in {result.elapsed:.2f}s: {len(result.fills)} fills, "
+          f"fees {result.total_fees:.2f}")
+    print(f"Final value: {result.final_value:.2f} "
+          f"({(result.final_value - args.cash) / args.cash * 100:.2f}% on {args.cash:.2f})")
+
+
+if __name__ == "__main__":
+    main()
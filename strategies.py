@@ -0,0 +1,137 @@
+from indicators import FeatureEngine
+
+
+# A strategy names the streaming indicators it reads (see indicators.INDICATORS)
+# and turns one bar's shared feature dict into ("buy" | "sell" | "hold", message).
+# Strategies never compute indicators themselves, so any number of them can be
+# evaluated against one FeatureEngine per symbol.
+class Strategy:
+    name = None
+    indicators = ()
+
+    def evaluate(self, features):
+        raise NotImplementedError
+
+    # Actions for many symbols at once. `features` maps each feature name to
+    # one value per symbol (a dict of arrays or a DataFrame); returns a NumPy
+    # array of "buy" / "sell" / "hold". Strategies with simple rules override
+    # this with array comparisons; the default evaluates symbol by symbol.
+    def evaluate_many(self, features):
+        import numpy as np
+        columns = {name: np.asarray(features[name]) for name in features.keys()}
+        count = len(next(iter(columns.values()), ()))
+        return np.array([self.evaluate({name: values[i] for name, values in columns.items()})[0]
+                         for i in range(count)], dtype='<U4')
+
+
+# RSI below buy_below buys, above sell_above sells (buy-rsi-crypto, rsi_buy.py)
+class RSIThreshold(Strategy):
+    def __init__(self, name='rsi', period=14, buy_below=30, sell_above=70):
+        self.name = name
+        self.rsi_key = f"rsi_{period}"
+        self.indicators = (self.rsi_key,)
+        self.buy_below = buy_below
+        self.sell_above = sell_above
+
+    def evaluate(self, features):
+        rsi = features[self.rsi_key]
+        if rsi < self.buy_below:
+            return "buy", f"RSI below {self.buy_below} ({rsi:.2f}). Buy signal!"
+        if rsi > self.sell_above:
+            return "sell", f"RSI above {self.sell_above} ({rsi:.2f}). Sell signal!"
+        return "hold", f"RSI is in neutral range ({rsi:.2f}). No action required."
+
+    def evaluate_many(self, features):
+        import numpy as np
+        rsi = np.asarray(features[self.rsi_key], dtype=np.float64)
+        return np.select([rsi < self.buy_below, rsi > self.sell_above], ["buy", "sell"], "hold")
+
+
+# RSI extremes confirmed by the 200-bar EMA and a MACD crossover, then
+# Bollinger Band breakouts (robinhood-crypto-rsi.py, check_stocks.py)
+class RSITrend(Strategy):
+    def __init__(self, name='rsi_trend', rsi_period=14, buy_below=30, sell_above=70, ema_period=200,
+                 macd=(12, 26, 9), bollinger=(20, 2)):
+        self.name = name
+        self.buy_below = buy_below
+        self.sell_above = sell_above
+        self.rsi_key = f"rsi_{rsi_period}"
+        self.ema_key = f"ema_{ema_period}"
+        macd_suffix = "_".join(str(value) for value in macd)
+        self.macd_key = f"macd_{macd_suffix}"
+        self.signal_key = f"macd_signal_{macd_suffix}"
+        bollinger_suffix = f"{bollinger[0]}_{bollinger[1]:g}"
+        self.upper_key = f"bollinger_upper_{bollinger_suffix}"
+        self.lower_key = f"bollinger_lower_{bollinger_suffix}"
+        self.indicators = (self.rsi_key, self.ema_key, f"macd_{macd_suffix}", f"bollinger_{bollinger_suffix}")
+
+    def evaluate(self, features):
+        rsi, close, ema = features[self.rsi_key], features['close'], features[self.ema_key]
+        macd, signal = features[self.macd_key], features[self.signal_key]
+        if rsi < self.buy_below and close > ema and macd > signal:
+            return "buy", (f"RSI below {self.buy_below}, above {self.ema_key[4:]}-bar EMA, "
+                           f"MACD bullish crossover. Buy signal!")
+        if rsi > self.sell_above and close < ema and macd < signal:
+            return "sell", (f"RSI above {self.sell_above}, below {self.ema_key[4:]}-bar EMA, "
+                            f"MACD bearish crossover. Sell signal!")
+        if close > features[self.upper_key]:
+            return "sell", "Price above upper Bollinger Band. Possible overbought condition. Sell signal!"
+        if close < features[self.lower_key]:
+            return "buy", "Price below lower Bollinger Band. Possible oversold condition. Buy signal!"
+        return "hold", "RSI in neutral range and no other strong conditions. No action required."
+
+    # evaluate() over arrays, rules checked in the same order
+    def evaluate_many(self, features):
+        import numpy as np
+        rsi, close, ema, macd, signal, upper, lower = (
+            np.asarray(features[key], dtype=np.float64)
+            for key in (self.rsi_key, 'close', self.ema_key, self.macd_key, self.signal_key,
+                        self.upper_key, self.lower_key))
+        rules = [
+            (rsi < self.buy_below) & (close > ema) & (macd > signal),
+            (rsi > self.sell_above) & (close < ema) & (macd < signal),
+            close > upper,
+            close < lower,
+        ]
+        return np.select(rules, ["buy", "sell", "sell", "buy"], "hold")
+
+
+STRATEGIES = {}
+
+
+def register(strategy):
+    if strategy.name in STRATEGIES:
+        raise ValueError(f"Strategy {strategy.name!r} is already registered")
+    STRATEGIES[strategy.name] = strategy
+    return strategy
+
+
+def get_strategy(name):
+    try:
+        return STRATEGIES[name]
+    except KeyError:
+        raise ValueError(f"Unknown strategy {name!r}; choose from {', '.join(STRATEGIES)}") from None
+
+
+# Distinct indicators needed by a set of strategies
+def required_indicators(strategies):
+    names = []
+    for strategy in strategies:
+        for name in strategy.indicators:
+            if name not in names:
+                names.append(name)
+    return names
+
+
+# One engine computing every indicator the strategies need, once per bar
+def feature_engine(strategies):
+    return FeatureEngine(required_indicators(strategies))
+
+
+# Evaluate every strategy against the same feature dict
+def evaluate_all(strategies, features):
+    return {strategy.name: strategy.evaluate(features) for strategy in strategies}
+
+
+register(RSIThreshold())
+register(RSITrend())
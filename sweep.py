@@ -0,0 +1,227 @@
+import argparse
+import bisect
+import itertools
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import market_data
+from backtest_engine import rsi_sma_matrix, run_backtest, run_portfolio_backtest
+
+# Close matrix shared with the worker processes (set by _attach_prices)
+_prices = None
+_prices_shm = None
+_rsi_by_period = {}  # RSI of the whole matrix per period, per worker process
+
+# Threshold/sizing combinations per portfolio task
+COMBOS_PER_TASK = 16
+
+
+# Load daily closes for all symbols (through the bar cache) as one
+# (symbols x bars) matrix over the union of their dates. A symbol's
+# non-trading days stay NaN (weekends for stocks next to crypto, days before
+# a listing); nothing is carried forward, so no flat bars are made up.
+# Symbols without a single close in the range are dropped with a warning;
+# returns the dates, the symbols kept and the matrix.
+def load_close_matrix(symbols, start_date, end_date):
+    series = {symbol: market_data.download(symbol, start=start_date, end=end_date)['Close'].dropna()
+              for symbol in symbols}
+    empty = [symbol for symbol in symbols if series[symbol].empty]
+    if empty:
+        print(f"Warning: no prices for {', '.join(empty)} between {start_date} and {end_date}; skipping.")
+    kept = [symbol for symbol in symbols if not series[symbol].empty]
+    if not kept:
+        return pd.DatetimeIndex([]), [], np.empty((0, 0))
+    closes = pd.DataFrame({symbol: series[symbol] for symbol in kept}).sort_index()
+    return closes.index, kept, closes.to_numpy(dtype=np.float64).T.copy()
+
+
+# RSI of every symbol over its own trading bars only, NaN on the bars it has
+# no close for (which therefore never trade)
+def rsi_on_trading_bars(closes, period):
+    rsi = np.full(closes.shape, np.nan)
+    for row, prices in enumerate(closes):
+        traded = ~np.isnan(prices)
+        rsi[row, traded] = rsi_sma_matrix(prices[traded], period)[0]
+    return rsi
+
+
+# Worker initializer: map the parent's shared price matrix without copying it
+def _attach_prices(name, shape, dtype):
+    global _prices, _prices_shm
+    _prices_shm = shared_memory.SharedMemory(name=name)
+    _prices = np.ndarray(shape, dtype=dtype, buffer=_prices_shm.buf)
+    _rsi_by_period.clear()
+
+
+# Run every threshold/sizing combination for one symbol and RSI period, each
+# with its own cash, over the symbol's trading bars. RSI only depends on the
+# period, so it is computed once per task.
+def _run_task(symbol_index, rsi_period, combos, initial_cash):
+    closes = _prices[symbol_index]
+    closes = closes[~np.isnan(closes)][None, :]
+    rsi = rsi_sma_matrix(closes, rsi_period)
+    rows = []
+    for buy_threshold, sell_threshold, sizing in combos:
+        result = run_backtest(closes, initial_cash=initial_cash, investment_per_stock=initial_cash * sizing,
+                              rsi_period=rsi_period, buy_threshold=buy_threshold,
+                              sell_threshold=sell_threshold, rsi=rsi)
+        rows.append({
+            'symbol_index': symbol_index,
+            'rsi_period': rsi_period,
+            'buy_threshold': buy_threshold,
+            'sell_threshold': sell_threshold,
+            'sizing': sizing,
+            'trades': int(result.exits[0].sum()),
+            'final_value': float(result.final_value[0]),
+            'total_gain_loss': float(result.total_gain_loss[0]),
+            'percentage_return': float(result.percentage_return[0]),
+        })
+    return rows
+
+
+# Run threshold/sizing combinations as one portfolio over every symbol: a
+# single cash pool and at most `max_active_stocks` open positions (see
+# backtest_engine.run_portfolio_backtest). The RSI matrix is computed once per
+# period in each worker.
+def _run_portfolio_task(rsi_period, max_active_stocks, combos, initial_cash):
+    rsi = _rsi_by_period.get(rsi_period)
+    if rsi is None:
+        rsi = _rsi_by_period[rsi_period] = rsi_on_trading_bars(_prices, rsi_period)
+    rows = []
+    for buy_threshold, sell_threshold, sizing in combos:
+        result = run_portfolio_backtest(_prices, initial_cash=initial_cash, investment_per_stock=initial_cash * sizing,
+                                        max_active_stocks=max_active_stocks, rsi_period=rsi_period,
+                                        buy_threshold=buy_threshold, sell_threshold=sell_threshold, rsi=rsi)
+        rows.append({
+            'rsi_period': rsi_period,
+            'max_active_stocks': max_active_stocks,
+            'buy_threshold': buy_threshold,
+            'sell_threshold': sell_threshold,
+            'sizing': sizing,
+            'trades': sum(1 for trade in result.trades if trade[2] == "sell"),
+            'skipped': int(result.skipped.sum()),
+            'final_value': result.final_value,
+            'total_gain_loss': float(result.total_gain_loss),
+            'percentage_return': result.percentage_return,
+        })
+    return rows
+
+
+# Fan the parameter grid out over a process pool and return the results
+# ranked by percentage return. By default every run is one portfolio over all
+# symbols (shared cash, max_active_stocks enforced), so the grid is
+# rsi_periods x max_active_stocks x thresholds x sizings. With per_symbol=True
+# each symbol is run on its own cash instead; a position limit means nothing
+# there, so only one max_active_stocks value is accepted and rows carry the
+# symbol rather than a limit. Progress is printed as tasks finish.
+def run_sweep(symbols, closes, rsi_periods, buy_thresholds, sell_thresholds, sizings,
+              max_active_stocks=(5,), initial_cash=10000, workers=None, top=10, per_symbol=False):
+    combos = [(buy, sell, sizing) for buy, sell, sizing in itertools.product(buy_thresholds, sell_thresholds, sizings)
+              if buy < sell]
+    if not combos:
+        raise ValueError("No buy/sell threshold pair with buy below sell")
+    if per_symbol and len(set(max_active_stocks)) > 1:
+        raise ValueError("max_active_stocks does not bind when every symbol has its own cash; "
+                         "sweep it as a portfolio instead")
+
+    closes = np.ascontiguousarray(closes, dtype=np.float64)
+    if per_symbol:
+        tasks = [(_run_task, symbol_index, period, combos)
+                 for symbol_index, period in itertools.product(range(len(symbols)), rsi_periods)]
+    else:
+        chunks = [combos[i:i + COMBOS_PER_TASK] for i in range(0, len(combos), COMBOS_PER_TASK)]
+        tasks = [(_run_portfolio_task, period, limit, chunk)
+                 for period, limit, chunk in itertools.product(rsi_periods, sorted(set(max_active_stocks)), chunks)]
+
+    shm = shared_memory.SharedMemory(create=True, size=max(closes.nbytes, 1))
+    try:
+        np.ndarray(closes.shape, dtype=closes.dtype, buffer=shm.buf)[:] = closes
+
+        ranked = []  # (-percentage_return, sequence, row), kept sorted
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach_prices,
+                                 initargs=(shm.name, closes.shape, closes.dtype)) as pool:
+            futures = [pool.submit(task, *args, initial_cash) for task, *args in tasks]
+            for done, future in enumerate(as_completed(futures), start=1):
+                for row in future.result():
+                    if 'symbol_index' in row:
+                        row['symbol'] = symbols[row.pop('symbol_index')]
+                    # A NaN return (no usable prices) ranks last instead of
+                    # breaking the ordering of everything inserted after it
+                    key = -row['percentage_return']
+                    bisect.insort(ranked, (math.inf if math.isnan(key) else key, len(ranked), row))
+                best = ranked[0][2]
+                where = f"{best['symbol']} " if per_symbol else f"max_active={best['max_active_stocks']} "
+                print(f"[{done}/{len(tasks)}] best so far: {where}period={best['rsi_period']} "
+                      f"buy={best['buy_threshold']} sell={best['sell_threshold']} sizing={best['sizing']} "
+                      f"-> {best['percentage_return']:.2f}%")
+        elapsed = time.perf_counter() - started
+    finally:
+        shm.close()
+        shm.unlink()
+
+    results = pd.DataFrame([row for _, _, row in ranked])
+    print(f"\nSwept {len(results)} runs in {elapsed:.2f}s. Top {top}:")
+    print(results.head(top).to_string(index=False))
+    return results
+
+
+# Parse "10:20:2" (inclusive range) or "25,30,35" into a list of numbers
+def parse_values(text, cast=float):
+    if ':' in text:
+        start, stop, *step = (cast(part) for part in text.split(':'))
+        step = step[0] if step else 1
+        values = np.arange(start, stop + step / 2, step)
+        return [cast(value) for value in values]
+    return [cast(part) for part in text.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grid-search the RSI backtest parameters.")
+    parser.add_argument('--symbols', default='AAPL,GOOGL,MSFT,AMZN,NVDA,OKLO,SOUN,BBAI,GM,JOBY,ACHR,QUBT,QBTS,PLTR')
+    parser.add_argument('--start', default='2024-01-01')
+    parser.add_argument('--end', default='2025-02-07')
+    parser.add_argument('--rsi-periods', default='14', help='e.g. 10:20:2 or 9,14,21')
+    parser.add_argument('--buy', default='30', help='RSI buy thresholds, e.g. 20:35:5')
+    parser.add_argument('--sell', default='70', help='RSI sell thresholds, e.g. 65:80:5')
+    parser.add_argument('--sizing', default='0.2', help='Fraction of initial cash per position, e.g. 0.1,0.2')
+    parser.add_argument('--max-active', default='5', help='Max concurrent positions, e.g. 3,5')
+    parser.add_argument('--per-symbol', action='store_true',
+                        help='Run every symbol on its own cash instead of one portfolio')
+    parser.add_argument('--initial-cash', type=float, default=10000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--output', help='Write the full ranked table to this CSV file')
+    args = parser.parse_args()
+
+    max_active_stocks = parse_values(args.max_active, int)
+    if args.per_symbol and len(set(max_active_stocks)) > 1:
+        parser.error("--max-active takes a single value with --per-symbol (each symbol has its own cash)")
+    _, symbols, closes = load_close_matrix(args.symbols.split(','), args.start, args.end)
+    if not symbols:
+        print("No prices for any symbol; nothing to sweep.")
+        return
+    results = run_sweep(
+        symbols, closes,
+        rsi_periods=parse_values(args.rsi_periods, int),
+        buy_thresholds=parse_values(args.buy),
+        sell_thresholds=parse_values(args.sell),
+        sizings=parse_values(args.sizing),
+        max_active_stocks=max_active_stocks,
+        initial_cash=args.initial_cash,
+        workers=args.workers,
+        top=args.top,
+        per_symbol=args.per_symbol,
+    )
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
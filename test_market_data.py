@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from market_data import FIELDS, BarCache
+
+# Daily bars of a stock: weekdays only, with Martin Luther King Day 2024 off
+DAYS = pd.bdate_range("2024-01-02", "2024-03-28", tz="America/New_York").drop(
+    pd.Timestamp("2024-01-15", tz="America/New_York"))
+
+
+# Stands in for yf.download: serves DAYS (end exclusive, like yfinance), one
+# frame for a ticker and (Price, Ticker) columns for a list, and records every
+# call. A top-up starting at `fail_from` comes back empty, the way yfinance
+# answers a request that failed.
+class FakeDownloader:
+    def __init__(self):
+        self.calls = []
+        self.fail_from = None
+
+    def __call__(self, symbols, interval='1d', period=None, start=None, end=None, **kwargs):
+        self.calls.append({'symbols': symbols, 'period': period, 'start': start, 'end': end})
+        if self.fail_from is not None and start is not None and pd.Timestamp(start) == self.fail_from:
+            return pd.DataFrame()
+        index = DAYS
+        if start is not None:
+            index = index[index >= _day(start)]
+        if end is not None:
+            index = index[index < _day(end)]
+        closes = np.arange(len(index), dtype=np.float64) + 100
+        frame = pd.DataFrame({field: closes for field in FIELDS}, index=index)
+        if isinstance(symbols, str):
+            return frame
+        # (Price, Ticker) columns, as yfinance returns for a list of tickers
+        return pd.concat({symbol: frame for symbol in symbols}, axis=1).swaplevel(0, 1, axis=1)
+
+
+def _day(value):
+    value = pd.Timestamp(value)
+    return value.tz_localize("America/New_York") if value.tzinfo is None else value
+
+
+@pytest.fixture
+def downloader():
+    return FakeDownloader()
+
+
+@pytest.fixture
+def cache(tmp_path, downloader):
+    return BarCache(str(tmp_path), downloader)
+
+
+def test_first_get_downloads_the_whole_span(cache, downloader):
+    frame = cache.get("AAA", start="2024-01-02", end="2024-02-01")
+    assert downloader.calls == [{'symbols': "AAA", 'period': None, 'start': "2024-01-02", 'end': "2024-02-01"}]
+    assert frame.index[0] == _day("2024-01-02")
+    assert frame.index[-1] == _day("2024-01-31")
+
+
+def test_repeat_get_is_served_from_disk(cache, downloader, tmp_path):
+    first = cache.get("AAA", start="2024-01-02", end="2024-02-01")
+    again = BarCache(str(tmp_path), downloader).get("AAA", start="2024-01-02", end="2024-02-01")
+    assert len(downloader.calls) == 1
+    pd.testing.assert_frame_equal(first, again)
+
+
+def test_later_end_downloads_only_the_missing_tail(cache, downloader):
+    cache.get("AAA", start="2024-01-02", end="2024-02-01")
+    frame = cache.get("AAA", start="2024-01-02", end="2024-03-01")
+    assert len(downloader.calls) == 2
+    assert downloader.calls[1]['start'] == _day("2024-01-31")
+    assert frame.index[-1] == _day("2024-02-29")
+    assert frame.index.equals(DAYS[DAYS < _day("2024-03-01")])
+
+
+def test_failed_top_up_falls_back_to_a_full_refetch(cache, downloader):
+    cache.get("AAA", start="2024-01-02", end="2024-02-01")
+    downloader.fail_from = _day("2024-01-31")
+    frame = cache.get("AAA", start="2024-01-02", end="2024-03-01")
+    assert [call['start'] for call in downloader.calls] == ["2024-01-02", _day("2024-01-31"), "2024-01-02"]
+    assert frame.index[-1] == _day("2024-02-29")
+
+
+def test_weekend_gap_is_fresh(cache, downloader):
+    cache.get("AAA", start="2024-01-02", end="2024-01-06")  # Ends on Friday the 5th
+    frame = cache.get("AAA", start="2024-01-02", end="2024-01-08")  # Monday, exclusive
+    assert len(downloader.calls) == 1
+    assert frame.index[-1] == _day("2024-01-05")
+
+
+def test_holiday_gap_downloads_once(cache, downloader):
+    cache.get("AAA", start="2024-01-02", end="2024-01-13")  # Ends on Friday the 12th
+    for _ in range(3):
+        frame = cache.get("AAA", start="2024-01-02", end="2024-01-16")  # Monday the 15th is a holiday
+    assert len(downloader.calls) == 2
+    assert frame.index[-1] == _day("2024-01-12")
+
+
+def test_batched_get_many_matches_get(cache, downloader):
+    cache.get_many(["AAA", "BBB"], start="2024-01-02", end="2024-02-01")
+    frames = cache.get_many(["AAA", "BBB"], start="2024-01-02", end="2024-02-01")
+    assert len(downloader.calls) == 1
+    assert list(frames) == ["AAA", "BBB"]
+    assert frames["BBB"].index[-1] == _day("2024-01-31")
@@ -0,0 +1,258 @@
+import argparse
+import contextlib
+import math
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import metrics
+from strategies import STRATEGIES, feature_engine, get_strategy
+
+
+# First bar boundary strictly after `now`, plus a settle delay so the bar that
+# just closed has been published. Boundaries are multiples of `every` seconds
+# since the epoch, so the schedule never drifts with the time spent working.
+def next_boundary(now, every, settle=0.0):
+    return (math.floor((now - settle) / every) + 1) * every + settle
+
+
+# Run fn(*args) on every `every`-second boundary until interrupted. Drop-in
+# replacement for `while True: fn(); time.sleep(60)` in the single-symbol scripts.
+def run_every(every, fn, *args, settle=0.0):
+    while True:
+        fn(*args)
+        time.sleep(max(next_boundary(time.time(), every, settle) - time.time(), 0.0))
+
+
+# One (symbol, strategy, bar interval) to evaluate every `every` seconds on
+# `period` of history. `strategy` is a registered name or a Strategy. Jobs on
+# the same (symbol, interval) share one feature engine and one download.
+class Job:
+    def __init__(self, symbol, strategy, interval='1m', period='1d', every=60, quantity="1"):
+        self.symbol = symbol
+        self.strategy = get_strategy(strategy) if isinstance(strategy, str) else strategy
+        self.strategy_name = self.strategy.name
+        self.interval = interval
+        self.period = period
+        self.every = every
+        self.quantity = quantity
+        self.next_run = 0.0
+
+    def __repr__(self):
+        return f"Job({self.symbol}, {self.strategy_name}, {self.interval}, every={self.every}s)"
+
+
+# Market order through the shared order manager, which runs the pre-trade risk
+# checks at `price`, records the order and tracks its fills
+def place_market_order(side, symbol, quantity="1", price=None):
+    from orders import get_order_manager
+    order = get_order_manager().submit(side, symbol, quantity, price=price)
+    if order:
+        print(f"Order placed: {side} {symbol} with order ID {order.get('id')}")
+    else:
+        print(f"Failed to place the order: {side} {symbol}")
+    return order
+
+
+# Single-process scheduler for many jobs. The clock wakes on the next due
+# boundary, downloads every due (interval, period) group concurrently as one
+# batched request, and feeds the results through an event queue:
+#   bars   (jobs, frame)          -> update the (symbol, interval) feature engine
+#                                    once, then run every job's strategy on it
+#   signal (job, action, message, features) -> print and, for buy/sell, emit order
+#   order  (job, side, price)     -> order_handler(side, symbol, quantity, price)
+#                                    on the worker pool
+# Handlers can be added with on(); they run on the dispatcher thread.
+# Every stage is timed with metrics.span (a no-op unless metrics.enable() was
+# called); `metrics_jsonl` appends the stage histograms after every tick and
+# `profile_tick` profiles that one tick (1 = the startup tick) into
+# `profile_path` with the `profiler` ('cprofile' or 'sample').
+class TradingDaemon:
+    def __init__(self, jobs, order_handler=place_market_order, workers=8, settle=2.0, metrics_jsonl=None,
+                 profile_tick=None, profiler='cprofile', profile_path='tick.prof'):
+        self.jobs = list(jobs)
+        self.order_handler = order_handler
+        self.settle = settle
+        self.metrics_jsonl = metrics_jsonl
+        self.profile_tick = profile_tick
+        self.profiler = profiler
+        self.profile_path = profile_path
+        # One engine per (symbol, interval) computing the union of the
+        # indicators its strategies need
+        self.engines = {}
+        for key, jobs_for_key in self._by_key(self.jobs).items():
+            self.engines[key] = feature_engine([job.strategy for job in jobs_for_key])
+        self.handlers = defaultdict(list)
+        self.events = queue.Queue()
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self._stop = threading.Event()
+
+        self.on('bars', self._on_bars)
+        self.on('signal', self._on_signal)
+        self.on('order', self._on_order)
+
+    def on(self, event_type, handler):
+        self.handlers[event_type].append(handler)
+
+    def emit(self, event_type, *args):
+        self.events.put((event_type, args))
+
+    def _dispatch(self):
+        while True:
+            try:
+                event_type, args = self.events.get_nowait()
+            except queue.Empty:
+                return
+            for handler in self.handlers[event_type]:
+                try:
+                    handler(*args)
+                except Exception as e:
+                    print(f"Error in {event_type} handler {handler.__name__}: {e}")
+
+    @staticmethod
+    def _by_key(jobs):
+        grouped = defaultdict(list)
+        for job in jobs:
+            grouped[(job.symbol, job.interval)].append(job)
+        return grouped
+
+    def _on_bars(self, jobs, frame):
+        symbol, interval = jobs[0].symbol, jobs[0].interval
+        if frame.empty:
+            print(f"No data for {symbol} ({interval}). Skipping...")
+            return
+        engine = self.engines[(symbol, interval)]
+        with metrics.span('compute'):
+            features = engine.update_from_frame(frame) if engine.bars else engine.seed_from_frame(frame)
+        for job in jobs:
+            with metrics.span('decide'):
+                action, message = job.strategy.evaluate(features)
+            self.emit('signal', job, action, message, features)
+
+    def _on_signal(self, job, action, message, features):
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        color = {"buy": "\033[92m", "sell": "\033[91m"}.get(action, "")
+        reset = "\033[0m" if color else ""
+        print(f"{color}{job.symbol} [{job.strategy_name} {job.interval}] {message} "
+              f"(Timestamp: {timestamp}){reset}")
+        if action in ("buy", "sell"):
+            self.emit('order', job, action, features['close'])
+
+    def _on_order(self, job, side, price=None):
+        if self.order_handler is not None:
+            self.pool.submit(self.order_handler, side, job.symbol, job.quantity, price)
+
+    @staticmethod
+    def _fetch(symbols, period, interval):
+        import market_data  # pandas/yfinance load on the first tick, not at import
+        with metrics.span('fetch'):
+            return market_data.download_many(symbols, period=period, interval=interval)
+
+    # Download every due (interval, period) group concurrently, one batched
+    # request per group, then queue a bars event per job
+    def tick(self, due):
+        groups = defaultdict(list)
+        for job in due:
+            groups[(job.interval, job.period)].append(job)
+
+        futures = {
+            self.pool.submit(self._fetch, sorted({job.symbol for job in group}), period, interval): group
+            for (interval, period), group in groups.items()
+        }
+        for future, group in futures.items():
+            try:
+                frames = future.result()
+            except Exception as e:
+                print(f"Error fetching {group[0].interval} data: {e}")
+                continue
+            for (symbol, _), jobs in self._by_key(group).items():
+                self.emit('bars', jobs, frames[symbol])
+        self._dispatch()
+
+    def run(self, iterations=None):
+        now = time.time()
+        for job in self.jobs:
+            job.next_run = now  # Evaluate everything once at startup
+        runs = 0
+        try:
+            while not self._stop.is_set() and (iterations is None or runs < iterations):
+                wake = min(job.next_run for job in self.jobs)
+                if self._stop.wait(max(wake - time.time(), 0.0)):
+                    break
+                now = time.time()
+                due = [job for job in self.jobs if job.next_run <= now]
+                for job in due:
+                    job.next_run = next_boundary(now, job.every, self.settle)
+                runs += 1
+                profiling = runs == self.profile_tick
+                with metrics.span('tick'), \
+                        metrics.profile(self.profile_path, self.profiler) if profiling else contextlib.nullcontext():
+                    self.tick(due)
+                if self.metrics_jsonl:
+                    metrics.write_jsonl(self.metrics_jsonl)
+        finally:
+            self.pool.shutdown(wait=True)
+
+    def stop(self):
+        self._stop.set()
+
+
+# "SYMBOL:strategy[:interval[:period[:every]]]", e.g. "DOGE-USD:rsi_trend:1d:200d:60"
+def parse_job(text):
+    parts = text.split(':')
+    symbol, strategy = parts[0], parts[1] if len(parts) > 1 else 'rsi'
+    interval = parts[2] if len(parts) > 2 else '1m'
+    period = parts[3] if len(parts) > 3 else '1d'
+    every = float(parts[4]) if len(parts) > 4 else 60
+    return Job(symbol, strategy, interval=interval, period=period, every=every)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many symbol/strategy jobs in one process.")
+    parser.add_argument('jobs', nargs='+', help='SYMBOL:strategy[:interval[:period[:every]]], '
+                                                f'strategies: {", ".join(STRATEGIES)}')
+    parser.add_argument('--dry-run', action='store_true', help='Print signals without placing orders')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--settle', type=float, default=2.0, help='Seconds to wait after each bar boundary')
+    parser.add_argument('--record', metavar='DIR', help='Append every closed bar to a tick log in DIR')
+    parser.add_argument('--charts', metavar='DIR', help='Keep a price/RSI chart dashboard in DIR/index.html')
+    parser.add_argument('--live', type=int, metavar='PORT', help='Stream bars, indicators and orders to '
+                                                                 'a live dashboard at http://127.0.0.1:PORT/')
+    parser.add_argument('--metrics-port', type=int, help='Serve stage latencies at http://127.0.0.1:PORT/metrics')
+    parser.add_argument('--metrics-jsonl', metavar='PATH', help='Append stage latencies to PATH after every tick')
+    parser.add_argument('--profile-tick', type=int, metavar='N', help='Profile the Nth tick (1 = the first)')
+    parser.add_argument('--profiler', choices=('cprofile', 'sample'), default='cprofile',
+                        help='cprofile: dispatcher thread only; sample: every thread')
+    parser.add_argument('--profile-out', default='tick.prof', help='Where to write the tick profile')
+    args = parser.parse_args()
+
+    if args.metrics_port is not None or args.metrics_jsonl:
+        metrics.enable()
+    if args.metrics_port is not None:
+        metrics.serve(args.metrics_port)
+    daemon = TradingDaemon([parse_job(text) for text in args.jobs],
+                           order_handler=None if args.dry_run else place_market_order,
+                           workers=args.workers, settle=args.settle, metrics_jsonl=args.metrics_jsonl,
+                           profile_tick=args.profile_tick, profiler=args.profiler, profile_path=args.profile_out)
+    if args.record:
+        from recorder import TickRecorder
+        TickRecorder(args.record).attach(daemon=daemon)
+    if args.charts:
+        from charts import ChartDashboard
+        ChartDashboard(args.charts).attach(daemon)
+    if args.live is not None:
+        from live_dashboard import LiveFeed
+        LiveFeed(port=args.live).attach(daemon).start()
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        daemon.stop()
+    if metrics.enabled():
+        print(metrics.report())
+
+
+if __name__ == "__main__":
+    main()
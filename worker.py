@@ -0,0 +1,165 @@
+import argparse
+import contextlib
+import io
+import os
+import pickle
+import sys
+import time
+import traceback
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+# Long-lived worker for cron-driven scans. `python worker.py serve` pays for the
+# pandas/yfinance/nacl imports once and keeps the bar cache, indicator engines
+# and API client warm; `python worker.py run <task>` (the cron entry) only
+# imports the standard library, hands the task to the worker and prints its
+# output. With no worker listening the task runs in-process instead.
+
+ADDRESS = (os.getenv("WORKER_HOST", "127.0.0.1"), int(os.getenv("WORKER_PORT", "6001")))
+
+# Tasks can place orders, so connections must prove they know a secret:
+# WORKER_AUTHKEY when set, otherwise a random key that `serve` writes to
+# KEY_FILE (readable by the owner only) on first start and `run` reads back
+KEY_FILE = os.getenv("WORKER_KEY_FILE", os.path.join(os.path.expanduser("~"), ".trading_worker_key"))
+
+
+# The shared secret; with create=True a missing key file is created. Returns
+# None when there is no key yet (no worker has ever been started).
+def authkey(create=False):
+    if os.getenv("WORKER_AUTHKEY"):
+        return os.environ["WORKER_AUTHKEY"].encode()
+    try:
+        with open(KEY_FILE, "rb") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        if not create:
+            return None
+    try:
+        fd = os.open(KEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:  # Another worker created it first
+        return authkey()
+    key = os.urandom(32).hex().encode()
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+def task_scan(*symbols):
+    from check_stocks import analyze_multiple_symbols, symbols_to_analyze
+    analyze_multiple_symbols(list(symbols) or symbols_to_analyze)
+
+
+def task_rsi(symbol="DOGE-USD"):
+    from rsi_buy import fetch_and_analyze
+    fetch_and_analyze(symbol)
+
+
+def task_backtest(start_date="2024-01-01", end_date="2025-02-07", *symbols):
+    from backtest_stocks import backtest_multiple_stocks
+    initial_cash = 10000
+    total = backtest_multiple_stocks(list(symbols) or ['DOGE-USD'], start_date, end_date,
+                                     initial_cash=initial_cash, investment_per_stock=initial_cash * .2)
+    print(f"\nTotal Portfolio Gain/Loss (all symbols): {total + initial_cash:.2f}")
+
+
+def task_ping():
+    print("pong")
+
+
+TASKS = {
+    'scan': task_scan,
+    'rsi': task_rsi,
+    'backtest': task_backtest,
+    'ping': task_ping,
+}
+
+
+# Run one task with its output captured; returns (ok, output, seconds)
+def run_task(name, args):
+    started = time.perf_counter()
+    output = io.StringIO()
+    ok = True
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        try:
+            TASKS[name](*args)
+        except Exception:
+            ok = False
+            traceback.print_exc()
+    return ok, output.getvalue(), time.perf_counter() - started
+
+
+# Handle one connection: receive (task, args), run it and send the result
+def _handle(conn):
+    name, args = conn.recv()
+    if name not in TASKS:
+        conn.send((False, f"Unknown task {name!r}; choose from {', '.join(TASKS)}\n", 0.0))
+        return
+    result = run_task(name, args)
+    print(f"{name} {' '.join(args)}: {'ok' if result[0] else 'failed'} in {result[2]:.2f}s")
+    conn.send(result)
+
+
+# Serve tasks one at a time (stdout capture is process-wide). A client that
+# fails the authentication, hangs up or sends garbage is logged and dropped;
+# it never stops the worker.
+def serve(preload=True):
+    if preload:
+        import check_stocks  # noqa: F401 - warm the heavy imports before the first trigger
+        import market_data  # noqa: F401
+        import yfinance  # noqa: F401
+    with Listener(ADDRESS, authkey=authkey(create=True)) as listener:
+        print(f"Worker listening on {ADDRESS[0]}:{ADDRESS[1]}")
+        while True:
+            try:
+                conn = listener.accept()
+            except (AuthenticationError, OSError, EOFError) as e:
+                print(f"Rejected a connection: {e!r}", file=sys.stderr)
+                continue
+            with conn:
+                try:
+                    _handle(conn)
+                except (OSError, EOFError, pickle.PickleError, AttributeError, ImportError,
+                        TypeError, ValueError) as e:
+                    print(f"Dropped a connection: {e!r}", file=sys.stderr)
+
+
+def trigger(name, args):
+    key = authkey()
+    if key is None:
+        print("No worker key; running the task in-process.", file=sys.stderr)
+        return run_task(name, args)
+    try:
+        conn = Client(ADDRESS, authkey=key)
+    except ConnectionRefusedError:
+        print("No worker running; running the task in-process.", file=sys.stderr)
+        return run_task(name, args)
+    except AuthenticationError:
+        print("The worker rejected our key (WORKER_AUTHKEY / key file mismatch); "
+              "running the task in-process.", file=sys.stderr)
+        return run_task(name, args)
+    with conn:
+        conn.send((name, list(args)))
+        return conn.recv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Persistent worker for the trading scripts.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve_parser = commands.add_parser('serve', help='Start the worker')
+    serve_parser.add_argument('--no-preload', action='store_true', help='Import task modules on first use')
+    run_parser = commands.add_parser('run', help='Run a task on the worker')
+    run_parser.add_argument('task', choices=sorted(TASKS))
+    run_parser.add_argument('args', nargs='*')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve(preload=not args.no_preload)
+        return
+    ok, output, elapsed = trigger(args.task, args.args)
+    sys.stdout.write(output)
+    print(f"[{args.task} finished in {elapsed:.2f}s]", file=sys.stderr)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()